@@ -1,6 +1,36 @@
-from .swagger_agent import swagger_agent
-from .planner_agent import planner_agent
-from .executor_agent import executor_agent
-from .report_agent import report_agent
+"""
+The four workflow agents, compiled on first use.
 
-__all__ = ["swagger_agent", "planner_agent", "executor_agent", "report_agent"]
+Importing the package (or an agent module, e.g. for its prompt) does not build
+any graph; get_agent("planner") or `from agents import planner_agent` does, once.
+"""
+
+import importlib
+import threading
+
+_AGENTS = ("swagger", "planner", "executor", "report")
+_built = {}
+_lock = threading.Lock()
+
+
+def get_agent(name: str):
+    """Compiled graph of an agent ("swagger", "planner", "executor" or "report"), built once per process"""
+    if name not in _AGENTS:
+        raise ValueError(f"Unknown agent: {name}")
+    if name not in _built:
+        with _lock:
+            if name not in _built:
+                module = importlib.import_module(f"{__name__}.{name}_agent")
+                _built[name] = getattr(module, f"build_{name}_agent")()
+                # Importing the module bound the package attribute to it, point it at the graph again
+                globals()[f"{name}_agent"] = _built[name]
+    return _built[name]
+
+
+def __getattr__(attribute):
+    if attribute.endswith("_agent") and attribute[:-len("_agent")] in _AGENTS:
+        return get_agent(attribute[:-len("_agent")])
+    raise AttributeError(f"module {__name__!r} has no attribute {attribute!r}")
+
+
+__all__ = ["get_agent", "swagger_agent", "planner_agent", "executor_agent", "report_agent"]
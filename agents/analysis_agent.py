@@ -0,0 +1,254 @@
+from utils.model import get_model, agent_tier, with_rate_limit_retry, cached_system_prompt
+from utils.budget import BudgetExhausted
+from tools import get_queued_responses, remove_queued_responses, add_test_result, add_vulnerability
+from tools.separate_state_tools import load_scenarios_state
+from tools.separate_states import ScenariosState
+from langchain_core.messages import HumanMessage
+from typing import Any, Callable, Dict, List, Optional
+import json
+
+ANALYSIS_PROMPT = """
+You are an expert security researcher specializing in BUSINESS LOGIC VULNERABILITIES that automated scanners cannot detect.
+
+You receive a batch of security test scenarios that were already executed. Each result has the scenario ID,
+what the scenario tests, the request that was sent, the status code and a summary of the response.
+
+Judge EVERY result and return exactly one verdict per scenario_id:
+- success: whether the test request was accepted by the API (2xx/3xx and the operation took effect)
+- details: one or two sentences on what the response shows
+- vulnerable: whether the response proves a vulnerability
+- vulnerability: only when vulnerable, with type, title, severity, description, evidence, impact and remediation
+
+AUTHORIZATION CONTEXT ANALYSIS:
+- IDOR/BOLA: the response contains another user's data (email, profile, orders) or a resource the caller does not own
+- Function-level bypass: admin or premium functionality answered for a regular or unauthenticated caller
+- Mass assignment: privileged fields (admin, role, balance) submitted by the caller were accepted and reflected back
+- Business logic: negative or tampered amounts accepted, workflow steps skipped, state changed without prerequisites
+- Information disclosure: stack traces, secrets, system information or other users' PII in the response
+
+SEVERITY:
+- CRITICAL: cross-user data access, privilege escalation, command injection, authentication bypass
+- HIGH: business logic bypass (payment, subscription), function-level authorization failure, PII disclosure
+- MEDIUM: rate limiting bypass, error message information leakage
+- LOW: missing hardening without direct impact
+
+A rejected request (401, 403, 404, 422) is the expected secure behaviour, not a vulnerability.
+Quote the evidence from the response summary; never report a vulnerability the response does not show.
+"""
+
+# JSON schema of the structured output, every verdict maps onto add_test_result and add_vulnerability
+VERDICTS_SCHEMA = {
+    "title": "record_verdicts",
+    "description": "Record one verdict per analyzed test result",
+    "type": "object",
+    "properties": {
+        "verdicts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "scenario_id": {"type": "string"},
+                    "success": {"type": "boolean", "description": "The test request was accepted by the API"},
+                    "details": {"type": "string", "description": "What the response shows"},
+                    "vulnerable": {"type": "boolean"},
+                    "vulnerability": {
+                        "type": "object",
+                        "properties": {
+                            "type": {"type": "string", "description": "e.g. IDOR, privilege_escalation, business_logic"},
+                            "title": {"type": "string"},
+                            "severity": {"type": "string", "enum": ["CRITICAL", "HIGH", "MEDIUM", "LOW"]},
+                            "description": {"type": "string"},
+                            "evidence": {"type": "string"},
+                            "impact": {"type": "string"},
+                            "remediation": {"type": "string"}
+                        },
+                        "required": ["type", "severity", "description", "evidence"]
+                    }
+                },
+                "required": ["scenario_id", "success", "details", "vulnerable"]
+            }
+        }
+    },
+    "required": ["verdicts"]
+}
+
+DEFAULT_ANALYSIS_BATCH_SIZE = 10
+# Input tokens of results sent per analysis call
+DEFAULT_ANALYSIS_BATCH_TOKENS = 8000
+# Characters of a response body kept in the summary sent to the model
+RESPONSE_SUMMARY_CHARS = 800
+OUTPUT_TOKENS_PER_VERDICT = 250
+# Model tokens needed besides the results themselves (system prompt, instructions, schema)
+ANALYSIS_OVERHEAD_TOKENS = 1500
+
+
+def summarize_response(body: str, limit: int = RESPONSE_SUMMARY_CHARS) -> str:
+    """Compact form of a response body: minified JSON or collapsed whitespace, cut at limit characters"""
+    body = body or ""
+    try:
+        text = json.dumps(json.loads(body), separators=(",", ":"))
+    except ValueError:
+        text = " ".join(body.split())
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
+
+def _item_tokens(item: Dict[str, Any]) -> int:
+    # Same 4 characters per token estimate as count_tokens_approximately
+    return len(json.dumps(item, separators=(",", ":"))) // 4 + 1
+
+
+def batch_length(items: List[Dict[str, Any]], max_size: int, max_tokens: int) -> int:
+    """Number of leading items that fit in one call, at least one"""
+    used = 0
+    for index, item in enumerate(items[:max_size]):
+        used += _item_tokens(item)
+        if used > max_tokens and index > 0:
+            return index
+    return min(len(items), max_size)
+
+
+class BatchResultAnalyzer:
+    """Classifies queued responses in batches of up to batch_size per model call.
+
+    The batch size halves when a call fails or leaves results without a verdict and grows back
+    after clean batches; each batch is also capped by batch_tokens and by the remaining token budget.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_ANALYSIS_BATCH_SIZE, batch_tokens: int = DEFAULT_ANALYSIS_BATCH_TOKENS,
+                 remaining_tokens: Optional[Callable[[], Optional[int]]] = None):
+        self.max_batch_size = max(1, batch_size)
+        self.batch_size = self.max_batch_size
+        self.batch_tokens = batch_tokens
+        self.remaining_tokens = remaining_tokens
+        self.model_calls = 0
+        self.analyzed = 0
+        self.vulnerabilities = 0
+        self.failed_batches = 0
+        self._runnables: Dict[int, Any] = {}
+
+    def _runnable(self):
+        instance = get_model(agent_tier("analysis"))
+        if id(instance) not in self._runnables:
+            model = instance
+            if "max_tokens" in type(instance).model_fields:
+                model = instance.model_copy(update={"max_tokens": ANALYSIS_OVERHEAD_TOKENS + OUTPUT_TOKENS_PER_VERDICT * self.max_batch_size})
+            self._runnables[id(instance)] = model.with_structured_output(VERDICTS_SCHEMA)
+        return with_rate_limit_retry(self._runnables[id(instance)])
+
+    def _token_cap(self) -> Optional[int]:
+        """Result tokens allowed in the next call, None when the budget cannot fit another call"""
+        cap = self.batch_tokens
+        remaining = self.remaining_tokens() if self.remaining_tokens else None
+        if remaining is not None:
+            cap = min(cap, remaining - ANALYSIS_OVERHEAD_TOKENS - OUTPUT_TOKENS_PER_VERDICT * self.batch_size)
+            if cap <= 0:
+                return None
+        return cap
+
+    def _items(self, responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        status, state_json = load_scenarios_state()
+        descriptions = {}
+        if status == 200:
+            descriptions = {s.id: s.description for s in ScenariosState.from_json(state_json).scenarios}
+        return [
+            {
+                "scenario_id": response["scenario_id"],
+                "scenario": descriptions.get(response["scenario_id"], ""),
+                "request": response.get("request", {}),
+                "status_code": response.get("status_code", 0),
+                "response": summarize_response(response.get("response_body", ""))
+            }
+            for response in responses
+        ]
+
+    def _record(self, response: Dict[str, Any], verdict: Dict[str, Any]):
+        """Store one verdict through the regular result and vulnerability tools"""
+        add_test_result({
+            "scenario_id": response["scenario_id"],
+            "status_code": response.get("status_code", 0),
+            "response_body": response.get("response_body", ""),
+            "success": bool(verdict.get("success")),
+            "details": verdict.get("details")
+        })
+        vulnerability = verdict.get("vulnerability")
+        if verdict.get("vulnerable") and vulnerability:
+            request = response.get("request", {})
+            add_vulnerability(dict(vulnerability, scenario_id=response["scenario_id"],
+                                   endpoint=f"{request.get('method', '')} {request.get('url', '')}".strip()))
+            self.vulnerabilities += 1
+
+    def analyze_batch(self, responses: List[Dict[str, Any]], config: Optional[Dict[str, Any]] = None,
+                      items: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """One model call for a batch of queued responses; returns the scenario IDs that got a verdict"""
+        message = (
+            f"Analyze these {len(responses)} executed scenarios and return one verdict per scenario_id. "
+            "Results: " + json.dumps(items if items is not None else self._items(responses), separators=(",", ":"))
+        )
+        self.model_calls += 1
+        output = self._runnable().invoke([cached_system_prompt(ANALYSIS_PROMPT), HumanMessage(content=message)], config)
+        by_id = {response["scenario_id"]: response for response in responses}
+        recorded = []
+        for verdict in (output or {}).get("verdicts", []):
+            scenario_id = verdict.get("scenario_id")
+            if scenario_id in by_id and scenario_id not in recorded:
+                self._record(by_id[scenario_id], verdict)
+                recorded.append(scenario_id)
+        remove_queued_responses(recorded)
+        self.analyzed += len(recorded)
+        return recorded
+
+    def run(self, config_for: Callable[[List[str]], Dict[str, Any]] = None, flush: bool = True) -> int:
+        """Analyze queued responses batch by batch; without flush a final partial batch stays queued.
+
+        Returns the number of results recorded. Stops early once the token budget is used up.
+        """
+        recorded_total = 0
+        while True:
+            status, data = get_queued_responses()
+            queued = json.loads(data) if status == 200 else []
+            if not queued or (not flush and len(queued) < self.batch_size):
+                return recorded_total
+            cap = self._token_cap()
+            if cap is None:
+                print("⏹️  Token budget too small for another analysis batch, responses stay queued")
+                return recorded_total
+
+            items = self._items(queued[:self.batch_size])
+            length = batch_length(items, self.batch_size, cap)
+            batch, items = queued[:length], items[:length]
+            batch_ids = [response["scenario_id"] for response in batch]
+            error = "no verdict returned"
+            try:
+                recorded = self.analyze_batch(batch, config_for(batch_ids) if config_for else None, items)
+            except BudgetExhausted as e:
+                print(f"⏹️  Scan budget exhausted during analysis: {e}")
+                return recorded_total
+            except Exception as e:
+                print(f"⚠️  Analysis batch of {len(batch)} failed: {e}")
+                recorded, error = [], str(e)
+            if not recorded and len(batch) == 1:
+                # Nothing left to split, keep the raw outcome so the queue cannot stall
+                self._record(batch[0], {"success": 0 < batch[0].get("status_code", 0) < 400,
+                                        "details": f"Automated analysis failed: {error}"})
+                remove_queued_responses(batch_ids)
+                recorded = batch_ids
+            recorded_total += len(recorded)
+
+            if len(recorded) < len(batch):
+                self.failed_batches += 1
+                self.batch_size = max(1, len(batch) // 2)
+            else:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Counters of the analysis stage"""
+        return {
+            "model_calls": self.model_calls,
+            "results_analyzed": self.analyzed,
+            "vulnerabilities": self.vulnerabilities,
+            "failed_batches": self.failed_batches,
+            "results_per_call": round(self.analyzed / self.model_calls, 2) if self.model_calls else 0.0,
+            "batch_size": self.batch_size
+        }
@@ -1,22 +1,15 @@
 # agents/executor_agent.py
 
 import json
-from utils.model import model
+from utils.model import agent_model, cached_system_prompt
 from tools import (
-    http_request, get_pending_scenarios, add_test_result, add_vulnerability, 
+    http_request, execute_scenario, get_pending_scenarios, add_test_result, add_vulnerability, 
     get_scenarios_summary, is_testing_complete, check_execution_progress
 )
-from langgraph.prebuilt import create_react_agent
 from utils.checkpointer import shared_checkpointer
+from utils.compaction import compaction_hook
 
-executor_agent = create_react_agent(
-    model=model,
-    name="executor_agent",
-    tools=[
-        http_request, get_pending_scenarios, add_test_result, add_vulnerability,
-        get_scenarios_summary, is_testing_complete, check_execution_progress
-    ],
-    prompt="""
+EXECUTOR_PROMPT = """
 You are an expert security researcher specializing in BUSINESS LOGIC VULNERABILITIES that automated scanners cannot detect.
 
 Your PRIMARY MISSION: Detect authorization and business logic flaws through sophisticated behavioral analysis.
@@ -31,6 +24,14 @@ WORKFLOW:
 5. Call is_testing_complete to verify ALL scenarios are executed
 6. Continue until ALL scenarios are completed
 
+get_pending_scenarios returns the highest-risk scenarios first; pass limit to fetch them in batches.
+When the message already lists the scenarios to execute, execute only those and stop once each has a result; the orchestrator sends the next chunk.
+When the message says responses are analyzed in batches, send each scenario with execute_scenario instead of http_request and
+do not call add_test_result or add_vulnerability: the analysis stage records verdicts. Issue the execute_scenario calls of
+independent scenarios together in one step, and only wait for a response when a later request needs a value from it (e.g. a token).
+If is_testing_complete reports budget_exhausted, the scan window is over: stop immediately and summarize what was executed.
+Send scenario payloads exactly as listed: a value {"__oversized__": n} is expanded into an n-character string when the request is sent.
+
 🔥 **BUSINESS LOGIC VULNERABILITY DETECTION FRAMEWORK**
 
 **IDOR/BOLA DETECTION (CRITICAL PRIORITY):**
@@ -190,14 +191,37 @@ Execute multiple payloads and analyze for:
 - Cross-user authorization tested systematically
 
 The goal is to find the vulnerabilities that automated scanners miss - the business logic flaws that require human-like reasoning about authorization context!
-""",
-    checkpointer=shared_checkpointer
-)
+"""
+
+EXECUTOR_TOOLS = [
+    http_request, execute_scenario, get_pending_scenarios, add_test_result, add_vulnerability,
+    get_scenarios_summary, is_testing_complete, check_execution_progress
+]
+
+def build_executor_agent():
+    """Compile the executor agent graph"""
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=agent_model("executor", EXECUTOR_TOOLS),
+        name="executor_agent",
+        tools=EXECUTOR_TOOLS,
+        prompt=cached_system_prompt(EXECUTOR_PROMPT),
+        pre_model_hook=compaction_hook,
+        checkpointer=shared_checkpointer
+    )
+
+def __getattr__(name):
+    # The graph is compiled on first use so importing this module stays cheap
+    if name == "executor_agent":
+        from agents import get_agent
+        return get_agent("executor")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # Example invocation
     base_url = "http://localhost:8000"
-    summary = executor_agent.invoke(
+    summary = build_executor_agent().invoke(
         {"messages": [{"role": "user", "content": f"Execute security tests against {base_url}"}]},
         {"configurable": {"thread_id": "1"}}
     )
@@ -1,14 +1,11 @@
-from utils.model import model
-from tools import get_endpoints, add_test_scenario, get_scenarios_summary, check_execution_progress
-from langgraph.prebuilt import create_react_agent
+from utils.model import agent_model, cached_system_prompt
+from tools import get_endpoints, add_test_scenario, add_test_scenarios, get_scenarios_summary, check_execution_progress
 from utils.checkpointer import shared_checkpointer
+from utils.compaction import compaction_hook
+import hashlib
 import uuid
 
-planner_agent = create_react_agent(
-    model=model,
-    name="planner_agent",
-    tools=[get_endpoints, add_test_scenario, get_scenarios_summary, check_execution_progress],
-    prompt="""
+PLANNER_PROMPT = """
 You are an expert security researcher specializing in BUSINESS LOGIC VULNERABILITIES that automated scanners cannot detect.
 
 Your PRIMARY MISSION: Create sophisticated test scenarios that expose authorization flaws, IDOR/BOLA vulnerabilities, and business logic bypasses.
@@ -19,6 +16,13 @@ WORKFLOW:
 3. Call get_scenarios_summary to verify all scenarios were created
 4. Optionally call check_execution_progress to see overall status
 
+Use add_test_scenarios to store several scenarios in one call instead of one add_test_scenario call per scenario.
+
+RULE-BASED SCENARIOS:
+Scenarios with IDs starting with "rule_" were generated deterministically for the standard classes:
+unauthenticated access, cross-user ID swaps on path parameters, admin-flag mass assignment and negative amounts.
+Do NOT recreate these. Spend your effort on novel business logic cases, attack chains and workflow abuse.
+
 🔥 **BUSINESS LOGIC VULNERABILITY TESTING PRIORITY**
 
 **CRITICAL PRIORITY #1: IDOR/BOLA DETECTION**
@@ -303,9 +307,32 @@ Create scenarios that simulate real-world attack patterns:
 - Describe the attack: "cross_user_access", "ownership_bypass", "role_escalation"
 
 The goal is to create scenarios that expose the subtle authorization and business logic flaws that make applications vulnerable to sophisticated attacks!
-""",
-    checkpointer=shared_checkpointer
-)
+"""
+
+# Derived from the prompt text so any prompt edit invalidates cached plans
+PLANNER_PROMPT_VERSION = hashlib.sha256(PLANNER_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+PLANNER_TOOLS = [get_endpoints, add_test_scenario, add_test_scenarios, get_scenarios_summary, check_execution_progress]
+
+def build_planner_agent():
+    """Compile the planner agent graph"""
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=agent_model("planner", PLANNER_TOOLS),
+        name="planner_agent",
+        tools=PLANNER_TOOLS,
+        prompt=cached_system_prompt(PLANNER_PROMPT),
+        pre_model_hook=compaction_hook,
+        checkpointer=shared_checkpointer
+    )
+
+def __getattr__(name):
+    # The graph is compiled on first use so importing this module stays cheap
+    if name == "planner_agent":
+        from agents import get_agent
+        return get_agent("planner")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -314,7 +341,7 @@ if __name__ == "__main__":
         "thread_id": "1"  
         }
     }
-    planner_response = planner_agent.invoke(
+    planner_response = build_planner_agent().invoke(
         {"messages": [{"role": "user", "content": "Plan the attacks on the swagger file"}]},
         config
     )
@@ -1,31 +1,16 @@
-from utils.model import model
-from langgraph.prebuilt import create_react_agent
+from utils.model import agent_model, cached_system_prompt
 from utils.checkpointer import shared_checkpointer
+from utils.compaction import compaction_hook
 from tools import (
     get_test_results, get_vulnerabilities, get_endpoints, 
     get_scenarios_summary, get_results_summary, get_vulnerabilities_summary,
     check_execution_progress, is_testing_complete
 )
 from tools.separate_states import EndpointsState, ScenariosState, ResultsState, VulnerabilitiesState
-from utils.pdf_generator import generate_security_pdf_report
 import json
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from datetime import datetime
 import os
 
-report_agent = create_react_agent(
-    model=model,
-    name="report_agent",
-    tools=[
-        get_test_results, get_vulnerabilities, get_endpoints,
-        get_scenarios_summary, get_results_summary, get_vulnerabilities_summary,
-        check_execution_progress, is_testing_complete
-    ],
-    prompt="""
+REPORT_PROMPT = """
 You are an expert cybersecurity consultant specializing in BUSINESS LOGIC VULNERABILITY ANALYSIS with deep expertise in IDOR/BOLA detection and authorization bypass assessment.
 
 Your PRIMARY MISSION: Provide executive-level analysis of business logic security flaws that pose critical risks to the organization.
@@ -203,9 +188,33 @@ Use enhanced CVSS scoring with business logic modifiers:
 - Resource access pattern analysis
 
 Provide analysis that enables C-level executives to understand business risk and make informed security investment decisions based on actual business logic vulnerability exposure!
-""",
-    checkpointer=shared_checkpointer
-)
+"""
+
+REPORT_TOOLS = [
+    get_test_results, get_vulnerabilities, get_endpoints,
+    get_scenarios_summary, get_results_summary, get_vulnerabilities_summary,
+    check_execution_progress, is_testing_complete
+]
+
+def build_report_agent():
+    """Compile the report agent graph"""
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=agent_model("report", REPORT_TOOLS),
+        name="report_agent",
+        tools=REPORT_TOOLS,
+        prompt=cached_system_prompt(REPORT_PROMPT),
+        pre_model_hook=compaction_hook,
+        checkpointer=shared_checkpointer
+    )
+
+def __getattr__(name):
+    # The graph is compiled on first use so importing this module stays cheap
+    if name == "report_agent":
+        from agents import get_agent
+        return get_agent("report")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def generate_pdf_report_from_separate_states():
     """Generate PDF report from current separate state data"""
@@ -260,7 +269,7 @@ if __name__ == "__main__":
     }
     
     # Generate vulnerability analysis report
-    report_result = report_agent.invoke({
+    report_result = build_report_agent().invoke({
         "messages": [{"role": "user", "content": "Generate a comprehensive security vulnerability report based on all test results and findings in memory."}]
     }, config)
     
@@ -1,13 +1,8 @@
-from utils.model import model
+from utils.model import agent_model, cached_system_prompt
 from tools import get_swagger, add_endpoint, get_endpoints_count
-from langgraph.prebuilt import create_react_agent
 from utils.checkpointer import shared_checkpointer
 
-swagger_agent = create_react_agent(
-    model=model,
-    tools=[get_swagger, add_endpoint, get_endpoints_count],
-    name="swagger_agent",
-    prompt="""
+SWAGGER_PROMPT = """
 You are an OpenAPI/Swagger analyst with separate state management capabilities.
 
 Your job is to:
@@ -49,9 +44,28 @@ IMPORTANT:
 - After processing all endpoints, call get_endpoints_count to show the total
 
 The new separate state system is much more efficient for LLMs to process!
-""",
-    checkpointer=shared_checkpointer
-)
+"""
+
+SWAGGER_TOOLS = [get_swagger, add_endpoint, get_endpoints_count]
+
+def build_swagger_agent():
+    """Compile the swagger agent graph"""
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(
+        model=agent_model("swagger", SWAGGER_TOOLS),
+        tools=SWAGGER_TOOLS,
+        name="swagger_agent",
+        prompt=cached_system_prompt(SWAGGER_PROMPT),
+        checkpointer=shared_checkpointer
+    )
+
+def __getattr__(name):
+    # The graph is compiled on first use so importing this module stays cheap
+    if name == "swagger_agent":
+        from agents import get_agent
+        return get_agent("swagger")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -60,7 +74,7 @@ if __name__ == "__main__":
         "thread_id": "1"  
         }
     }
-    swagger_response = swagger_agent.invoke(
+    swagger_response = build_swagger_agent().invoke(
         {"messages": [{"role": "user", "content": "get the swagger from http://localhost:8000/openapi.json"}]},
         config
     )
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Batch security testing of many services from a manifest.
+
+Every target runs run_security_test in a bounded pool of worker processes.
+Workers import the agents once and are reused across targets. Each target works
+in its own directory, so its state files, checkpoints, usage report and PDF
+never mix with another target's. The manifest is a JSON list (or {"targets": [...]})
+of targets:
+
+    [{"name": "billing", "swagger_url": "https://billing/openapi.json", "base_url": "https://billing",
+      "identities": {"user_a": {"token": "..."}, "user_b": {"token": "..."}, "admin": {"token": "..."}},
+      "options": {"max_seconds": 900}}]
+
+    python batch_scan.py --manifest targets.json --workers 8 --output-dir batch_scans
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+DEFAULT_OUTPUT_DIR = "batch_scans"
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """Targets of a manifest file, each with a unique name"""
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    targets = manifest.get("targets", []) if isinstance(manifest, dict) else manifest
+
+    names = set()
+    for index, target in enumerate(targets):
+        if "swagger_url" not in target or "base_url" not in target:
+            raise ValueError(f"Target {index} needs swagger_url and base_url")
+        name = target.get("name") or re.sub(r"[^A-Za-z0-9_.-]+", "_", target["base_url"].split("://", 1)[-1]).strip("_")
+        if name in names:
+            raise ValueError(f"Duplicate target name: {name}")
+        names.add(name)
+        target["name"] = name
+    return targets
+
+
+def init_worker(model_tiers: Optional[Dict[str, str]]):
+    """Pay the agent, LangChain and ReportLab imports once per worker instead of once per target"""
+    from security_agent import warm_up
+    if model_tiers:
+        from utils.model import configure_model_tiers
+        configure_model_tiers(model_tiers)
+    warm_up()
+
+
+def _state_counts() -> Dict[str, Any]:
+    """Scenario and vulnerability counts from the state files of the current directory"""
+    counts: Dict[str, Any] = {"endpoints": 0, "scenarios": 0, "executed": 0, "vulnerabilities": 0,
+                              "by_severity": {severity: 0 for severity in SEVERITIES}}
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open("endpoints_state.json") as f:
+            counts["endpoints"] = len(json.load(f).get("endpoints", []))
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open("scenarios_state.json") as f:
+            scenarios = json.load(f).get("scenarios", [])
+        counts["scenarios"] = len(scenarios)
+        counts["executed"] = sum(1 for scenario in scenarios if scenario.get("executed"))
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open("vulnerabilities_state.json") as f:
+            vulnerabilities = json.load(f).get("vulnerabilities", [])
+        counts["vulnerabilities"] = len(vulnerabilities)
+        for vulnerability in vulnerabilities:
+            severity = str(vulnerability.get("severity", "")).upper()
+            if severity in counts["by_severity"]:
+                counts["by_severity"][severity] += 1
+    return counts
+
+
+def scan_target(target: Dict[str, Any], output_dir: str, defaults: Dict[str, Any],
+                overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Scan one target in its own directory (runs in a worker process); returns its summary row.
+
+    The target's options take precedence over defaults, overrides over both.
+    """
+    from security_agent import run_security_test
+
+    workdir = os.path.abspath(os.path.join(output_dir, target["name"]))
+    os.makedirs(workdir, exist_ok=True)
+    options = {**defaults, **target.get("options", {}), **(overrides or {})}
+    options.setdefault("session_id", target["name"])
+
+    cwd = os.getcwd()
+    started = time.perf_counter()
+    os.chdir(workdir)
+    try:
+        with open("scan.log", "w") as log, contextlib.redirect_stdout(log):
+            try:
+                result = run_security_test(target["swagger_url"], target["base_url"],
+                                           identities=target.get("identities"), **options)
+            except Exception as e:
+                result = {"status": "error", "error": str(e)}
+        usage = (result.get("usage") or {}).get("totals", {})
+        return dict(
+            _state_counts(),
+            name=target["name"],
+            base_url=target["base_url"],
+            status=result["status"],
+            error=result.get("error"),
+            seconds=round(time.perf_counter() - started, 2),
+            model_calls=usage.get("model_calls", 0),
+            tokens=usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
+            cost_usd=round(usage.get("cost_usd", 0.0), 4),
+            pdf_file=os.path.join(workdir, result["pdf_file"]) if result.get("pdf_file") else None,
+            log_file=os.path.join(workdir, "scan.log")
+        )
+    finally:
+        os.chdir(cwd)
+
+
+def aggregate(rows: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Fleet-wide totals over the per-target summaries"""
+    by_severity = {severity: sum(row.get("by_severity", {}).get(severity, 0) for row in rows) for severity in SEVERITIES}
+    target_seconds = sum(row.get("seconds", 0.0) for row in rows)
+    return {
+        "targets": len(rows),
+        "succeeded": sum(1 for row in rows if row["status"] == "success"),
+        "failed": [row["name"] for row in rows if row["status"] != "success"],
+        "endpoints": sum(row.get("endpoints", 0) for row in rows),
+        "scenarios": sum(row.get("scenarios", 0) for row in rows),
+        "executed": sum(row.get("executed", 0) for row in rows),
+        "vulnerabilities": sum(row.get("vulnerabilities", 0) for row in rows),
+        "by_severity": by_severity,
+        "model_calls": sum(row.get("model_calls", 0) for row in rows),
+        "tokens": sum(row.get("tokens", 0) for row in rows),
+        "cost_usd": round(sum(row.get("cost_usd", 0.0) for row in rows), 4),
+        "wall_seconds": round(wall_seconds, 2),
+        # Sum of the per-target scan times over the wall time, i.e. how many targets ran at once on average
+        "speedup": round(target_seconds / wall_seconds, 2) if wall_seconds else 0.0
+    }
+
+
+def run_batch(targets: List[Dict[str, Any]], workers: int = 4, output_dir: str = DEFAULT_OUTPUT_DIR,
+              defaults: Optional[Dict[str, Any]] = None, model_tiers: Optional[Dict[str, str]] = None,
+              mp_context=None) -> Dict[str, Any]:
+    """Scan every target on up to workers processes; returns the aggregated summary and one row per target"""
+    os.makedirs(output_dir, exist_ok=True)
+    defaults = dict(defaults or {})
+    rows = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(targets) or 1)), mp_context=mp_context,
+                             initializer=init_worker, initargs=(model_tiers,)) as pool:
+        futures = {pool.submit(scan_target, target, output_dir, defaults): target for target in targets}
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                # The worker itself died, e.g. killed for running out of memory
+                row = {"name": target["name"], "base_url": target["base_url"], "status": "error", "error": str(e)}
+            rows.append(row)
+            icon = "✅" if row["status"] == "success" else "❌"
+            print(f"{icon} {row['name']}: {row['status']}, {row.get('vulnerabilities', 0)} vulnerabilities "
+                  f"in {row.get('seconds', 0.0)}s ({len(rows)}/{len(targets)})")
+
+    rows.sort(key=lambda row: row["name"])
+    return {"summary": aggregate(rows, time.perf_counter() - started), "targets": rows}
+
+
+def print_summary(report: Dict[str, Any]):
+    """Per-target table followed by the fleet-wide totals"""
+    print(f"\n{'target':<28}{'status':>9}{'endpoints':>11}{'executed':>10}{'vulns':>7}"
+          + "".join(f"{severity.lower():>10}" for severity in SEVERITIES) + f"{'seconds':>10}{'cost $':>9}")
+    for row in report["targets"]:
+        severities = row.get("by_severity", {})
+        print(f"{row['name'][:27]:<28}{row['status']:>9}{row.get('endpoints', 0):>11}{row.get('executed', 0):>10}"
+              f"{row.get('vulnerabilities', 0):>7}" + "".join(f"{severities.get(s, 0):>10}" for s in SEVERITIES)
+              + f"{row.get('seconds', 0.0):>10.1f}{row.get('cost_usd', 0.0):>9.2f}")
+
+    summary = report["summary"]
+    print("\n📊 Fleet summary")
+    print(f"   • Targets: {summary['succeeded']}/{summary['targets']} succeeded")
+    if summary["failed"]:
+        print(f"   • Failed: {', '.join(summary['failed'])}")
+    print(f"   • Scenarios executed: {summary['executed']}/{summary['scenarios']} over {summary['endpoints']} endpoints")
+    print(f"   • Vulnerabilities: {summary['vulnerabilities']} ("
+          + ", ".join(f"{summary['by_severity'][s]} {s.lower()}" for s in SEVERITIES) + ")")
+    print(f"   • Model usage: {summary['model_calls']} calls, {summary['tokens']} tokens, ${summary['cost_usd']:.2f}")
+    print(f"   • Wall time: {summary['wall_seconds']}s, {summary['speedup']}x the sequential scan time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Security testing of every service in a manifest")
+    parser.add_argument("--manifest", required=True, help="JSON list of targets with swagger_url, base_url and identities")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Targets scanned at once")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="One state directory per target is created here")
+    parser.add_argument("--summary", default=None, help="Where the aggregated summary is written (default: <output-dir>/batch_summary.json)")
+    parser.add_argument("--model-tier", action="append", default=[], metavar="AGENT=TIER",
+                        help="Model tier of an agent in every target (fast, strong or routed)")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Wall-clock budget of each target")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Model token budget of each target")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="Model requests per minute allowed for the whole batch")
+    parser.add_argument("--llm-tpm", type=float, default=None, help="Model tokens per minute allowed for the whole batch")
+    parser.add_argument("--pipeline", action="store_true", help="Run each target's phases as a streaming pipeline")
+    args = parser.parse_args()
+
+    defaults: Dict[str, Any] = {"max_seconds": args.max_seconds, "max_tokens": args.max_tokens, "pipeline": args.pipeline}
+    if args.llm_rpm or args.llm_tpm:
+        # One limiter state file shared by every worker keeps the whole batch within the provider limits
+        defaults.update(llm_requests_per_minute=args.llm_rpm, llm_tokens_per_minute=args.llm_tpm,
+                        rate_limit_state_path=os.path.abspath(os.path.join(args.output_dir, "rate_limit.json")))
+
+    targets = load_manifest(args.manifest)
+    print(f"🚀 Scanning {len(targets)} targets with {args.workers} workers")
+    report = run_batch(targets, args.workers, args.output_dir, defaults,
+                       dict(item.split("=", 1) for item in args.model_tier) or None)
+    print_summary(report)
+
+    summary_path = args.summary or os.path.join(args.output_dir, "batch_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Summary written to {summary_path}")
+    sys.exit(0 if not report["summary"]["failed"] else 1)
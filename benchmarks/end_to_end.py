@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full offline scans at increasing API sizes.
+
+Every size runs in its own process (so peak memory is not inherited from the
+previous run) against the local mock target with the scripted fake models, and
+reports per-phase wall time, target requests per second, time spent reading
+and writing the JSON state files and peak memory.
+
+    python -m benchmarks.end_to_end --sizes 10,100,1000 --output e2e_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import functools
+import threading
+import contextlib
+import subprocess
+import tracemalloc
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Operations the mock target has before extra endpoints are added
+BASE_OPERATIONS = 5
+PHASES = ("swagger", "planner", "executor", "analysis", "report", "pdf")
+
+
+def instrument_state_io() -> Dict[str, Any]:
+    """Time every load_*_state / save_*_state call of the separate state tools"""
+    import tools.separate_state_tools as state_tools
+
+    stats = {"calls": 0, "seconds": 0.0, "bytes_written": 0}
+    lock = threading.Lock()
+
+    def timed(func, is_save):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with lock:
+                    stats["calls"] += 1
+                    stats["seconds"] += elapsed
+                    if is_save and args:
+                        stats["bytes_written"] += len(args[0])
+        return wrapper
+
+    for name in dir(state_tools):
+        if name.endswith("_state") and name.startswith(("load_", "save_")):
+            setattr(state_tools, name, timed(getattr(state_tools, name), name.startswith("save_")))
+    return stats
+
+
+def run_size(endpoints: int, executor_chunk_size: int, analysis_batch_size: int, latency_scale: float,
+             trace_malloc: bool = False) -> Dict[str, Any]:
+    """One full offline scan of a mock API with the given number of operations"""
+    state_io = instrument_state_io()
+
+    from benchmarks.mock_target import MockTarget
+    from benchmarks.model_tiering import fake_models
+    from utils.model import set_model
+    from security_agent import run_security_test
+
+    for tier, instance in fake_models(latency_scale).items():
+        set_model(tier, instance)
+
+    cwd = os.getcwd()
+    if trace_malloc:
+        # Exact Python heap peak, at the price of a much slower run
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as workdir, MockTarget(max(0, endpoints - BASE_OPERATIONS)) as target:
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = run_security_test(target.swagger_url, target.base_url, use_plan_cache=False,
+                                           session_id=f"benchmark_{endpoints}", usage_report_path=None,
+                                           executor_chunk_size=executor_chunk_size,
+                                           analysis_batch_size=analysis_batch_size)
+            elapsed = time.perf_counter() - started
+            with open("scenarios_state.json") as f:
+                scenarios = len(json.load(f)["scenarios"])
+        finally:
+            os.chdir(cwd)
+    traced_peak = None
+    if trace_malloc:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    usage = result.get("usage") or {}
+    phase_seconds = usage.get("phase_seconds", {})
+    executor_seconds = phase_seconds.get("executor", 0.0)
+    return {
+        "endpoints": endpoints,
+        "status": result["status"],
+        "scenarios": scenarios,
+        "seconds": elapsed,
+        "phase_seconds": phase_seconds,
+        "target_requests": target.requests,
+        "requests_per_second": target.requests / executor_seconds if executor_seconds else 0.0,
+        "model_calls": usage.get("totals", {}).get("model_calls", 0),
+        "state_io_calls": state_io["calls"],
+        "state_io_seconds": state_io["seconds"],
+        "state_bytes_written": state_io["bytes_written"],
+        "traced_peak_mb": traced_peak,
+        # ru_maxrss is in KiB on Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def run_isolated(endpoints: int, args) -> Dict[str, Any]:
+    """run_size in a fresh interpreter, so every size starts from an empty heap"""
+    command = [sys.executable, "-m", "benchmarks.end_to_end", "--single", str(endpoints),
+               "--executor-chunk-size", str(args.executor_chunk_size),
+               "--analysis-batch-size", str(args.analysis_batch_size),
+               "--latency-scale", str(args.latency_scale)] + (["--trace-malloc"] if args.trace_malloc else [])
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(command, cwd=root, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark at {endpoints} endpoints failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_table(results: List[Dict[str, Any]]):
+    """Human-readable comparison of the sizes"""
+    phase_columns = [p for p in PHASES if any(p in r["phase_seconds"] for r in results)]
+    header = f"{'endpoints':>9}{'scenarios':>10}{'total s':>9}"
+    header += "".join(f"{p + ' s':>12}" for p in phase_columns)
+    header += f"{'requests':>10}{'req/s':>8}{'state io s':>12}{'io calls':>10}{'MB written':>12}{'rss MB':>9}{'py peak MB':>12}"
+    print(header)
+    for r in results:
+        row = f"{r['endpoints']:>9}{r['scenarios']:>10}{r['seconds']:>9.2f}"
+        row += "".join(f"{r['phase_seconds'].get(p, 0.0):>12.2f}" for p in phase_columns)
+        row += (f"{r['target_requests']:>10}{r['requests_per_second']:>8.1f}{r['state_io_seconds']:>12.2f}"
+                f"{r['state_io_calls']:>10}{r['state_bytes_written'] / 1024 / 1024:>12.1f}{r['max_rss_mb']:>9.1f}")
+        row += f"{r['traced_peak_mb']:>12.1f}" if r["traced_peak_mb"] is not None else f"{'-':>12}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end offline scan benchmark at several API sizes")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated operation counts of the mock API")
+    parser.add_argument("--executor-chunk-size", type=int, default=10, help="Passed to run_security_test")
+    parser.add_argument("--analysis-batch-size", type=int, default=0, help="Passed to run_security_test")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Multiplier on the simulated model latency")
+    parser.add_argument("--trace-malloc", action="store_true", help="Also report the Python heap peak (slow)")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_size(args.single, args.executor_chunk_size, args.analysis_batch_size, args.latency_scale,
+                                  args.trace_malloc)))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"⏱️  Scanning a mock API with {size} operations...", file=sys.stderr)
+        results.append(run_isolated(size, args))
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
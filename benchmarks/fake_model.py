@@ -0,0 +1,249 @@
+"""
+Scripted offline stand-in for the chat model.
+
+Plays each agent's role deterministically (picked from the tools bound to it),
+simulates provider latency from the prompt size and reports token usage like a
+real model would, so whole scans run without network access or API keys.
+"""
+
+import re
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# USD per million input / output tokens
+PRICES = {
+    "fake-fast": (0.8, 4.0),
+    "fake-strong": (3.0, 15.0)
+}
+
+ATTACK_PREFIXES = ("rule_", "mut_")
+
+
+class FakeUsage:
+    """Calls and tokens of one fake model, shared by its tool-bound copies"""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model driving the swagger, planner, executor and report agents"""
+
+    model_name: str = "fake-strong"
+    base_latency: float = 0.0
+    latency_per_1k_tokens: float = 0.0
+    temperature: float = 0.0
+    tool_names: List[str] = []
+    usage: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.usage is None:
+            self.usage = FakeUsage()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature, "tools": self.tool_names}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs) -> "ScriptedChatModel":
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def cost(self) -> float:
+        """USD spent at this model's prices"""
+        input_price, output_price = PRICES.get(self.model_name, (0.0, 0.0))
+        return (self.usage.input_tokens * input_price + self.usage.output_tokens * output_price) / 1_000_000
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        input_tokens = count_tokens_approximately(messages)
+        message = self._next_message(messages)
+        output_tokens = max(1, count_tokens_approximately([message]))
+        self.usage.record(input_tokens, output_tokens)
+        time.sleep(self.base_latency + self.latency_per_1k_tokens * input_tokens / 1000)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        tools = set(self.tool_names)
+        if "record_verdicts" in tools:
+            return _analysis_step(messages)
+        if "add_endpoint" in tools:
+            return _swagger_step(messages)
+        if "add_test_scenarios" in tools:
+            return _planner_step(messages)
+        if "http_request" in tools:
+            return _executor_step(messages)
+        return _report_step(messages)
+
+
+def _call(name: str, args: Dict[str, Any], call_id: str) -> Dict[str, Any]:
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+
+def _task(messages: List[BaseMessage]) -> str:
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+def _last_tool(messages: List[BaseMessage]) -> Optional[ToolMessage]:
+    return messages[-1] if messages and isinstance(messages[-1], ToolMessage) else None
+
+
+def _swagger_step(messages: List[BaseMessage]) -> AIMessage:
+    last = _last_tool(messages)
+    if last is None:
+        url = re.search(r"https?://\S+", _task(messages)).group(0)
+        return AIMessage(content="", tool_calls=[_call("get_swagger", {"url": url}, "swagger")])
+    if last.name == "get_swagger":
+        spec = json.loads(last.content)
+        calls = [
+            _call("add_endpoint", {"endpoint": f"{method.upper()} {path}"}, f"endpoint_{index}")
+            for index, (path, methods) in enumerate(spec.get("paths", {}).items())
+            for method in methods
+        ]
+        return AIMessage(content="", tool_calls=calls)
+    if last.name == "add_endpoint":
+        return AIMessage(content="", tool_calls=[_call("get_endpoints_count", {}, "count")])
+    return AIMessage(content="All endpoints extracted.")
+
+
+def _planner_step(messages: List[BaseMessage]) -> AIMessage:
+    last = _last_tool(messages)
+    if last is None:
+        return AIMessage(content="", tool_calls=[_call("get_endpoints", {}, "endpoints")])
+    if last.name == "get_endpoints":
+        task = _task(messages)
+        endpoints = json.loads(last.content)
+        if "Only create scenarios for these endpoints" in task:
+            listed = task.split("the rest: ", 1)[-1].split("already exist: ", 1)[-1]
+            allowed = {" ".join(item.split()[:2]) for item in listed.split(", ")}
+            endpoints = [e for e in endpoints if e in allowed]
+        scenarios = []
+        for endpoint in endpoints:
+            method, path = endpoint.split(" ", 1)
+            slug = re.sub(r"[^a-zA-Z0-9]+", "_", endpoint).strip("_").lower()
+            scenarios.append({
+                "id": f"llm_workflow_{slug}",
+                "description": f"Business Logic: Workflow bypass on {endpoint}",
+                "endpoint": path,
+                "method": method,
+                "payload": None,
+                "auth_token": "VALID_TOKEN"
+            })
+        return AIMessage(content="", tool_calls=[_call("add_test_scenarios", {"scenarios_data": scenarios}, "scenarios")])
+    return AIMessage(content="Planning complete.")
+
+
+def _chunk(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+    task = _task(messages)
+    if "Scenarios: " not in task:
+        return []
+    return json.loads(task.split("Scenarios: ", 1)[1].split("\n", 1)[0])
+
+
+def _request_for(messages: List[BaseMessage], call_id: str) -> Dict[str, Any]:
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                if tool_call["id"] == call_id:
+                    return tool_call["args"]
+    return {}
+
+
+def _executor_step(messages: List[BaseMessage]) -> AIMessage:
+    from tools.separate_state_tools import load_scenarios_state
+    from tools.separate_states import ScenariosState
+
+    base_url = re.search(r"against (https?://\S+?),? ", _task(messages)).group(1).rstrip(",")
+    last = _last_tool(messages)
+    if last is not None and last.name == "http_request":
+        scenario_id = last.tool_call_id.split(":", 1)[1]
+        status = re.match(r"\[?\(?(\d+|None)", last.content)
+        status_code = int(status.group(1)) if status and status.group(1).isdigit() else 0
+        success = 0 < status_code < 400
+        calls = [_call("add_test_result", {"result_data": {
+            "scenario_id": scenario_id, "status_code": status_code,
+            "response_body": last.content[:200], "success": success
+        }}, f"result:{scenario_id}")]
+        if success and scenario_id.startswith(ATTACK_PREFIXES):
+            request = _request_for(messages, last.tool_call_id)
+            calls.append(_call("add_vulnerability", {"vuln_data": {
+                "scenario_id": scenario_id, "type": scenario_id.split("_")[1],
+                "endpoint": f"{request.get('method')} {request.get('url')}", "severity": "HIGH",
+                "description": f"Attack scenario {scenario_id} was accepted", "evidence": last.content[:200]
+            }}, f"vuln:{scenario_id}"))
+        return AIMessage(content="", tool_calls=calls)
+
+    state = ScenariosState.from_json(load_scenarios_state()[1])
+    executed = {s.id for s in state.scenarios if s.executed}
+    if "analyzed in batches" in _task(messages):
+        # Every request of the chunk in one step, the analysis stage judges the responses
+        calls = [
+            _call("execute_scenario", dict(_scenario_request(scenario, base_url, "json_body"), scenario_id=scenario["id"]), f"exec:{scenario['id']}")
+            for scenario in _chunk(messages) if scenario["id"] not in executed
+        ]
+        return AIMessage(content="", tool_calls=calls) if calls else AIMessage(content="Chunk executed.")
+    for scenario in _chunk(messages):
+        if scenario["id"] in executed:
+            continue
+        return AIMessage(content="", tool_calls=[_call("http_request", _scenario_request(scenario, base_url), f"http:{scenario['id']}")])
+    return AIMessage(content="Chunk executed.")
+
+
+def _scenario_request(scenario: Dict[str, Any], base_url: str, body_argument: str = "json") -> Dict[str, Any]:
+    headers = {"Authorization": f"Token {scenario['auth_token']}"} if scenario.get("auth_token") else {}
+    args = {"method": scenario["method"], "url": base_url + scenario["endpoint"], "headers": headers}
+    if scenario.get("payload") is not None:
+        args[body_argument] = scenario["payload"]
+    return args
+
+
+def _analysis_step(messages: List[BaseMessage]) -> AIMessage:
+    """Verdicts for a batch of results, the same judgement the executor script applies per response"""
+    results = json.loads(_task(messages).split("Results: ", 1)[1])
+    verdicts = []
+    for result in results:
+        success = 0 < result["status_code"] < 400
+        verdict = {"scenario_id": result["scenario_id"], "success": success,
+                   "details": f"Responded {result['status_code']}", "vulnerable": False}
+        if success and result["scenario_id"].startswith(ATTACK_PREFIXES):
+            verdict["vulnerable"] = True
+            verdict["vulnerability"] = {
+                "type": result["scenario_id"].split("_")[1], "severity": "HIGH",
+                "description": f"Attack scenario {result['scenario_id']} was accepted", "evidence": result["response"][:200]
+            }
+        verdicts.append(verdict)
+    return AIMessage(content="", tool_calls=[_call("record_verdicts", {"verdicts": verdicts}, "verdicts")])
+
+
+def _report_step(messages: List[BaseMessage]) -> AIMessage:
+    last = _last_tool(messages)
+    if last is None:
+        return AIMessage(content="", tool_calls=[_call("check_execution_progress", {}, "progress")])
+    return AIMessage(content="Security assessment: see the vulnerabilities state for findings.\n" + last.content)
@@ -0,0 +1,172 @@
+"""
+Local deliberately vulnerable API used by the benchmarks.
+
+Serves its own OpenAPI document and has the business logic flaws the agents
+look for: profile IDOR, admin-flag mass assignment and negative membership
+amounts. extra_endpoints adds generic authenticated resources to scale the spec.
+"""
+
+import re
+import copy
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+USERS = {
+    "alice": {"username": "alice", "email": "alice@example.com", "admin": False, "balance": 100},
+    "bob": {"username": "bob", "email": "bob@example.com", "admin": False, "balance": 100}
+}
+
+
+def build_spec(extra_endpoints: int = 0) -> Dict[str, Any]:
+    """OpenAPI document of the mock target"""
+    auth = [{"Token": []}]
+    json_body = lambda properties: {"content": {"application/json": {"schema": {"type": "object", "properties": properties}}}}
+    paths: Dict[str, Any] = {
+        "/api/users/login": {"post": {"tags": ["users"], "requestBody": json_body({
+            "user": {"type": "object", "properties": {"username": {"type": "string"}, "password": {"type": "string"}}}
+        })}},
+        "/api/user": {
+            "get": {"tags": ["users"], "security": auth},
+            "put": {"tags": ["users"], "security": auth, "requestBody": json_body({
+                "user": {"type": "object", "properties": {"email": {"type": "string", "format": "email"}, "bio": {"type": "string"}}}
+            })}
+        },
+        "/api/profiles/{username}": {"get": {"tags": ["profiles"], "security": auth}},
+        "/api/membership": {"post": {"tags": ["billing"], "security": auth, "requestBody": json_body({
+            "plan": {"type": "string"}, "amount": {"type": "number"}
+        })}}
+    }
+    for index in range(extra_endpoints):
+        paths[f"/api/resources{index}/{{resource_id}}"] = {
+            "get": {"tags": [f"resources{index % 10}"], "security": auth}
+        }
+    return {"openapi": "3.0.0", "info": {"title": "Mock vulnerable API", "version": "1.0"}, "paths": paths}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockTarget"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    def _user(self) -> Optional[Dict[str, Any]]:
+        # Any token is accepted and maps to alice, the target only checks that one is present
+        header = self.headers.get("Authorization", "")
+        return self.server.users["alice"] if header.startswith("Token ") and len(header) > 6 else None
+
+    def _route(self, method: str):
+        self.server.count_request()
+        path = self.path.split("?", 1)[0]
+        body = self._body() if method in ("POST", "PUT", "PATCH") else {}
+
+        if path == "/openapi.json" and method == "GET":
+            return self._send(200, self.server.spec)
+        if path == "/api/users/login" and method == "POST":
+            return self._send(200, {"user": {"username": "alice", "token": "alice-token"}})
+
+        user = self._user()
+        if user is None:
+            return self._send(401, {"detail": "Authentication credentials were not provided"})
+
+        if path == "/api/user" and method == "GET":
+            return self._send(200, {"user": user})
+        if path == "/api/user" and method == "PUT":
+            # Mass assignment: every submitted field is bound, including admin
+            user.update(body.get("user") if isinstance(body.get("user"), dict) else body)
+            return self._send(200, {"user": user})
+        match = re.fullmatch(r"/api/profiles/([^/]+)", path)
+        if match and method == "GET":
+            # IDOR: any authenticated user reads any profile, email included
+            profile = self.server.users.get(match.group(1), {"username": match.group(1), "email": f"{match.group(1)}@example.com"})
+            return self._send(200, {"profile": profile})
+        if path == "/api/membership" and method == "POST":
+            amount = body.get("amount", 10)
+            if not isinstance(amount, (int, float)):
+                return self._send(422, {"detail": "amount must be a number"})
+            # Negative amounts credit the account instead of being rejected
+            user["balance"] = user.get("balance", 0) - amount
+            return self._send(200, {"membership": body.get("plan", "basic"), "balance": user["balance"]})
+        match = re.fullmatch(r"/api/resources(\d+)/([^/]+)", path)
+        if match and method == "GET" and int(match.group(1)) < self.server.extra_endpoints:
+            return self._send(200, {"id": match.group(2), "owner": "bob"})
+        return self._send(404, {"detail": "Not found"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class MockTarget(ThreadingHTTPServer):
+    """Vulnerable API served from a background thread, use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, extra_endpoints: int = 0, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.extra_endpoints = extra_endpoints
+        self.spec = build_spec(extra_endpoints)
+        self.users = copy.deepcopy(USERS)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    @property
+    def swagger_url(self) -> str:
+        return f"{self.base_url}/openapi.json"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self) -> "MockTarget":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    with MockTarget() as target:
+        print(f"Mock target listening on {target.base_url} (spec at {target.swagger_url})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single strong model vs. per-agent / per-step model tiering.
+
+Runs the full scan offline against the local mock target with scripted fake
+models whose latency and prices mimic a small fast model and a large one, and
+compares end-to-end wall time, model calls and cost.
+
+    python -m benchmarks.model_tiering --extra-endpoints 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_model import ScriptedChatModel
+from benchmarks.mock_target import MockTarget
+from utils.model import AGENT_TIERS, ROUTED, set_model, configure_model_tiers
+
+CONFIGURATIONS = {
+    "single-strong": {"swagger": "strong", "planner": "strong", "executor": "strong", "report": "strong"},
+    "tiered": {"swagger": "fast", "planner": "strong", "executor": ROUTED, "report": "strong"}
+}
+
+
+def fake_models(scale: float = 1.0) -> Dict[str, ScriptedChatModel]:
+    """Fake tier models, latencies scaled down so a run takes seconds"""
+    return {
+        "fast": ScriptedChatModel(model_name="fake-fast", base_latency=0.01 * scale, latency_per_1k_tokens=0.001 * scale),
+        "strong": ScriptedChatModel(model_name="fake-strong", base_latency=0.04 * scale, latency_per_1k_tokens=0.006 * scale)
+    }
+
+
+def run_configuration(name: str, extra_endpoints: int, scale: float) -> Dict[str, Any]:
+    """One full offline scan with the given tier configuration"""
+    from security_agent import run_security_test
+
+    models = fake_models(scale)
+    for tier, instance in models.items():
+        set_model(tier, instance)
+    configure_model_tiers(CONFIGURATIONS[name])
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir, MockTarget(extra_endpoints) as target:
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = run_security_test(target.swagger_url, target.base_url, use_plan_cache=False,
+                                           session_id=f"benchmark_{name}")
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "configuration": name,
+        "status": result["status"],
+        "seconds": elapsed,
+        "calls": {tier: instance.usage.calls for tier, instance in models.items()},
+        "input_tokens": sum(instance.usage.input_tokens for instance in models.values()),
+        "cost": sum(instance.cost() for instance in models.values()),
+        "target_requests": target.requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-model and tiered-model scans offline")
+    parser.add_argument("--extra-endpoints", type=int, default=10, help="Generic endpoints added to the mock spec")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier on the simulated model latency")
+    args = parser.parse_args()
+
+    defaults = dict(AGENT_TIERS)
+    results = []
+    try:
+        for name in CONFIGURATIONS:
+            results.append(run_configuration(name, args.extra_endpoints, args.latency_scale))
+    finally:
+        configure_model_tiers(defaults)
+
+    print(f"{'configuration':<15}{'status':<9}{'seconds':>9}{'fast calls':>12}{'strong calls':>14}{'input tok':>11}{'cost $':>10}")
+    for r in results:
+        print(f"{r['configuration']:<15}{r['status']:<9}{r['seconds']:>9.2f}{r['calls']['fast']:>12}"
+              f"{r['calls']['strong']:>14}{r['input_tokens']:>11}{r['cost']:>10.4f}")
+    baseline, tiered = results[0], results[1]
+    if baseline["cost"] and baseline["seconds"]:
+        print(f"\nTiering: {1 - tiered['seconds'] / baseline['seconds']:.0%} less wall time, "
+              f"{1 - tiered['cost'] / baseline['cost']:.0%} lower cost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the entry points.
+
+Imports each entry point in a fresh interpreter under `python -X importtime`,
+reports the total import time, the slowest modules and whether the heavy stacks
+(the provider SDK, ReportLab, the agent graphs) were loaded at import, and times
+`security_agent.py --help` end to end.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --save-baseline      # after an intended change
+    python -m benchmarks.startup --compare            # against the stored baseline
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "startup.json")
+# Slower than the baseline by more than this factor is flagged as a regression
+REGRESSION_FACTOR = 1.5
+ENTRY_POINTS = ("security_agent", "batch_scan", "scan_daemon", "queue_worker", "agents", "tools", "utils")
+# Modules that should only be imported once a scan actually needs them
+HEAVY_MODULES = ("langchain_anthropic", "reportlab", "langgraph.prebuilt")
+CLI_COMMAND = ["security_agent.py", "--help"]
+
+
+def import_times(module: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """Seconds to import module in a fresh interpreter, and (name, self, cumulative) seconds of every module it loaded"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    modules = []
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    total = next((cumulative for name, _, cumulative in modules if name == module), 0.0)
+    return total, modules
+
+
+def measure_entry_point(module: str, repeat: int) -> Dict[str, Any]:
+    """Median import time of an entry point, its slowest modules and the heavy modules it pulled in"""
+    runs = [import_times(module) for _ in range(repeat)]
+    total = statistics.median(run[0] for run in runs)
+    modules = runs[-1][1]
+    loaded = {name for name, _, _ in modules}
+    return {
+        "seconds": total,
+        "modules": len(modules),
+        "heavy_loaded": [heavy for heavy in HEAVY_MODULES if heavy in loaded],
+        "slowest": [{"module": name, "self": self_seconds, "cumulative": cumulative}
+                    for name, self_seconds, cumulative in sorted(modules, key=lambda m: m[1], reverse=True)[:5]]
+    }
+
+
+def measure_cli(repeat: int) -> float:
+    """Median wall time of the CLI's --help, interpreter start included"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable] + CLI_COMMAND, cwd=ROOT, capture_output=True, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, top: int = 3):
+    """Seconds per entry point, with the ratio to the baseline when comparing"""
+    print(f"{'entry point':<18}{'import s':>14}{'modules':>9}  heavy stacks loaded")
+    regressions = []
+    rows = [(name, result["seconds"], result) for name, result in results["entry_points"].items()]
+    rows.append(("cli --help", results["cli_seconds"], None))
+    for name, seconds, result in rows:
+        cell = f"{seconds:.3f}"
+        reference = (baseline or {}).get("cli_seconds") if result is None else \
+            ((baseline or {}).get("entry_points", {}).get(name) or {}).get("seconds")
+        if reference:
+            ratio = seconds / reference
+            cell += f" x{ratio:.2f}"
+            if ratio > REGRESSION_FACTOR:
+                regressions.append(f"{name}: {reference:.3f}s -> {seconds:.3f}s")
+        if result is None:
+            print(f"{name:<18}{cell:>14}")
+            continue
+        print(f"{name:<18}{cell:>14}{result['modules']:>9}  {', '.join(result['heavy_loaded']) or '-'}")
+        for slow in result["slowest"][:top]:
+            print(f"{'':<20}{slow['module']:<48}{slow['self'] * 1000:>8.1f}ms self")
+    if baseline is not None:
+        print("\n⚠️  Regressions:\n   " + "\n   ".join(regressions) if regressions else "\n✅ No regressions against the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the entry points")
+    parser.add_argument("--entry-points", default=",".join(ENTRY_POINTS), help="Comma-separated modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement, the median is reported")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these numbers as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Show ratios against the baseline and flag regressions")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"entry_points": {}}
+    for module in (m.strip() for m in args.entry_points.split(",") if m.strip()):
+        print(f"⏱️  Importing {module}...", file=sys.stderr)
+        results["entry_points"][module] = measure_entry_point(module, args.repeat)
+    print("⏱️  Running the CLI with --help...", file=sys.stderr)
+    results["cli_seconds"] = measure_cli(args.repeat)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        except FileNotFoundError:
+            print(f"⚠️  No baseline at {args.baseline}, run with --save-baseline first", file=sys.stderr)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\n💾 Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the state layer at increasing state sizes.
+
+Seeds synthetic endpoints, scenarios (half of them executed), results and
+vulnerabilities, then times the individual state operations of each backend:
+the separate JSON files of tools/separate_state_tools.py and the single
+current_state.json of the legacy tools/state_tools.py. PDF generation from the
+separate states is timed as well.
+
+    python -m benchmarks.state_layer --sizes 1000,10000,100000
+    python -m benchmarks.state_layer --save-baseline      # after an intended change
+    python -m benchmarks.state_layer --compare            # against the stored baseline
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import contextlib
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "state_layer.json")
+# Slower than the baseline by more than this factor is flagged as a regression
+REGRESSION_FACTOR = 1.25
+OPERATIONS = ("add_scenario", "add_result", "mark_executed", "summary", "pending", "progress", "load", "save", "pdf")
+
+
+def synthetic_state(size: int) -> Dict[str, List[Any]]:
+    """size scenarios over size / 10 endpoints, every other one executed with a result, 1% vulnerable"""
+    methods = ("GET", "POST", "PUT", "DELETE")
+    endpoints = [f"{methods[i % 4]} /api/resources{i}/{{resource_id}}" for i in range(max(1, size // 10))]
+    scenarios, results, vulnerabilities = [], [], []
+    for i in range(size):
+        method, path = endpoints[i % len(endpoints)].split(" ", 1)
+        executed = i % 2 == 0
+        scenario_id = f"rule_idor_{i}"
+        scenarios.append({
+            "id": scenario_id,
+            "description": f"IDOR: access resource {i} with another user's token",
+            "endpoint": path,
+            "method": method,
+            "payload": {"amount": -i, "plan": "premium"} if method in ("POST", "PUT") else None,
+            "auth_token": "USER_A_TOKEN_ACCESSING_USER_B_RESOURCE",
+            "executed": executed
+        })
+        if executed:
+            results.append({
+                "scenario_id": scenario_id,
+                "status_code": 200 if i % 4 == 0 else 403,
+                "response_body": json.dumps({"id": i, "owner": "bob", "email": "bob@example.com"}),
+                "success": i % 4 == 0,
+                "details": "Cross-user resource returned"
+            })
+        if i % 100 == 0:
+            vulnerabilities.append({
+                "scenario_id": scenario_id, "type": "IDOR", "endpoint": f"{method} {path}", "severity": "HIGH",
+                "description": f"Resource {i} of another user is readable", "evidence": "200 OK with bob's email"
+            })
+    return {"endpoints": endpoints, "scenarios": scenarios, "results": results, "vulnerabilities": vulnerabilities}
+
+
+def seed_separate(data: Dict[str, List[Any]]):
+    """Write the synthetic state as the separate state files"""
+    files = {
+        "endpoints_state.json": {"endpoints": data["endpoints"]},
+        "scenarios_state.json": {"scenarios": data["scenarios"]},
+        "results_state.json": {"results": data["results"]},
+        "vulnerabilities_state.json": {"vulnerabilities": data["vulnerabilities"]}
+    }
+    for path, content in files.items():
+        with open(path, "w") as f:
+            json.dump(content, f, indent=2)
+
+
+def seed_legacy(data: Dict[str, List[Any]]):
+    """Write the synthetic state as the legacy single state file"""
+    with open("current_state.json", "w") as f:
+        json.dump(dict(data, auth_tokens={}), f, indent=2)
+
+
+def _new_scenario(tag: str) -> Dict[str, Any]:
+    return {"id": f"bench_{tag}", "description": "Benchmark scenario", "endpoint": "/api/bench",
+            "method": "POST", "payload": {"amount": 1}, "auth_token": "VALID_TOKEN"}
+
+
+def _new_result(scenario_id: str) -> Dict[str, Any]:
+    return {"scenario_id": scenario_id, "status_code": 200, "response_body": "{}", "success": True}
+
+
+def separate_operations(size: int) -> Dict[str, Callable[[int], Any]]:
+    """Operation name -> callable(repetition) on the separate state files"""
+    from tools import separate_state_tools as tools
+    from agents.report_agent import generate_pdf_report_from_separate_states
+
+    def save(_):
+        status, state_json = tools.load_scenarios_state()
+        return tools.save_scenarios_state(state_json)
+
+    def pdf(_):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return generate_pdf_report_from_separate_states()
+
+    return {
+        "add_scenario": lambda rep: tools.add_test_scenario(_new_scenario(f"separate_{rep}")),
+        # Pending scenarios have odd indices, every repetition executes a different one
+        "add_result": lambda rep: tools.add_test_result(_new_result(f"rule_idor_{2 * rep + 1}")),
+        "mark_executed": lambda rep: tools.mark_scenario_executed(f"rule_idor_{size - 1 - 2 * rep}"),
+        "summary": lambda rep: tools.get_scenarios_summary(),
+        "pending": lambda rep: tools.get_pending_scenarios(10),
+        "progress": lambda rep: tools.check_execution_progress(),
+        "load": lambda rep: [tools.load_scenarios_state(), tools.load_results_state(), tools.load_vulnerabilities_state()],
+        "save": save,
+        "pdf": pdf
+    }
+
+
+def legacy_operations(size: int) -> Dict[str, Callable[[int], Any]]:
+    """Operation name -> callable(repetition) on the legacy single state file"""
+    from tools import state_tools as tools
+
+    def save(_):
+        status, state_json = tools.load_state()
+        return tools.save_state(state_json)
+
+    return {
+        "add_scenario": lambda rep: tools.add_test_scenario(_new_scenario(f"legacy_{rep}")),
+        # The legacy add_result marks the scenario executed, there is no separate mark operation
+        "add_result": lambda rep: tools.add_test_result(_new_result(f"rule_idor_{2 * rep + 1}")),
+        "summary": lambda rep: tools.get_state_summary(),
+        "pending": lambda rep: tools.get_pending_scenarios(),
+        "progress": lambda rep: tools.get_state_summary(),
+        "load": lambda rep: tools.load_state(),
+        "save": save
+    }
+
+
+BACKENDS = {
+    "separate": (seed_separate, separate_operations),
+    "legacy": (seed_legacy, legacy_operations)
+}
+
+
+def time_operation(operation: Callable[[int], Any], repeat: int) -> float:
+    """Median seconds of repeat calls"""
+    timings = []
+    for rep in range(repeat):
+        started = time.perf_counter()
+        operation(rep)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run_backend(backend: str, size: int, repeat: int, pdf_max_size: int) -> Dict[str, Optional[float]]:
+    """Seconds per operation of one backend at one state size, None where the backend has no such operation"""
+    seed, operations_for = BACKENDS[backend]
+    data = synthetic_state(size)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            seed(data)
+            operations = operations_for(size)
+            timings: Dict[str, Optional[float]] = {}
+            for name in OPERATIONS:
+                if name not in operations or (name == "pdf" and size > pdf_max_size):
+                    timings[name] = None
+                    continue
+                timings[name] = time_operation(operations[name], 1 if name == "pdf" else repeat)
+        finally:
+            os.chdir(cwd)
+    return timings
+
+
+def _key(backend: str, size: int) -> str:
+    return f"{backend}@{size}"
+
+
+def print_table(results: Dict[str, Dict[str, Optional[float]]], baseline: Optional[Dict[str, Any]] = None):
+    """Milliseconds per operation, with the ratio to the baseline when comparing"""
+    print(f"{'backend@size':<18}" + "".join(f"{name:>14}" for name in OPERATIONS))
+    regressions = []
+    for key, timings in results.items():
+        row = f"{key:<18}"
+        for name in OPERATIONS:
+            value = timings.get(name)
+            if value is None:
+                row += f"{'-':>14}"
+                continue
+            cell = f"{value * 1000:.1f}"
+            reference = ((baseline or {}).get(key) or {}).get(name)
+            if reference:
+                ratio = value / reference
+                cell += f" x{ratio:.2f}"
+                if ratio > REGRESSION_FACTOR:
+                    regressions.append(f"{key} {name}: {reference * 1000:.1f}ms -> {value * 1000:.1f}ms")
+            row += f"{cell:>14}"
+        print(row)
+    if baseline is not None:
+        print("\n⚠️  Regressions:\n   " + "\n   ".join(regressions) if regressions else "\n✅ No regressions against the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="State layer microbenchmarks on synthetic data")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated scenario counts")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per operation, the median is reported")
+    parser.add_argument("--pdf-max-size", type=int, default=10000, help="Skip PDF generation above this many scenarios")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these numbers as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Show ratios against the baseline and flag regressions")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Optional[float]]] = {}
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        for backend in (b.strip() for b in args.backends.split(",") if b.strip()):
+            print(f"⏱️  {backend} backend with {size} scenarios...", file=sys.stderr)
+            results[_key(backend, size)] = run_backend(backend, size, args.repeat, args.pdf_max_size)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        except FileNotFoundError:
+            print(f"⚠️  No baseline at {args.baseline}, run with --save-baseline first", file=sys.stderr)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\n💾 Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
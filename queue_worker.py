@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Executor worker for queue-backed execution.
+
+Leases scenarios from the work queue, runs the executor agent on them in a
+private state directory and commits each scenario's results, findings and
+queued responses back to the queue for the orchestrator. Leases are renewed
+while the agent runs; a scenario the agent did not record goes back to the
+queue for another attempt. The probes and tokens spent on a scan are committed
+to the queue as they happen, so all workers share the scan's budget, and the
+queue stops handing out a scan's scenarios once its budget is spent. Start as many as the target and model limits allow,
+on any host that sees the queue file:
+
+    python queue_worker.py --queue /shared/work_queue.sqlite --batch 5
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import HumanMessage
+
+from utils.budget import ScanBudget, BudgetCallbackHandler, BudgetExhausted, set_active_budget, reset_active_budget
+from utils.work_queue import SQLiteWorkQueue, DEFAULT_WORK_QUEUE_PATH, DEFAULT_LEASE_SECONDS
+
+DEFAULT_BATCH = 5
+DEFAULT_POLL_SECONDS = 2.0
+STATE_FILES = ("scenarios_state.json", "results_state.json", "vulnerabilities_state.json", "analysis_queue_state.json")
+
+
+def _reset_local_state():
+    for path in STATE_FILES:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _harvest(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per leased item, what the executor recorded for it in the local state"""
+    from tools.separate_state_tools import get_test_results, get_vulnerabilities, get_queued_responses
+
+    def loaded(call):
+        status, data = call()
+        return json.loads(data) if status == 200 else []
+
+    harvested: Dict[str, Dict[str, Any]] = {}
+    for result in loaded(get_test_results):
+        harvested.setdefault(result["scenario_id"], {"results": [], "vulnerabilities": [], "responses": []})["results"].append(result)
+    for response in loaded(get_queued_responses):
+        harvested.setdefault(response["scenario_id"], {"results": [], "vulnerabilities": [], "responses": []})["responses"].append(response)
+
+    ids = [item["item_id"] for item in items]
+    for vulnerability in loaded(get_vulnerabilities):
+        # Findings not tied to a scenario of this lease go with its first recorded scenario
+        owner = vulnerability.get("scenario_id") or vulnerability.get("id")
+        if owner not in harvested:
+            owner = next((scenario_id for scenario_id in ids if scenario_id in harvested), None)
+        if owner is not None:
+            harvested[owner]["vulnerabilities"].append(vulnerability)
+    return harvested
+
+
+class _LeaseKeeper(threading.Thread):
+    """Renews the worker's leases every third of the lease time while the agent runs"""
+
+    def __init__(self, work_queue: SQLiteWorkQueue, worker_id: str, items: List[Dict[str, Any]], lease_seconds: float):
+        super().__init__(daemon=True)
+        self.work_queue = work_queue
+        self.worker_id = worker_id
+        self.items = items
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                self.work_queue.renew(self.worker_id, self.items, self.lease_seconds)
+            except Exception as e:
+                print(f"⚠️  Could not renew leases: {e}")
+
+
+class _SharedBudget(ScanBudget):
+    """Budget of a scan shared by all workers: usage is committed to the queue and what is left is read back from it"""
+
+    def __init__(self, work_queue: SQLiteWorkQueue, scan_id: str):
+        super().__init__()
+        self.work_queue = work_queue
+        self.scan_id = scan_id
+
+    def record_request(self, count: int = 1):
+        super().record_request(count)
+        self.work_queue.record_usage(self.scan_id, requests=count)
+
+    def record_tokens(self, tokens: int):
+        super().record_tokens(tokens)
+        self.work_queue.record_usage(self.scan_id, tokens=tokens)
+
+    def exhausted(self, include_requests: bool = True) -> Optional[str]:
+        remaining = self.work_queue.remaining_budget(self.scan_id) or {}
+        if remaining.get("max_seconds") == 0:
+            return "time budget of the scan reached"
+        if include_requests and remaining.get("max_requests") == 0:
+            return "request budget of the scan reached"
+        if remaining.get("max_tokens") == 0:
+            return "token budget of the scan reached"
+        return None
+
+
+def execute_items(items: List[Dict[str, Any]], worker_id: str, lease_index: int, callbacks: List[Any],
+                  work_queue: SQLiteWorkQueue):
+    """Run the executor agent on leased scenarios against the base URL they were published with, within the scan budget"""
+    from agents import get_agent
+    from tools.separate_state_tools import add_test_scenarios
+    from utils.checkpointer import shared_checkpointer, prune_checkpoints
+    from security_agent import executor_chunk_message
+
+    # Items of one lease may come from different scans, each scan is its own invocation
+    by_scan: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        by_scan.setdefault(item["scan_id"], []).append(item)
+    for scan_id, scan_items in by_scan.items():
+        payload = scan_items[0]["payload"]
+        scenarios = [item["payload"]["scenario"] for item in scan_items]
+        add_test_scenarios(scenarios)
+        thread_id = f"{worker_id}:{lease_index}:{scan_id}"
+        budget = _SharedBudget(work_queue, scan_id)
+        config = {
+            "configurable": {"thread_id": thread_id},
+            "recursion_limit": 150,
+            "callbacks": callbacks + [BudgetCallbackHandler(budget)],
+            "metadata": {"phase": "executor", "agent": "executor_agent", "scan_id": scan_id,
+                         "scenarios": [scenario["id"] for scenario in scenarios]}
+        }
+        message = executor_chunk_message(scenarios, payload["base_url"], payload.get("batched", False), payload.get("identities"))
+        budget_token = set_active_budget(budget)
+        try:
+            get_agent("executor").invoke({"messages": [HumanMessage(content=message)]}, config)
+        except BudgetExhausted as e:
+            print(f"⏹️  Scan budget exhausted: {e}")
+        finally:
+            reset_active_budget(budget_token)
+            prune_checkpoints(shared_checkpointer, [thread_id], 0)
+
+
+def run_worker(queue_path: str = DEFAULT_WORK_QUEUE_PATH, worker_id: Optional[str] = None, batch: int = DEFAULT_BATCH,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS, scan_id: Optional[str] = None, idle_exit: float = 0.0,
+               poll_seconds: float = DEFAULT_POLL_SECONDS) -> Dict[str, int]:
+    """Lease, execute and commit until idle for idle_exit seconds (0 runs until interrupted); returns counters"""
+    from utils.accounting import UsageAccountant
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    work_queue = SQLiteWorkQueue(os.path.abspath(queue_path))
+    accountant = UsageAccountant()
+    stats = {"leases": 0, "completed": 0, "released": 0, "lost": 0}
+
+    # Local state only ever holds the scenarios of the current lease
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="queue_worker_")
+    os.chdir(workdir)
+    idle_since = time.monotonic()
+    print(f"👷 Worker {worker_id} polling {queue_path}")
+    try:
+        while True:
+            items = work_queue.lease(worker_id, batch, lease_seconds, scan_id)
+            if not items:
+                if idle_exit and time.monotonic() - idle_since >= idle_exit:
+                    break
+                time.sleep(poll_seconds)
+                continue
+
+            _reset_local_state()
+            keeper = _LeaseKeeper(work_queue, worker_id, items, lease_seconds)
+            keeper.start()
+            error = "no result recorded"
+            try:
+                execute_items(items, worker_id, stats["leases"], [accountant], work_queue)
+            except Exception as e:
+                error = f"executor failed: {e}"
+            finally:
+                keeper.stopped.set()
+            stats["leases"] += 1
+
+            harvested = _harvest(items)
+            for item in items:
+                recorded = harvested.get(item["item_id"])
+                if recorded and (recorded["results"] or recorded["responses"]):
+                    if work_queue.complete(worker_id, item, recorded):
+                        stats["completed"] += 1
+                    else:
+                        # The lease expired and another worker owns the scenario now
+                        stats["lost"] += 1
+                elif work_queue.release(worker_id, item, error):
+                    stats["released"] += 1
+            print(f"📦 Lease {stats['leases']}: {len(items)} scenarios, {stats['completed']} completed so far")
+            idle_since = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.chdir(cwd)
+        work_queue.close()
+
+    totals = accountant.totals()
+    print(f"👋 Worker {worker_id} done: {stats['completed']} completed, {stats['released']} released, "
+          f"{stats['lost']} lost leases, {totals['model_calls']} model calls")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execute queued security test scenarios")
+    parser.add_argument("--queue", default=DEFAULT_WORK_QUEUE_PATH, help="SQLite work queue shared with the orchestrator")
+    parser.add_argument("--worker-id", default=None, help="Lease owner name (default: host:pid)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Scenarios leased per executor invocation")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="Lease time, a worker silent for this long loses its scenarios to the next worker")
+    parser.add_argument("--scan-id", default=None, help="Only execute scenarios of this scan")
+    parser.add_argument("--idle-exit", type=float, default=0.0, help="Exit after this many seconds without work (0 never exits)")
+    args = parser.parse_args()
+
+    run_worker(args.queue, args.worker_id, args.batch, args.lease_seconds, args.scan_id, args.idle_exit)
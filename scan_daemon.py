@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Long-lived scan daemon with a local HTTP job API.
+
+Scans run in a pool of worker processes that are started once and reused, so
+the imports, compiled agent graphs, model clients, HTTP connection pools and LLM
+cache stay warm across jobs. Each job works in its own directory, just like a
+batch_scan.py target.
+
+    POST   /jobs               {"swagger_url", "base_url", "identities", "options"} -> 202 {"id", ...}
+                               (options: any of JOB_OPTIONS, the run_security_test keywords of the same name)
+    GET    /jobs               every job
+    GET    /jobs/<id>          status and, once finished, the summary row
+    DELETE /jobs/<id>          cancel: queued jobs never start, running ones stop at the next budget check
+    GET    /jobs/<id>/report   the PDF report of a finished job
+    GET    /health             workers and job counts
+
+    python scan_daemon.py --port 8765 --workers 4
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from batch_scan import init_worker, scan_target
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_JOBS_DIR = "scan_jobs"
+CANCEL_FILE = "CANCEL"
+# Options a job may set; paths, ports, session and queue settings stay under the daemon's control
+JOB_OPTIONS = frozenset({
+    "incremental", "rule_based", "planner_workers", "shard_by", "shard_size",
+    "max_seconds", "max_requests", "max_tokens", "phase_token_budgets",
+    "use_plan_cache", "plan_cache_ttl", "mutations_per_operation", "mutation_seed",
+    "executor_chunk_size", "max_executor_chunks", "analysis_batch_size", "analysis_batch_tokens",
+    "pipeline", "pipeline_queue_size"
+})
+
+
+class ScanDaemon:
+    """Job registry in front of a pool of warm scan workers"""
+
+    def __init__(self, workers: int = 2, jobs_dir: str = DEFAULT_JOBS_DIR, defaults: Optional[Dict[str, Any]] = None,
+                 model_tiers: Optional[Dict[str, str]] = None, mp_context=None):
+        self.workers = max(1, workers)
+        self.jobs_dir = os.path.abspath(jobs_dir)
+        self.defaults = dict(defaults or {})
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Any] = {}
+        # Jobs wait here rather than in the pool, which would already hand a few of them to its call queue
+        self._waiting: deque = deque()
+        self._lock = threading.Lock()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context,
+                                        initializer=init_worker, initargs=(model_tiers,))
+        # Start every worker now rather than on the first job, so the imports are paid before anyone waits
+        for future in [self.pool.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, target: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a scan of one target; returns the new job"""
+        if "swagger_url" not in target or "base_url" not in target:
+            raise ValueError("A job needs swagger_url and base_url")
+        options = target.get("options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("Job options must be an object")
+        unknown = sorted(set(options) - JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unsupported job options: {', '.join(unknown)}")
+        if target.get("identities") is not None and not isinstance(target["identities"], dict):
+            raise ValueError("Job identities must be an object")
+        job_id = uuid.uuid4().hex[:12]
+        target = dict(target, name=job_id, options=options)
+        # Applied after the job's options, which cannot point the scan elsewhere
+        overrides = {"session_id": job_id, "usage_report_path": "usage_report.json",
+                     "cancel_path": os.path.join(self.jobs_dir, job_id, CANCEL_FILE)}
+        os.makedirs(os.path.join(self.jobs_dir, job_id), exist_ok=True)
+
+        job = {"id": job_id, "status": "queued", "base_url": target["base_url"], "swagger_url": target["swagger_url"],
+               "submitted": time.time(), "finished": None, "cancel_requested": False, "summary": None}
+        with self._lock:
+            self.jobs[job_id] = job
+            self._waiting.append((job_id, target, overrides))
+        self._dispatch()
+        return self.status(job_id)
+
+    def _dispatch(self):
+        """Hand waiting jobs to the pool while a worker is free"""
+        started = []
+        with self._lock:
+            while self._waiting and len(self._futures) < self.workers:
+                job_id, target, overrides = self._waiting.popleft()
+                self.jobs[job_id]["status"] = "running"
+                self._futures[job_id] = self.pool.submit(scan_target, target, self.jobs_dir, self.defaults, overrides)
+                started.append(job_id)
+        for job_id in started:
+            self._futures[job_id].add_done_callback(lambda done, job_id=job_id: self._finish(job_id, done))
+
+    def _finish(self, job_id: str, future):
+        with self._lock:
+            del self._futures[job_id]
+            job = self.jobs[job_id]
+            job["finished"] = time.time()
+            try:
+                job["summary"] = future.result()
+                job["status"] = "cancelled" if job["cancel_requested"] else job["summary"]["status"]
+            except Exception as e:
+                # The worker process itself died, or the pool shut down
+                job["status"] = "error"
+                job["summary"] = {"error": str(e)}
+        self._dispatch()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, None if unknown"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job, or ask a running one to stop; None if unknown"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            waiting = [entry for entry in self._waiting if entry[0] == job_id]
+            if waiting:
+                self._waiting.remove(waiting[0])
+                job.update(status="cancelled", finished=time.time())
+            elif job["finished"] is None:
+                job["cancel_requested"] = True
+                open(os.path.join(self.jobs_dir, job_id, CANCEL_FILE), "w").close()
+        return self.status(job_id)
+
+    def report_path(self, job_id: str) -> Optional[str]:
+        """PDF of a finished job, None if there is none (yet)"""
+        job = self.status(job_id)
+        pdf_file = ((job or {}).get("summary") or {}).get("pdf_file")
+        return pdf_file if pdf_file and os.path.exists(pdf_file) else None
+
+    def health(self) -> Dict[str, Any]:
+        """Worker count and jobs per status"""
+        counts: Dict[str, int] = {}
+        for job_id in list(self.jobs):
+            status = self.status(job_id)["status"]
+            counts[status] = counts.get(status, 0) + 1
+        return {"status": "ok", "workers": self.workers, "jobs": counts}
+
+    def shutdown(self):
+        """Stop accepting work, cancel queued jobs and let running ones finish"""
+        with self._lock:
+            for job_id, _, _ in self._waiting:
+                self.jobs[job_id].update(status="cancelled", finished=time.time())
+            self._waiting.clear()
+        self.pool.shutdown(wait=True)
+
+
+def make_handler(daemon: ScanDaemon):
+    """HTTP request handler bound to a daemon"""
+
+    class JobHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Any, content_type: str = "application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self) -> Tuple[str, Optional[str], Optional[str]]:
+            parts = [part for part in self.path.split("?", 1)[0].split("/") if part]
+            return (parts[0] if parts else ""), (parts[1] if len(parts) > 1 else None), (parts[2] if len(parts) > 2 else None)
+
+        def do_GET(self):
+            resource, job_id, sub = self._route()
+            if resource == "health":
+                return self._send(200, daemon.health())
+            if resource != "jobs":
+                return self._send(404, {"error": "Not found"})
+            if job_id is None:
+                return self._send(200, [daemon.status(known) for known in list(daemon.jobs)])
+            job = daemon.status(job_id)
+            if job is None:
+                return self._send(404, {"error": f"Unknown job: {job_id}"})
+            if sub is None:
+                return self._send(200, job)
+            if sub == "report":
+                path = daemon.report_path(job_id)
+                if path is None:
+                    return self._send(409, {"error": f"No report for a job that is {job['status']}"})
+                with open(path, "rb") as f:
+                    return self._send(200, f.read(), "application/pdf")
+            return self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            resource, job_id, _ = self._route()
+            if resource != "jobs" or job_id is not None:
+                return self._send(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                target = json.loads(self.rfile.read(length) or b"{}")
+                return self._send(202, daemon.submit(target))
+            except (ValueError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+
+        def do_DELETE(self):
+            resource, job_id, _ = self._route()
+            if resource != "jobs" or job_id is None:
+                return self._send(404, {"error": "Not found"})
+            job = daemon.cancel(job_id)
+            if job is None:
+                return self._send(404, {"error": f"Unknown job: {job_id}"})
+            return self._send(200, job)
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return JobHandler
+
+
+def serve(daemon: ScanDaemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """HTTP server for the daemon's job API (call serve_forever on it)"""
+    return ThreadingHTTPServer((host, port), make_handler(daemon))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan daemon with a local HTTP job API")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=2, help="Scans run at once, each in a warm worker process")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOBS_DIR, help="One state directory per job is created here")
+    parser.add_argument("--model-tier", action="append", default=[], metavar="AGENT=TIER",
+                        help="Model tier of an agent in every job (fast, strong or routed)")
+    parser.add_argument("--llm-cache", default=None, help="SQLite cache of model calls shared by the jobs")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="Model requests per minute allowed for all jobs together")
+    parser.add_argument("--llm-tpm", type=float, default=None, help="Model tokens per minute allowed for all jobs together")
+    args = parser.parse_args()
+
+    defaults: Dict[str, Any] = {}
+    if args.llm_cache:
+        defaults["llm_cache_path"] = os.path.abspath(args.llm_cache)
+    if args.llm_rpm or args.llm_tpm:
+        defaults.update(llm_requests_per_minute=args.llm_rpm, llm_tokens_per_minute=args.llm_tpm,
+                        rate_limit_state_path=os.path.abspath(os.path.join(args.jobs_dir, "rate_limit.json")))
+
+    print(f"🚀 Starting {args.workers} scan workers...")
+    daemon = ScanDaemon(args.workers, args.jobs_dir, defaults, dict(item.split("=", 1) for item in args.model_tier) or None)
+    server = serve(daemon, args.host, args.port)
+    print(f"👂 Accepting scan jobs on http://{args.host}:{args.port}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down, waiting for running scans...")
+    finally:
+        server.server_close()
+        daemon.shutdown()
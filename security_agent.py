@@ -3,77 +3,816 @@
 Comprehensive API Security Testing Orchestrator with Separate State Management
 """
 
-from agents import swagger_agent, planner_agent, executor_agent, report_agent
+from agents import get_agent
 from agents.report_agent import generate_pdf_report_from_separate_states
+from agents.analysis_agent import BatchResultAnalyzer, DEFAULT_ANALYSIS_BATCH_TOKENS
 from langchain_core.messages import HumanMessage
-from tools.separate_state_tools import check_execution_progress, is_testing_complete
+from tools.separate_state_tools import (
+    check_execution_progress, is_testing_complete, get_pending_scenarios, add_test_scenarios, deduplicate_scenarios, get_endpoints, load_scenarios_state,
+    load_fingerprints_state, save_fingerprints_state, replace_endpoints, prune_operations,
+    add_test_result, add_vulnerability, queue_response, mark_scenario_executed
+)
+from tools.separate_states import FingerprintsState, ScenariosState, TestScenario
+from tools.openapi_model import parse_operations, fingerprint_operations
+from tools.spec_diff import diff_fingerprints, scenario_operation_key
+from tools.scenario_rules import rule_based_scenario_dicts, RULE_PREFIX
+from tools.payload_mutator import mutation_scenario_dicts
+from tools.plan_cache import load_plan_cache, save_plan_cache, plan_cache_key, DEFAULT_TTL_SECONDS
+from agents.planner_agent import PLANNER_PROMPT_VERSION
+from tools.swagger_tool import get_swagger
+from utils.sharding import shard_endpoints, shard_key, run_concurrently, merge_results
+from utils.pipeline import Pipeline, Stage, ToolInputStreamHandler, DEFAULT_QUEUE_SIZE
+from utils.budget import ScanBudget, BudgetCallbackHandler, PhaseBudgetCallbackHandler, BudgetExhausted, set_active_budget, reset_active_budget
+from utils.accounting import UsageAccountant
+from utils import metrics
+from utils.tracing import Tracer, TracingCallbackHandler, set_active_tracer
+from utils.model import PromptCacheCallbackHandler, configure_llm_cache, configure_model_tiers, configure_rate_limit
+from utils.llm_cache import DEFAULT_MAX_ENTRIES
+from utils.work_queue import SQLiteWorkQueue, DEFAULT_LEASE_SECONDS
+from queue_worker import run_worker, DEFAULT_BATCH
+from utils.checkpointer import create_checkpointer, prune_checkpoints, DEFAULT_CHECKPOINT_PATH, DEFAULT_KEEP_LAST
+import argparse
 import json
+import time
+import uuid
+import threading
+import multiprocessing
 
-def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000"):
+# Chunks in a row without any scenario being executed before the executor loop gives up
+MAX_STALLED_CHUNKS = 2
+# Seconds between two looks at the work queue while workers execute
+QUEUE_POLL_SECONDS = 1.0
+
+RULES_NOTE = (
+    " Rule-based scenarios (IDs starting with rule_) already cover unauthenticated access, "
+    "cross-user ID swaps, admin-flag mass assignment and negative amounts. "
+    "Focus only on novel business logic scenarios."
+)
+
+BATCHED_ANALYSIS_NOTE = (
+    " Responses are analyzed in batches: send every scenario with execute_scenario and do not call "
+    "add_test_result or add_vulnerability."
+)
+
+def warm_up():
+    """Compile every agent, create the model clients and load the PDF stack ahead of the first scan"""
+    from utils.model import MODEL_TIERS, get_model
+    import utils.pdf_generator  # noqa: F401
+
+    for name in ("swagger", "planner", "executor", "report"):
+        get_agent(name)
+    for tier in MODEL_TIERS:
+        get_model(tier)
+
+def load_operations(swagger_url: str):
+    """Fetch the spec and parse it into structured operations"""
+    spec_text = get_swagger(swagger_url)
+    try:
+        spec = json.loads(spec_text)
+    except json.JSONDecodeError:
+        raise ValueError(spec_text)
+    return parse_operations(spec)
+
+def prepare_incremental_scan(operations):
     """
-    Run comprehensive security testing using the four-agent workflow with separate state management
+    Diff the current spec against the fingerprints of the previous run.
+    Stale scenarios are pruned and the endpoints state is rebuilt from the spec.
+    """
+    current = fingerprint_operations(operations)
+    
+    status, state_json = load_fingerprints_state()
+    if status != 200:
+        raise RuntimeError(state_json)
+    previous = FingerprintsState.from_json(state_json).operations
+    
+    diff = diff_fingerprints(previous, current)
+    
+    # Added operations are pruned as well in case an older full scan left scenarios behind
+    status, data = prune_operations(diff.stale + diff.added, list(set(previous) | set(current)))
+    if status != 200:
+        raise RuntimeError(data)
+    
+    status, data = replace_endpoints([op.key for op in operations])
+    if status != 200:
+        raise RuntimeError(data)
+    
+    return diff, current
+
+def _testing_complete() -> bool:
+    """Check if the scenarios state has nothing left to execute"""
+    status, data = is_testing_complete()
+    return status == 200 and json.loads(data).get("testing_complete", False)
+
+def _stored_endpoints():
+    """Endpoints currently recorded in the endpoints state"""
+    status, data = get_endpoints()
+    return json.loads(data) if status == 200 else []
+
+def _store_plans(plan_cache, operations, planned_endpoints, known_keys) -> int:
+    """Cache the LLM-planned scenarios of each freshly planned operation.
+    
+    Scenarios are resolved against every known operation of the spec, so a concrete path planned for an
+    operation outside `operations` is never cached under one of theirs.
+    """
+    status, state_json = load_scenarios_state()
+    if status != 200:
+        return 0
+    
+    by_operation = {}
+    operation_keys = {op.key for op in operations} | set(known_keys)
+    for scenario in ScenariosState.from_json(state_json).scenarios:
+        if scenario.id.startswith(RULE_PREFIX):
+            # Rule-based scenarios are regenerated for free on every run
+            continue
+        by_operation.setdefault(scenario_operation_key(scenario, operation_keys), []).append(scenario)
+    
+    stored = 0
+    planned = set(planned_endpoints)
+    for op in operations:
+        if op.key in planned and by_operation.get(op.key):
+            # A re-planned operation keeps only its current plan, not those of earlier definitions
+            plan_cache.invalidate([op.key])
+            plan_cache.put(plan_cache_key(op.fingerprint(), PLANNER_PROMPT_VERSION), op.key, by_operation[op.key])
+            stored += 1
+    save_plan_cache(plan_cache)
+    return stored
+
+def _bind_checkpointer(agent, checkpointer):
+    """Copy of a compiled agent that saves to the given checkpointer"""
+    if getattr(agent, "checkpointer", None) is checkpointer:
+        return agent
+    return agent.copy({"checkpointer": checkpointer})
+
+def _pending_chunk(size: int):
+    """Next chunk of pending scenarios, highest risk first"""
+    status, data = get_pending_scenarios(size)
+    return json.loads(data) if status == 200 else []
+
+def _pending_ids() -> set:
+    """IDs of every unexecuted scenario, also once the budget is exhausted (unlike get_pending_scenarios)"""
+    status, data = load_scenarios_state()
+    if status != 200:
+        return set()
+    return {scenario.id for scenario in ScenariosState.from_json(data).get_pending_scenarios()}
+
+def _phase_handoff() -> str:
+    """Compact summary of the state store passed to the next phase instead of the previous conversation"""
+    status, data = check_execution_progress()
+    if status != 200:
+        return ""
+    progress = json.loads(data)
+    return " State hand-off: " + json.dumps(progress, separators=(",", ":"))
+
+def _identities_note(identities) -> str:
+    if not identities:
+        return ""
+    return ("Use these identities for the placeholder tokens instead of registering new users: "
+            + json.dumps(identities, separators=(",", ":")) + " ")
+
+def executor_chunk_message(chunk, base_url: str, batched: bool = False, identities: dict = None) -> str:
+    """Instruction for one executor invocation on exactly the given scenarios"""
+    if batched:
+        recording = "send each one with execute_scenario, the responses are analyzed in batches afterwards."
+    else:
+        recording = "record each one with add_test_result and every finding with add_vulnerability."
+    return (
+        f"Execute exactly these {len(chunk)} scenarios against {base_url}, {recording} "
+        "Do not fetch other scenarios, the orchestrator sends the next chunk. "
+        + _identities_note(identities) +
+        "Scenarios: " + json.dumps(chunk, separators=(",", ":"))
+    )
+
+def _apply_queued_results(work_queue, scan_id: str, budget: ScanBudget) -> int:
+    """Record what the queue workers committed in the state store and their usage in the budget; returns the scenarios recorded"""
+    requests, tokens = work_queue.take_usage(scan_id)
+    budget.record_request(requests)
+    budget.record_tokens(tokens)
+    completed = work_queue.take_completed(scan_id)
+    for scenario_id, recorded in completed:
+        for result in recorded.get("results", []):
+            add_test_result(result)
+        for vulnerability in recorded.get("vulnerabilities", []):
+            add_vulnerability(vulnerability)
+        for response in recorded.get("responses", []):
+            queue_response(response)
+        mark_scenario_executed(scenario_id)
+    return len(completed)
+
+def _invoke_within_budget(agent, inputs, config):
+    """Invoke an agent, returning None if the scan budget runs out mid-phase"""
+    try:
+        return agent.invoke(inputs, config)
+    except BudgetExhausted as e:
+        print(f"⏹️  Scan budget exhausted: {e}")
+        return None
+
+def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000", incremental: bool = False,
+                      rule_based: bool = True, planner_workers: int = 4, shard_by: str = "tag", shard_size: int = 10,
+                      max_seconds: float = None, max_requests: int = None, max_tokens: int = None,
+                      use_plan_cache: bool = True, plan_cache_ttl: float = DEFAULT_TTL_SECONDS,
+                      mutations_per_operation: int = 0, mutation_seed: int = 0,
+                      session_id: str = "security_test_session", checkpointer_backend: str = "memory",
+                      checkpoint_path: str = DEFAULT_CHECKPOINT_PATH, keep_checkpoints: int = DEFAULT_KEEP_LAST,
+                      executor_chunk_size: int = 10, max_executor_chunks: int = None,
+                      llm_cache_path: str = None, llm_cache_size: int = DEFAULT_MAX_ENTRIES,
+                      phase_token_budgets: dict = None, usage_report_path: str = "usage_report.json",
+                      llm_requests_per_minute: float = None, llm_tokens_per_minute: float = None,
+                      rate_limit_state_path: str = None, analysis_batch_size: int = 0,
+                      analysis_batch_tokens: int = DEFAULT_ANALYSIS_BATCH_TOKENS, pipeline: bool = False,
+                      pipeline_queue_size: int = DEFAULT_QUEUE_SIZE, identities: dict = None,
+                      work_queue_path: str = None, queue_workers: int = 0, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                      cancel_path: str = None, metrics_port: int = None, metrics_textfile: str = None,
+                      metrics_interval: float = metrics.DEFAULT_TEXTFILE_INTERVAL, trace_file: str = None):
+    """
+    Run comprehensive security testing using the four-agent workflow with separate state management.
+    With incremental=True only operations added or changed since the previous run are planned and executed.
+    With rule_based=True the standard vulnerability classes are expanded deterministically before the LLM planner runs.
+    Planning is sharded by tag or path prefix ("tag" / "path") and run on up to planner_workers concurrent planners.
+    Scenarios run highest risk first; execution stops cleanly once max_seconds, max_requests or max_tokens is reached
+    (or once a file appears at cancel_path).
+    With use_plan_cache=True operations whose definition is unchanged replay their cached scenarios instead of being re-planned.
+    With mutations_per_operation > 0 that many mutated request bodies per write operation are added (seeded by mutation_seed).
+    Agent checkpoints go to memory or to SQLite at checkpoint_path (checkpointer_backend="sqlite");
+    only the newest keep_checkpoints per thread are retained at each phase boundary (None keeps all).
+    Every phase and planner shard runs on its own "{session_id}:{run nonce}:{phase}" thread; only a compact state hand-off
+    passes between them. A re-run continues from the pending scenarios in the state files, never from old conversations.
+    The executor is fed executor_chunk_size pending scenarios per invocation, each on a fresh thread, until testing is complete
+    (or max_executor_chunks is reached); executor_chunk_size=0 hands it every scenario in a single invocation.
+    With llm_cache_path set, model calls are answered from an exact-match SQLite cache (at most llm_cache_size entries)
+    and the model runs at temperature 0 so repeated runs replay instead of calling the provider.
+    Tokens, latency and cost of every model and tool call are accounted per phase, agent, model and tool,
+    written to usage_report_path (None skips the file), also when the run fails, and returned under "usage";
+    phase_token_budgets ({"planner": 200000, ...}) stops a phase once it has used its own token allowance.
+    llm_requests_per_minute / llm_tokens_per_minute meter all model calls of the process (of every process sharing
+    rate_limit_state_path) at the provider limits, serving concurrent scans round-robin and backing off on 429s.
+    With analysis_batch_size > 0 the executor only sends requests and queues the responses; up to analysis_batch_size of them
+    (at most analysis_batch_tokens of input, less near the token budget) are then judged per model call.
+    With pipeline=True a full scan streams endpoints into planning and planned shards into execution over queues of
+    pipeline_queue_size items instead of running the phases back to back; risk order then only holds within a shard.
+    Incremental scans always run the phases in sequence, pipeline=True is ignored for them.
+    identities ({"user_a": {"token": "..."}, ...}) are handed to the executor for the placeholder tokens of the scenarios.
+    With work_queue_path set, pending scenarios are published to that SQLite queue and executed by queue_worker.py processes
+    (queue_workers of them started locally, more on any host sharing the file) under leases of lease_seconds.
+    Live progress (scenarios, request rate, HTTP and model latency, tokens, state I/O, vulnerabilities) is served in Prometheus
+    text format on 127.0.0.1:metrics_port/metrics and/or written to metrics_textfile every metrics_interval seconds.
+    With trace_file set, spans of the phases, agent steps, model and tool calls, HTTP probes and state I/O are appended
+    to that JSONL file (trace_report.py prints its critical path and top self-time contributors).
     """
     print("🚀 Starting Comprehensive API Security Testing")
     print("=" * 60)
     
-    # Configuration for shared memory
-    config = {
-        "configurable": {"thread_id": "security_test_session"},
-        "recursion_limit": 150
-    }
+    budget = ScanBudget(max_seconds=max_seconds, max_requests=max_requests, max_tokens=max_tokens, cancel_path=cancel_path)
     
-    try:
-        # PHASE 1: Swagger Analysis
-        print("🔍 PHASE 1: Swagger Analysis & Endpoint Discovery")
-        print("-" * 40)
+    # Checkpoint backend; the in-memory default is a fresh store per run, so a long-lived process
+    # (batch or daemon worker) does not keep the checkpoints of every scan it ran
+    checkpointer = create_checkpointer(checkpointer_backend, checkpoint_path)
+    swagger = _bind_checkpointer(get_agent("swagger"), checkpointer)
+    planner = _bind_checkpointer(get_agent("planner"), checkpointer)
+    executor = _bind_checkpointer(get_agent("executor"), checkpointer)
+    reporter = _bind_checkpointer(get_agent("report"), checkpointer)
+    
+    prompt_cache = PromptCacheCallbackHandler()
+    llm_cache = configure_llm_cache(llm_cache_path, llm_cache_size) if llm_cache_path else None
+    rate_limiter = None
+    if llm_requests_per_minute or llm_tokens_per_minute:
+        rate_limiter = configure_rate_limit(llm_requests_per_minute, llm_tokens_per_minute, rate_limit_state_path)
+    accountant = UsageAccountant()
+    phase_budget = PhaseBudgetCallbackHandler(accountant, phase_token_budgets)
+    callbacks = [BudgetCallbackHandler(budget), phase_budget, prompt_cache, accountant, metrics.MetricsCallbackHandler()]
+    
+    metrics.start_scan(session_id)
+    metrics_exporters = []
+    if metrics_port is not None:
+        metrics_exporters.append(metrics.MetricsServer(metrics_port).start())
+        print(f"📈 Metrics on http://127.0.0.1:{metrics_exporters[-1].port}/metrics")
+    if metrics_textfile:
+        metrics_exporters.append(metrics.TextfileExporter(metrics_textfile, metrics_interval).start())
+    
+    tracer = Tracer(trace_file) if trace_file else None
+    scan_span = None
+    if tracer is not None:
+        set_active_tracer(tracer)
+        callbacks.append(TracingCallbackHandler(tracer))
+        scan_span = tracer.start_span("scan", "scan", scan_id=session_id, base_url=base_url, swagger_url=swagger_url)
+        tracer.activate(scan_span)
+    
+    def analysis_tokens_left():
+        """Tokens the analysis stage may still use, None when unlimited"""
+        limits = []
+        if budget.max_tokens is not None:
+            limits.append(budget.max_tokens - budget.tokens)
+        if phase_budget.phase_budgets.get("analysis") is not None:
+            limits.append(phase_budget.phase_budgets["analysis"] - accountant.phase_tokens("analysis"))
+        return min(limits) if limits else None
+    
+    analyzer = None
+    if analysis_batch_size > 0:
+        analyzer = BatchResultAnalyzer(analysis_batch_size, analysis_batch_tokens, analysis_tokens_left)
+    execution_note = BATCHED_ANALYSIS_NOTE if analyzer is not None else ""
+    identities_note = _identities_note(identities)
+    
+    # Threads are unique per run, a reused session ID or checkpoint file never appends to an earlier run's conversations
+    run_nonce = uuid.uuid4().hex[:8]
+    
+    def phase_config(phase: str, shard=None, scenarios=None):
+        """Each phase and shard gets its own thread so agents never replay earlier conversations"""
+        thread_id = f"{session_id}:{run_nonce}:{phase}" if shard is None else f"{session_id}:{run_nonce}:{phase}:{shard}"
+        metadata = {"phase": phase, "agent": f"{phase}_agent", "scan_id": session_id}
+        if scenarios:
+            metadata["scenarios"] = scenarios
+        return {
+            "configurable": {"thread_id": thread_id},
+            "recursion_limit": 150,
+            "callbacks": callbacks,
+            "metadata": metadata
+        }
+    
+    def execute_chunk(chunk, chunk_index):
+        """Run the executor on one chunk of scenarios on its own thread.
         
-        swagger_result = swagger_agent.invoke({
-            "messages": [HumanMessage(content=f"Analyze the swagger file at {swagger_url} and extract ALL endpoints using the separate state management tools.")]
-        }, config)
+        Returns the agent result (None if the budget ran out), how many of the chunk were executed and the IDs still pending.
+        """
+        chunk_ids = [scenario["id"] for scenario in chunk]
+        chunk_message = executor_chunk_message(chunk, base_url, analyzer is not None, identities)
+        executor_config = phase_config("executor", chunk_index, chunk_ids)
+        result = _invoke_within_budget(executor, {
+            "messages": [HumanMessage(content=chunk_message)]
+        }, executor_config)
+        prune_checkpoints(checkpointer, [executor_config["configurable"]["thread_id"]], keep_checkpoints)
         
-        print("✅ Swagger analysis complete")
+        still_pending = _pending_ids()
+        executed = sum(1 for scenario_id in chunk_ids if scenario_id not in still_pending)
+        return result, executed, still_pending
+    
+    def run_pipelined_phases():
+        """Discovery, planning and execution (and analysis) as concurrent stages connected by bounded queues.
         
-        # Check endpoints discovered
+        Endpoints are streamed out of the swagger agent as it stores them, grouped into shards, planned by up to
+        planner_workers planners and every planned shard goes straight to the executor in chunks.
+        Returns (swagger_result, planner_result, executor_result, per-stage statistics).
+        """
         try:
-            progress_status, progress_data = check_execution_progress()
-            if progress_status == 200:
-                progress = json.loads(progress_data)
-                print(f"📋 Found {progress.get('endpoints_discovered', 0)} endpoints")
-            else:
-                print("📋 Could not retrieve endpoints count")
+            pipeline_operations = load_operations(swagger_url)
         except Exception as e:
-            print(f"📋 Error checking endpoints: {e}")
+            print(f"⚠️  Could not parse spec, rule-based generation, mutations and plan cache skipped: {e}")
+            pipeline_operations = []
+        by_key = {op.key: op for op in pipeline_operations}
+        tags = {op.key: op.tags for op in pipeline_operations}
+        plan_cache = load_plan_cache(plan_cache_ttl) if use_plan_cache and pipeline_operations else None
+        plan_cache_lock = threading.Lock()
+        outcome = {"swagger": None, "executor": None, "planner": [], "shards": 0, "chunks": 0, "executed": 0}
+        outcome_lock = threading.Lock()
         
-        # PHASE 2: Test Planning
-        print("\n🎯 PHASE 2: Security Test Planning")
-        print("-" * 40)
+        def discover(emit):
+            """Source: every endpoint is emitted as soon as the swagger agent has stored it"""
+            swagger_config = phase_config("swagger")
+            swagger_config["callbacks"] = callbacks + [ToolInputStreamHandler("add_endpoint", "endpoint", emit)]
+            outcome["swagger"] = swagger.invoke({
+                "messages": [HumanMessage(content=f"Analyze the swagger file at {swagger_url} and extract ALL endpoints using the separate state management tools.")]
+            }, swagger_config)
+            prune_checkpoints(checkpointer, [swagger_config["configurable"]["thread_id"]], keep_checkpoints)
+            # Endpoints the stream did not see (the shard stage drops repeats)
+            for endpoint in _stored_endpoints():
+                emit(endpoint)
+            print("✅ Swagger analysis complete")
         
-        planner_result = planner_agent.invoke({
-            "messages": [HumanMessage(content="Use the separate state management tools to read endpoints and create comprehensive security test scenarios.")]
-        }, config)
+        groups = {}
+        seen = set()
         
-        print("✅ Test planning complete")
+        def collect(endpoint, emit):
+            """Group streamed endpoints by tag or path prefix and pass on every group that fills a shard"""
+            if endpoint in seen:
+                return
+            seen.add(endpoint)
+            group = groups.setdefault(shard_key(endpoint, tags, shard_by), [])
+            group.append(endpoint)
+            if len(group) >= max(1, shard_size):
+                emit(list(group))
+                group.clear()
         
-        # Check scenarios created
-        try:
-            progress_status, progress_data = check_execution_progress()
-            if progress_status == 200:
-                progress = json.loads(progress_data)
-                print(f"📊 Created {progress.get('scenarios_planned', 0)} test scenarios")
-            else:
-                print("📊 Could not retrieve scenarios count")
-        except Exception as e:
-            print(f"📊 Error checking scenarios: {e}")
+        def flush_groups(emit):
+            for group in groups.values():
+                if group:
+                    emit(list(group))
         
-        # PHASE 3: Test Execution
-        print("\n⚡ PHASE 3: Security Test Execution")
-        print("-" * 40)
+        def plan(shard, emit):
+            """Rule-based, mutated, cached and LLM-planned scenarios of one shard, then its chunks to the executor"""
+            with outcome_lock:
+                index = outcome["shards"]
+                outcome["shards"] += 1
+            shard_operations = [by_key[endpoint] for endpoint in shard if endpoint in by_key]
+            if rule_based and shard_operations:
+                add_test_scenarios(rule_based_scenario_dicts(shard_operations))
+            if mutations_per_operation > 0 and shard_operations:
+                add_test_scenarios(mutation_scenario_dicts(shard_operations, mutations_per_operation, mutation_seed))
+            
+            to_plan = list(shard)
+            if plan_cache is not None:
+                cached, replayed = set(), []
+                for op in shard_operations:
+                    hit = plan_cache.get(plan_cache_key(op.fingerprint(), PLANNER_PROMPT_VERSION))
+                    if hit is not None:
+                        cached.add(op.key)
+                        replayed.extend(hit)
+                if replayed and add_test_scenarios(replayed)[0] == 200:
+                    to_plan = [endpoint for endpoint in shard if endpoint not in cached]
+            
+            stop_reason = budget.exhausted(include_requests=False) or phase_budget.exhausted("planner")
+            if to_plan and not stop_reason:
+                shard_message = (
+                    "Use the separate state management tools to create comprehensive security test scenarios. "
+                    "Only create scenarios for these endpoints, other planners cover the rest: " + ", ".join(to_plan)
+                ) + (RULES_NOTE if rule_based and shard_operations else "")
+                shard_config = phase_config("planner", index)
+                shard_result = _invoke_within_budget(planner, {"messages": [HumanMessage(content=shard_message)]}, shard_config)
+                prune_checkpoints(checkpointer, [shard_config["configurable"]["thread_id"]], keep_checkpoints)
+                with outcome_lock:
+                    outcome["planner"].append(shard_result)
+                if plan_cache is not None:
+                    with plan_cache_lock:
+                        _store_plans(plan_cache, shard_operations, to_plan, by_key)
+            deduplicate_scenarios()
+            
+            # The shard's scenarios, highest risk first; concrete paths resolve against every operation of the spec
+            # so a scenario belongs to the closest template even when that is in another shard
+            shard_endpoints_set = set(shard)
+            known = shard_endpoints_set | set(by_key)
+            pending = [s for s in _pending_chunk(0) if scenario_operation_key(TestScenario(**s), known) in shard_endpoints_set]
+            size = executor_chunk_size if executor_chunk_size > 0 else max(1, len(pending))
+            for start in range(0, len(pending), size):
+                emit(pending[start:start + size])
+        
+        def run_chunk(chunk, emit):
+            if budget.exhausted() or phase_budget.exhausted("executor"):
+                return
+            if max_executor_chunks is not None and outcome["chunks"] >= max_executor_chunks:
+                return
+            still_pending = _pending_ids()
+            chunk = [scenario for scenario in chunk if scenario["id"] in still_pending]
+            if not chunk:
+                return
+            chunk_started = time.time()
+            result, executed, still_pending = execute_chunk(chunk, outcome["chunks"])
+            outcome["chunks"] += 1
+            outcome["executed"] += executed
+            outcome["executor"] = result
+            print(f"📦 Chunk {outcome['chunks']}: {executed}/{len(chunk)} executed in {time.time() - chunk_started:.1f}s, "
+                  f"{len(still_pending)} pending")
+            if analyzer is not None:
+                emit(executed)
+        
+        def drain(emit):
+            """Scenarios no shard handed over, e.g. planned by a planner outside its own shard"""
+            stalled = 0
+            while stalled < MAX_STALLED_CHUNKS:
+                chunk = _pending_chunk(executor_chunk_size)
+                if not chunk or budget.exhausted() or phase_budget.exhausted("executor"):
+                    break
+                if max_executor_chunks is not None and outcome["chunks"] >= max_executor_chunks:
+                    break
+                executed_before = outcome["executed"]
+                run_chunk(chunk, emit)
+                stalled = stalled + 1 if outcome["executed"] == executed_before else 0
+        
+        pipeline_stages = Pipeline(discover, "swagger")
+        pipeline_stages.add_stage(Stage("shard", collect, flush=flush_groups, queue_size=max(pipeline_queue_size, shard_size)))
+        pipeline_stages.add_stage(Stage("planner", plan, workers=planner_workers, queue_size=pipeline_queue_size))
+        pipeline_stages.add_stage(Stage("executor", run_chunk, flush=drain, queue_size=pipeline_queue_size))
+        if analyzer is not None:
+            pipeline_stages.add_stage(Stage(
+                "analysis", lambda executed, emit: analyzer.run(lambda ids: phase_config("analysis", scenarios=ids), flush=False),
+                queue_size=pipeline_queue_size
+            ))
+        stats = pipeline_stages.run()
+        if plan_cache is not None:
+            save_plan_cache(plan_cache)
+        print(f"✅ Pipeline complete: {outcome['shards']} shards planned, {outcome['executed']} scenarios executed "
+              f"in {outcome['chunks']} chunks")
+        planner_result = {"shards": outcome["shards"], "succeeded": sum(1 for r in outcome["planner"] if r is not None), "errors": stats["planner"]["errors"]}
+        return outcome["swagger"], planner_result, outcome["executor"], stats
+    
+    def run_queued_execution():
+        """Publish the pending scenarios to the work queue and record what the workers commit until none are left"""
+        work_queue = SQLiteWorkQueue(work_queue_path)
+        payload = {"base_url": base_url, "batched": analyzer is not None, "identities": identities}
+        # Workers stop leasing once they spent what is left of the budget
+        published = work_queue.publish(session_id, [
+            (scenario["id"], dict(payload, scenario=scenario)) for scenario in _pending_chunk(0)
+        ], budget=budget.remaining())
+        print(f"📮 Published {published} scenarios to {work_queue_path}")
+        
+        workers = []
+        for index in range(queue_workers):
+            worker = multiprocessing.Process(target=run_worker, kwargs={
+                "queue_path": work_queue_path, "worker_id": f"{session_id}:worker{index}",
+                "batch": executor_chunk_size if executor_chunk_size > 0 else DEFAULT_BATCH,
+                "lease_seconds": lease_seconds, "scan_id": session_id, "idle_exit": lease_seconds
+            }, daemon=True)
+            worker.start()
+            workers.append(worker)
         
-        executor_result = executor_agent.invoke({
-            "messages": [HumanMessage(content=f"Use separate state management tools to read test scenarios and execute ALL of them against {base_url}. CRITICAL: You must execute ALL pending scenarios and verify completion using is_testing_complete.")]
-        }, config)
+        recorded = 0
+        stop_reason = None
+        try:
+            while True:
+                recorded += _apply_queued_results(work_queue, session_id, budget)
+                counts = work_queue.counts(session_id)
+                if counts["pending"] + counts["leased"] == 0:
+                    break
+                stop_reason = budget.exhausted()
+                if stop_reason:
+                    print(f"⏹️  Stopping execution: {stop_reason}, {work_queue.cancel(session_id)} scenarios withdrawn")
+                    break
+                if workers and not any(worker.is_alive() for worker in workers):
+                    print("⚠️  All local workers exited with scenarios left in the queue")
+                    break
+                time.sleep(QUEUE_POLL_SECONDS)
+        finally:
+            # Scenarios an interrupted worker still held are redelivered once their lease expires
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+            recorded += _apply_queued_results(work_queue, session_id, budget)
+            counts = work_queue.counts(session_id)
+            failures = work_queue.failures(session_id)
+            work_queue.close()
+        
+        print(f"✅ Queued execution complete: {recorded} scenarios recorded, {counts['redelivered']} redelivered, "
+              f"{counts['failed']} failed")
+        for scenario_id, error in list(failures.items())[:5]:
+            print(f"   • {scenario_id}: {error}")
+        return {"published": published, "recorded": recorded, "queue": counts}
+    
+    phase_clock = {"phase": None, "started": time.perf_counter(), "span": None}
+    
+    def start_phase(phase):
+        """Close the wall-clock timer of the running phase and start the next one"""
+        now = time.perf_counter()
+        if phase_clock["phase"] is not None:
+            accountant.record_phase(phase_clock["phase"], now - phase_clock["started"])
+        phase_clock.update(phase=phase, started=now)
+        metrics.set_phase(phase)
+        if tracer is not None:
+            if phase_clock["span"] is not None:
+                phase_clock["span"].end()
+            phase_clock["span"] = tracer.start_span(phase, "phase", scan_span.span_id) if phase is not None else None
+            tracer.activate(phase_clock["span"] or scan_span)
+    
+    spec_diff = None
+    current_fingerprints = None
+    operations = None
+    
+    budget_token = set_active_budget(budget)
+    try:
+        if incremental:
+            # PHASE 0: Spec Diff
+            start_phase("spec_diff")
+            print("🔁 PHASE 0: Spec Diff Against Previous Run")
+            print("-" * 40)
+            
+            operations = load_operations(swagger_url)
+            spec_diff, current_fingerprints = prepare_incremental_scan(operations)
+            print(f"➕ Added: {len(spec_diff.added)}  ✏️  Changed: {len(spec_diff.changed)}  "
+                  f"➖ Removed: {len(spec_diff.removed)}  💤 Unchanged: {len(spec_diff.unchanged)}")
+            print()
+            if pipeline:
+                print("ℹ️  Pipeline mode is disabled for incremental scans, running the phases in sequence")
         
-        print("✅ Test execution complete")
+        pipeline_stats = None
+        if pipeline and spec_diff is None:
+            # PHASES 1-3: Pipelined Discovery, Planning and Execution
+            start_phase("pipeline")
+            print("🌊 PHASES 1-3: Pipelined Discovery, Planning & Execution")
+            print("-" * 40)
+            swagger_result, planner_result, executor_result, pipeline_stats = run_pipelined_phases()
+            for stage, stage_stats in pipeline_stats.items():
+                if isinstance(stage_stats, dict):
+                    print(f"   • {stage}: busy {stage_stats['busy_seconds']}s, waiting {stage_stats.get('waiting_seconds', 0)}s, "
+                          f"blocked by the next stage {stage_stats['blocked_seconds']}s")
+            print(f"   Pipeline wall time {pipeline_stats['wall_seconds']}s")
+        else:
+            # PHASE 1: Swagger Analysis
+            start_phase("swagger")
+            print("🔍 PHASE 1: Swagger Analysis & Endpoint Discovery")
+            print("-" * 40)
+            
+            if incremental:
+                # Endpoints were already rebuilt from the parsed spec
+                swagger_result = None
+                print("✅ Endpoints refreshed from spec diff")
+            else:
+                swagger_config = phase_config("swagger")
+                swagger_result = swagger.invoke({
+                    "messages": [HumanMessage(content=f"Analyze the swagger file at {swagger_url} and extract ALL endpoints using the separate state management tools.")]
+                }, swagger_config)
+            
+                prune_checkpoints(checkpointer, [swagger_config["configurable"]["thread_id"]], keep_checkpoints)
+                print("✅ Swagger analysis complete")
+            
+            # Check endpoints discovered
+            try:
+                progress_status, progress_data = check_execution_progress()
+                if progress_status == 200:
+                    progress = json.loads(progress_data)
+                    print(f"📋 Found {progress.get('endpoints_discovered', 0)} endpoints")
+                else:
+                    print("📋 Could not retrieve endpoints count")
+            except Exception as e:
+                print(f"📋 Error checking endpoints: {e}")
+            
+            # PHASE 2: Test Planning
+            start_phase("planner")
+            print("\n🎯 PHASE 2: Security Test Planning")
+            print("-" * 40)
+            
+            if spec_diff is not None and not spec_diff.to_test:
+                planner_result = None
+                print("✅ No added or changed operations, reusing previous scenarios")
+            elif budget.exhausted(include_requests=False):
+                planner_result = None
+                print(f"⏹️  Skipping planning: {budget.exhausted(include_requests=False)}")
+            else:
+                target_operations = None
+                if rule_based or use_plan_cache or mutations_per_operation > 0:
+                    try:
+                        if operations is None:
+                            operations = load_operations(swagger_url)
+                        target_operations = operations
+                        if spec_diff is not None:
+                            target_operations = [op for op in operations if op.key in spec_diff.to_test]
+                    except Exception as e:
+                        print(f"⚠️  Could not parse spec, rule-based generation, mutations and plan cache skipped: {e}")
+            
+                rule_scenarios_added = 0
+                if rule_based and target_operations is not None:
+                    rules_status, rules_data = add_test_scenarios(rule_based_scenario_dicts(target_operations))
+                    if rules_status == 200:
+                        rule_scenarios_added = json.loads(rules_data)["scenarios_added"]
+                        print(f"⚙️  Generated {rule_scenarios_added} rule-based scenarios")
+                    else:
+                        print(f"⚠️  Rule-based generation failed: {rules_data}")
+            
+                if mutations_per_operation > 0 and target_operations is not None:
+                    mutations_status, mutations_data = add_test_scenarios(
+                        mutation_scenario_dicts(target_operations, mutations_per_operation, mutation_seed)
+                    )
+                    if mutations_status == 200:
+                        print(f"🧬 Generated {json.loads(mutations_data)['scenarios_added']} payload mutation scenarios")
+                    else:
+                        print(f"⚠️  Payload mutation failed: {mutations_data}")
+            
+                plan_cache = None
+                cached_operations = set()
+                if use_plan_cache and target_operations is not None:
+                    plan_cache = load_plan_cache(plan_cache_ttl)
+                    if spec_diff is not None and spec_diff.removed:
+                        plan_cache.invalidate(spec_diff.removed)
+                    replayed = []
+                    for op in target_operations:
+                        cached = plan_cache.get(plan_cache_key(op.fingerprint(), PLANNER_PROMPT_VERSION))
+                        if cached is not None:
+                            cached_operations.add(op.key)
+                            replayed.extend(cached)
+                    if replayed:
+                        replay_status, replay_data = add_test_scenarios(replayed)
+                        if replay_status != 200:
+                            print(f"⚠️  Plan cache replay failed: {replay_data}")
+                            cached_operations = set()
+                    print(f"♻️  Plan cache: {len(cached_operations)} hits, {len(target_operations) - len(cached_operations)} misses")
+            
+                rules_note = RULES_NOTE if rule_scenarios_added else ""
+                handoff = _phase_handoff()
+            
+                endpoints_to_plan = spec_diff.to_test if spec_diff is not None else _stored_endpoints()
+                endpoints_to_plan = [e for e in endpoints_to_plan if e not in cached_operations]
+                tags = {op.key: op.tags for op in operations} if operations else {}
+                shards = shard_endpoints(endpoints_to_plan, tags, by=shard_by, max_shard_size=shard_size)
+            
+                if not endpoints_to_plan:
+                    planner_result = None
+                    print("✅ Every endpoint was planned from cache")
+                elif planner_workers > 1 and len(shards) > 1:
+                    print(f"🧩 Planning {len(endpoints_to_plan)} endpoints in {len(shards)} shards with {planner_workers} workers")
+                
+                    def plan_shard(indexed_shard):
+                        index, shard = indexed_shard
+                        shard_message = (
+                            "Use the separate state management tools to create comprehensive security test scenarios. "
+                            "Only create scenarios for these endpoints, other planners cover the rest: " + ", ".join(shard)
+                        ) + rules_note + handoff
+                        shard_config = phase_config("planner", index)
+                        shard_result = _invoke_within_budget(planner, {"messages": [HumanMessage(content=shard_message)]}, shard_config)
+                        prune_checkpoints(checkpointer, [shard_config["configurable"]["thread_id"]], keep_checkpoints)
+                        return shard_result
+                
+                    planner_result = merge_results(run_concurrently(plan_shard, list(enumerate(shards)), planner_workers))
+                    for error in planner_result["errors"]:
+                        print(f"⚠️  Planner shard failed: {error}")
+                else:
+                    planner_message = "Use the separate state management tools to read endpoints and create comprehensive security test scenarios."
+                    if spec_diff is not None or cached_operations:
+                        planner_message += (
+                            " Only create scenarios for these endpoints, "
+                            "scenarios for all other endpoints already exist: " + ", ".join(endpoints_to_plan)
+                        )
+                    planner_message += rules_note + handoff
+                
+                    planner_config = phase_config("planner")
+                    planner_result = _invoke_within_budget(planner, {
+                        "messages": [HumanMessage(content=planner_message)]
+                    }, planner_config)
+                    prune_checkpoints(checkpointer, [planner_config["configurable"]["thread_id"]], keep_checkpoints)
+            
+                dedup_status, dedup_data = deduplicate_scenarios()
+                if dedup_status == 200 and json.loads(dedup_data)["duplicates_removed"]:
+                    print(f"🧹 Removed {json.loads(dedup_data)['duplicates_removed']} duplicate scenarios")
+            
+                if plan_cache is not None and endpoints_to_plan:
+                    stored = _store_plans(plan_cache, target_operations, endpoints_to_plan, [op.key for op in operations])
+                    print(f"💾 Cached plans for {stored} operations")
+            
+                print("✅ Test planning complete")
+            
+            # Check scenarios created
+            try:
+                progress_status, progress_data = check_execution_progress()
+                if progress_status == 200:
+                    progress = json.loads(progress_data)
+                    print(f"📊 Created {progress.get('scenarios_planned', 0)} test scenarios")
+                else:
+                    print("📊 Could not retrieve scenarios count")
+            except Exception as e:
+                print(f"📊 Error checking scenarios: {e}")
+            
+            # PHASE 3: Test Execution
+            start_phase("executor")
+            print("\n⚡ PHASE 3: Security Test Execution")
+            print("-" * 40)
+            
+            if spec_diff is not None and not spec_diff.to_test and _testing_complete():
+                executor_result = None
+                print("✅ Carried forward results for unchanged operations")
+            elif budget.exhausted():
+                executor_result = None
+                print(f"⏹️  Skipping execution: {budget.exhausted()}")
+            elif work_queue_path:
+                executor_result = run_queued_execution()
+            elif executor_chunk_size <= 0:
+                executor_config = phase_config("executor")
+                executor_result = _invoke_within_budget(executor, {
+                    "messages": [HumanMessage(content=f"Use separate state management tools to read test scenarios and execute ALL of them against {base_url}. CRITICAL: You must execute ALL pending scenarios and verify completion using is_testing_complete." + execution_note + (" " + identities_note if identities_note else "") + _phase_handoff())]
+                }, executor_config)
+            
+                prune_checkpoints(checkpointer, [executor_config["configurable"]["thread_id"]], keep_checkpoints)
+                print("✅ Test execution complete")
+            else:
+                executor_result = None
+                execution_started = time.time()
+                executed_total = 0
+                chunk_index = 0
+                stalled = 0
+            
+                while max_executor_chunks is None or chunk_index < max_executor_chunks:
+                    stop_reason = budget.exhausted() or phase_budget.exhausted("executor")
+                    if stop_reason:
+                        print(f"⏹️  Stopping execution: {stop_reason}")
+                        break
+                    chunk = _pending_chunk(executor_chunk_size)
+                    if not chunk:
+                        break
+                
+                    chunk_started = time.time()
+                    executor_result, executed, still_pending = execute_chunk(chunk, chunk_index)
+                    executed_total += executed
+                    chunk_seconds = time.time() - chunk_started
+                    total_seconds = time.time() - execution_started
+                    print(f"📦 Chunk {chunk_index + 1}: {executed}/{len(chunk)} executed in {chunk_seconds:.1f}s "
+                          f"({executed / chunk_seconds if chunk_seconds else 0:.2f}/s), {len(still_pending)} remaining, "
+                          f"overall {executed_total / total_seconds if total_seconds else 0:.2f} scenarios/s")
+                    chunk_index += 1
+                
+                    if analyzer is not None:
+                        # Full batches are judged as they fill up so findings can re-rank the remaining scenarios
+                        analyzer.run(lambda ids: phase_config("analysis", scenarios=ids), flush=False)
+                
+                    if executor_result is None:
+                        # Budget ran out mid-chunk
+                        break
+                    stalled = stalled + 1 if executed == 0 else 0
+                    if stalled >= MAX_STALLED_CHUNKS:
+                        print(f"⚠️  No progress in {stalled} consecutive chunks, stopping execution")
+                        break
+            
+                print(f"✅ Test execution complete: {executed_total} scenarios in {chunk_index} chunks")
+            
+        if analyzer is not None:
+            start_phase("analysis")
+            print("\n🧪 PHASE 3b: Batched Result Analysis")
+            print("-" * 40)
+            analyzer.run(lambda ids: phase_config("analysis", scenarios=ids))
+            analysis_stats = analyzer.to_dict()
+            print(f"✅ {analysis_stats['results_analyzed']} results judged in {analysis_stats['model_calls']} model calls "
+                  f"({analysis_stats['results_per_call']} per call), {analysis_stats['vulnerabilities']} vulnerabilities")
         
         # Verify execution completion
         try:
@@ -84,23 +823,32 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
                     print("🔒 All scenarios executed successfully")
                 else:
                     print(f"⚠️  Testing incomplete: {completion.get('scenarios_remaining', 0)} scenarios remaining")
-                    print("   You may need to run executor agent again")
+                    print("   Re-run with the same --session-id to continue where execution stopped")
             else:
                 print("⚠️  Could not verify testing completion")
         except Exception as e:
             print(f"⚠️  Error checking completion: {e}")
         
         # PHASE 4: Vulnerability Reporting
+        start_phase("report")
         print("\n📊 PHASE 4: Vulnerability Analysis & Reporting")
         print("-" * 40)
         
-        report_result = report_agent.invoke({
-            "messages": [HumanMessage(content="Use separate state management tools to read all test results and vulnerabilities. Generate a comprehensive security assessment report and verify testing completion.")]
-        }, config)
-        
-        print("✅ Vulnerability report generated")
+        if budget.exhausted(include_requests=False):
+            # The PDF below is still built from whatever was executed within the budget
+            report_result = None
+            print(f"⏹️  Skipping analysis report: {budget.exhausted(include_requests=False)}")
+        else:
+            report_config = phase_config("report")
+            report_result = _invoke_within_budget(reporter, {
+                "messages": [HumanMessage(content="Use separate state management tools to read all test results and vulnerabilities. Generate a comprehensive security assessment report and verify testing completion." + _phase_handoff())]
+            }, report_config)
+            
+            prune_checkpoints(checkpointer, [report_config["configurable"]["thread_id"]], keep_checkpoints)
+            print("✅ Vulnerability report generated")
         
         # PHASE 5: PDF Report Generation
+        start_phase("pdf")
         print("\n📄 PHASE 5: PDF Report Generation")
         print("-" * 40)
         
@@ -116,6 +864,7 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
             pdf_file = None
         
         # PHASE 6: Final Summary
+        start_phase(None)
         print("\n🏁 PHASE 6: Final Summary")
         print("-" * 40)
         
@@ -153,6 +902,27 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
         except Exception as e:
             print(f"\n⚠️  Error retrieving final statistics: {e}")
         
+        if llm_cache is not None:
+            cache_stats = llm_cache.to_dict()
+            print(f"\n💾 LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['entries']} entries stored)")
+        if prompt_cache.calls:
+            cache_stats = prompt_cache.to_dict()
+            print(f"\n🧊 Prompt cache: {cache_stats['hit_rate']:.0%} of input tokens served from cache "
+                  f"({cache_stats['cache_read_tokens']} read, {cache_stats['cache_creation_tokens']} written over {cache_stats['model_calls']} calls)")
+        
+        usage = accountant.to_dict()
+        totals = usage["totals"]
+        print(f"\n💰 USAGE: {totals['input_tokens']} input / {totals['output_tokens']} output tokens, "
+              f"{totals['model_calls']} model calls, ${totals['cost_usd']:.4f}")
+        for phase, phase_totals in usage["by_phase"].items():
+            print(f"   • {phase}: {phase_totals['input_tokens'] + phase_totals['output_tokens']} tokens, "
+                  f"{phase_totals['model_calls']} model calls ({phase_totals['model_seconds']:.1f}s), "
+                  f"{phase_totals['tool_calls']} tool calls ({phase_totals['tool_seconds']:.1f}s), "
+                  f"${phase_totals['cost_usd']:.4f}, {usage['phase_seconds'].get(phase, 0):.1f}s wall")
+        if rate_limiter is not None:
+            limit_stats = rate_limiter.to_dict()
+            print(f"   Rate limiter held back {limit_stats['throttled_calls']} calls for {limit_stats['waited_seconds']}s")
+        
         print(f"\n💡 Detailed PDF report available: {pdf_file if pdf_file else 'Generation failed'}")
         print("🔒 Security assessment ready for management review!")
         print("\n📝 The new separate state system provides:")
@@ -160,6 +930,12 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
         print("   • Clear execution progress tracking")
         print("   • Easy verification of testing completion")
         
+        if current_fingerprints is not None:
+            # Only remember the spec once the run went through, so a failed run is retried in full
+            fingerprints = FingerprintsState()
+            fingerprints.set_fingerprints(current_fingerprints)
+            save_fingerprints_state(fingerprints.to_json())
+        
         return {
             "status": "success",
             "phases_completed": ["swagger_analysis", "planning", "execution", "reporting", "pdf_generation"],
@@ -167,7 +943,15 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
             "planner_result": planner_result,
             "executor_result": executor_result,
             "report_result": report_result,
-            "pdf_file": pdf_file
+            "pdf_file": pdf_file,
+            "spec_diff": spec_diff.to_dict() if spec_diff is not None else None,
+            "budget": budget.to_dict(),
+            "prompt_cache": prompt_cache.to_dict(),
+            "llm_cache": llm_cache.to_dict() if llm_cache is not None else None,
+            "usage": usage,
+            "rate_limit": rate_limiter.to_dict() if rate_limiter is not None else None,
+            "analysis": analyzer.to_dict() if analyzer is not None else None,
+            "pipeline": pipeline_stats
         }
         
     except Exception as e:
@@ -175,14 +959,135 @@ def run_security_test(swagger_url: str, base_url: str = "http://localhost:8000")
         print("💡 This might be due to API connectivity or configuration issues.")
         import traceback
         traceback.print_exc()
-        return {"status": "error", "error": str(e)}
+        return {"status": "error", "error": str(e), "budget": budget.to_dict(), "usage": accountant.to_dict()}
+    finally:
+        reset_active_budget(budget_token)
+        if usage_report_path:
+            # A failed run paid for its model calls too
+            try:
+                accountant.write_json(usage_report_path)
+                print(f"   Usage report written to {usage_report_path}")
+            except OSError as e:
+                print(f"⚠️  Could not write the usage report: {e}")
+        for exporter in metrics_exporters:
+            exporter.stop()
+        if tracer is not None:
+            # A phase still open here is the one that raised
+            failed = phase_clock["span"] is not None
+            if failed:
+                phase_clock["span"].end(error="scan failed")
+            scan_span.end(error="scan failed" if failed else None)
+            tracer.close()
+            set_active_tracer(None)
+            print(f"🧭 {tracer.spans_written} trace spans written to {trace_file}")
 
 if __name__ == "__main__":
-    # Run the security test
-    swagger_url = "http://localhost:8000/openapi.json"
-    base_url = "http://localhost:8000"
+    parser = argparse.ArgumentParser(description="Business logic security testing for OpenAPI services")
+    parser.add_argument("--swagger-url", default="http://localhost:8000/openapi.json", help="URL of the OpenAPI/Swagger spec")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Base URL of the API under test")
+    parser.add_argument("--incremental", action="store_true", help="Only test operations added or changed since the previous run")
+    parser.add_argument("--no-rules", action="store_true", help="Leave the standard vulnerability classes to the LLM planner")
+    parser.add_argument("--planner-workers", type=int, default=4, help="Concurrent planner runs (1 plans in a single conversation)")
+    parser.add_argument("--shard-by", choices=["tag", "path"], default="tag", help="How endpoints are grouped into planner shards")
+    parser.add_argument("--shard-size", type=int, default=10, help="Maximum endpoints per planner shard")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Wall-clock budget for the run")
+    parser.add_argument("--max-requests", type=int, default=None, help="Maximum HTTP probes sent to the target")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Maximum model tokens (input + output)")
+    parser.add_argument("--cancel-file", default=None, help="Stop the scan cleanly as soon as this file exists")
+    parser.add_argument("--no-plan-cache", action="store_true", help="Always re-plan instead of replaying cached scenarios")
+    parser.add_argument("--plan-cache-ttl", type=float, default=DEFAULT_TTL_SECONDS, help="Seconds a cached plan stays valid")
+    parser.add_argument("--clear-plan-cache", action="store_true", help="Invalidate every cached plan before running")
+    parser.add_argument("--mutations", type=int, default=0, help="Mutated request bodies to add per write operation")
+    parser.add_argument("--mutation-seed", type=int, default=0, help="Seed for reproducible mutation sampling")
+    parser.add_argument("--session-id", default="security_test_session", help="Scan ID of checkpoint threads, metrics and the work queue")
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], default="memory", help="Where agent checkpoints are kept")
+    parser.add_argument("--checkpoint-path", default=DEFAULT_CHECKPOINT_PATH, help="SQLite file for --checkpointer sqlite")
+    parser.add_argument("--keep-checkpoints", type=int, default=DEFAULT_KEEP_LAST, help="Checkpoints kept per thread at phase boundaries")
+    parser.add_argument("--executor-chunk-size", type=int, default=10, help="Pending scenarios per executor invocation (0 sends all at once)")
+    parser.add_argument("--max-executor-chunks", type=int, default=None, help="Upper bound on executor invocations")
+    parser.add_argument("--llm-cache", nargs="?", const="llm_cache.sqlite", default=None, metavar="PATH",
+                        help="Replay identical model calls from a SQLite cache (temperature is pinned to 0)")
+    parser.add_argument("--llm-cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Cached responses kept before LRU eviction")
+    parser.add_argument("--model-tier", action="append", default=[], metavar="AGENT=TIER",
+                        help="Model tier per agent: fast, strong or routed (per step), e.g. --model-tier swagger=fast")
+    parser.add_argument("--phase-token-budget", action="append", default=[], metavar="PHASE=TOKENS",
+                        help="Token allowance of one phase (swagger, planner, executor, analysis, report)")
+    parser.add_argument("--usage-report", default="usage_report.json", help="Where the token/latency/cost accounting is written")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="Model requests per minute allowed by the provider")
+    parser.add_argument("--llm-tpm", type=float, default=None, help="Model tokens per minute allowed by the provider")
+    parser.add_argument("--rate-limit-file", default=None, help="Share the model rate limit with other processes through this file")
+    parser.add_argument("--analysis-batch-size", type=int, default=0,
+                        help="Judge up to this many executed responses per model call (0 lets the executor judge each one)")
+    parser.add_argument("--analysis-batch-tokens", type=int, default=DEFAULT_ANALYSIS_BATCH_TOKENS,
+                        help="Input tokens of responses sent per analysis call")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Stream endpoints into planning and planned scenarios into execution instead of running the phases back to back "
+                             "(full scans only, not with --incremental)")
+    parser.add_argument("--work-queue", default=None,
+                        help="Execute through this SQLite work queue with queue_worker.py processes instead of in-process")
+    parser.add_argument("--queue-workers", type=int, default=0, help="Queue workers started locally (others may join from other hosts)")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="Seconds a worker may hold scenarios without renewing before they are redelivered")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve live Prometheus metrics on this local port")
+    parser.add_argument("--metrics-textfile", default=None, help="Also write the metrics to this file (node_exporter textfile collector)")
+    parser.add_argument("--metrics-interval", type=float, default=metrics.DEFAULT_TEXTFILE_INTERVAL,
+                        help="Seconds between two writes of --metrics-textfile")
+    parser.add_argument("--trace-file", default=None, help="Append tracing spans of the run to this JSONL file")
+    parser.add_argument("--pipeline-queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Items buffered between pipeline stages before the producing stage waits")
+    args = parser.parse_args()
+    if args.pipeline and args.incremental:
+        parser.error("--pipeline cannot be combined with --incremental, incremental scans run the phases in sequence")
+    
+    if args.model_tier:
+        configure_model_tiers(dict(item.split("=", 1) for item in args.model_tier))
     
-    result = run_security_test(swagger_url, base_url)
+    if args.clear_plan_cache:
+        plan_cache = load_plan_cache(args.plan_cache_ttl)
+        print(f"🗑️  Cleared {plan_cache.clear()} cached plans")
+        save_plan_cache(plan_cache)
+    
+    # Run the security test
+    result = run_security_test(
+        args.swagger_url, args.base_url,
+        incremental=args.incremental,
+        rule_based=not args.no_rules,
+        planner_workers=args.planner_workers,
+        shard_by=args.shard_by,
+        shard_size=args.shard_size,
+        max_seconds=args.max_seconds,
+        max_requests=args.max_requests,
+        max_tokens=args.max_tokens,
+        cancel_path=args.cancel_file,
+        use_plan_cache=not args.no_plan_cache,
+        plan_cache_ttl=args.plan_cache_ttl,
+        mutations_per_operation=args.mutations,
+        mutation_seed=args.mutation_seed,
+        session_id=args.session_id,
+        checkpointer_backend=args.checkpointer,
+        checkpoint_path=args.checkpoint_path,
+        keep_checkpoints=args.keep_checkpoints,
+        executor_chunk_size=args.executor_chunk_size,
+        max_executor_chunks=args.max_executor_chunks,
+        llm_cache_path=args.llm_cache,
+        llm_cache_size=args.llm_cache_size,
+        phase_token_budgets={phase: int(tokens) for phase, tokens in (item.split("=", 1) for item in args.phase_token_budget)},
+        usage_report_path=args.usage_report,
+        llm_requests_per_minute=args.llm_rpm,
+        llm_tokens_per_minute=args.llm_tpm,
+        rate_limit_state_path=args.rate_limit_file,
+        analysis_batch_size=args.analysis_batch_size,
+        analysis_batch_tokens=args.analysis_batch_tokens,
+        pipeline=args.pipeline,
+        pipeline_queue_size=args.pipeline_queue_size,
+        work_queue_path=args.work_queue,
+        queue_workers=args.queue_workers,
+        lease_seconds=args.lease_seconds,
+        metrics_port=args.metrics_port,
+        metrics_textfile=args.metrics_textfile,
+        metrics_interval=args.metrics_interval,
+        trace_file=args.trace_file
+    )
     
     print(f"\n🏁 Final Status: {result['status'].upper()}")
     if result["status"] == "success":
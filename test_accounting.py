@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Simple test script for usage accounting and per-phase token budgets
+"""
+
+import os
+import json
+import uuid
+import tempfile
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from utils.accounting import UsageAccountant, call_cost
+from utils.budget import PhaseBudgetCallbackHandler, BudgetExhausted
+
+def _model_call(accountant, phase, agent, model, input_tokens, output_tokens, cache_read=0):
+    """Feed one model call through the accountant's callbacks"""
+    run_id = uuid.uuid4()
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+             "input_token_details": {"cache_read": cache_read}}
+    accountant.on_chat_model_start({}, [[]], run_id=run_id, metadata={"phase": phase, "agent": agent, "ls_model_name": model})
+    accountant.on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="", usage_metadata=usage))]]),
+                          run_id=run_id)
+
+def test_usage_accountant():
+    """Test that model and tool calls are totalled per phase, agent, model and tool"""
+    print("🧪 Testing usage accounting...")
+
+    accountant = UsageAccountant()
+    _model_call(accountant, "planner", "planner_agent", "claude-sonnet-4-20250514", 1000, 200, cache_read=800)
+    _model_call(accountant, "planner", "planner_agent", "claude-3-5-haiku-latest", 500, 100)
+    _model_call(accountant, "executor", "executor_agent", "unknown-model", 300, 30)
+    failed = uuid.uuid4()
+    accountant.on_chat_model_start({}, [[]], run_id=failed, metadata={"phase": "executor"})
+    accountant.on_llm_error(RuntimeError("overloaded"), run_id=failed)
+
+    for error in (None, "boom"):
+        run_id = uuid.uuid4()
+        accountant.on_tool_start({"name": "add_test_result"}, "", run_id=run_id, metadata={"phase": "executor", "agent": "executor_agent"})
+        if error:
+            accountant.on_tool_error(ValueError(error), run_id=run_id)
+        else:
+            accountant.on_tool_end("ok", run_id=run_id)
+    accountant.record_phase("planner", 2.0)
+    accountant.record_phase("planner", 1.5)
+
+    usage = accountant.to_dict()
+    assert usage["totals"]["model_calls"] == 3 and usage["totals"]["tool_calls"] == 2
+    assert usage["by_phase"]["planner"]["input_tokens"] == 1500 and usage["by_phase"]["executor"]["output_tokens"] == 30
+    assert accountant.phase_tokens("planner") == 1800 and accountant.phase_tokens("analysis") == 0
+    assert usage["by_tool"]["add_test_result"]["calls"] == 2 and usage["by_tool"]["add_test_result"]["errors"] == 1
+    assert usage["phase_seconds"] == {"planner": 3.5}
+
+    # 200 uncached input at $3, 800 cache reads at $0.3, 200 output at $15 per million
+    sonnet = usage["by_model"]["claude-sonnet-4-20250514"]["cost_usd"]
+    assert abs(sonnet - (200 * 3.0 + 800 * 0.3 + 200 * 15.0) / 1_000_000) < 1e-12
+    assert usage["by_model"]["unknown-model"]["cost_usd"] == 0.0 == call_cost(None, 10, 10)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "usage_report.json")
+        accountant.write_json(path)
+        with open(path) as f:
+            report = json.load(f)
+    assert len(report["model_call_log"]) == 3 and report["totals"] == json.loads(json.dumps(usage["totals"]))
+    print(f"✅ 3 model calls, 2 tool calls, ${usage['totals']['cost_usd']:.6f}")
+
+def test_phase_budget():
+    """Test that a phase's model calls stop once it used its own tokens, other phases go on"""
+    print("🧪 Testing per-phase token budgets...")
+
+    accountant = UsageAccountant()
+    handler = PhaseBudgetCallbackHandler(accountant, {"planner": 1000})
+    handler.on_chat_model_start({}, [[]], metadata={"phase": "planner"})
+    _model_call(accountant, "planner", "planner_agent", "fake-strong", 900, 100)
+
+    assert handler.exhausted("planner") == "planner token budget of 1000 reached"
+    try:
+        handler.on_chat_model_start({}, [[]], metadata={"phase": "planner"})
+        raise AssertionError("the planner call should have been aborted")
+    except BudgetExhausted:
+        pass
+    handler.on_chat_model_start({}, [[]], metadata={"phase": "executor"})
+    handler.on_chat_model_start({}, [[]], metadata=None)
+    assert handler.exhausted("executor") is None
+    print("✅ Planner stopped at its budget, executor unaffected")
+
+if __name__ == "__main__":
+    test_usage_accountant()
+    test_phase_budget()
+    print("\n🎉 Accounting tests passed!")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Simple test script for batched execution and analysis
+"""
+
+import os
+import json
+import tempfile
+from agents.analysis_agent import BatchResultAnalyzer, batch_length, ANALYSIS_OVERHEAD_TOKENS, OUTPUT_TOKENS_PER_VERDICT
+from tools.http_tool import execute_scenario
+from tools.separate_state_tools import (add_test_scenario, get_pending_scenarios, get_queued_responses, queue_response,
+                                        remove_queued_responses, load_results_state)
+from utils.budget import ScanBudget, set_active_budget, reset_active_budget
+
+def test_unsent_request_stays_pending():
+    """Test that a scenario whose request was never sent is not queued or marked executed"""
+    print("🧪 Testing unsent requests...")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            add_test_scenario({"id": "a", "description": "", "endpoint": "/api/user", "method": "GET"})
+
+            token = set_active_budget(ScanBudget(max_requests=0))
+            try:
+                status, message = execute_scenario("a", "GET", "http://127.0.0.1:9/api/user")
+            finally:
+                reset_active_budget(token)
+            assert status == 500 and "request budget" in message, message
+
+            # Nothing listens on port 9, the connection is refused
+            status, message = execute_scenario("a", "GET", "http://127.0.0.1:9/api/user", timeout=2)
+            assert status == 500 and "not sent" in message, message
+
+            assert [scenario["id"] for scenario in json.loads(get_pending_scenarios()[1])] == ["a"]
+            assert json.loads(get_queued_responses()[1]) == []
+        finally:
+            os.chdir(cwd)
+    print("✅ Unsent scenarios stay pending and unqueued")
+
+def _queue(count: int, body: str = "{}"):
+    for i in range(count):
+        queue_response({"scenario_id": f"s{i}", "request": {"method": "GET", "url": f"http://target/api/{i}"},
+                        "status_code": 403 if i % 2 else 200, "response_body": body})
+
+def _scripted(analyzer: BatchResultAnalyzer, outcomes: list, sizes: list):
+    """Stand-in for the model call: per batch "ok" records every verdict, "half" the first half, "none" nothing, "fail" raises"""
+    def analyze_batch(responses, config=None, items=None):
+        sizes.append(len(responses))
+        outcome = outcomes.pop(0) if outcomes else "ok"
+        if outcome == "fail":
+            raise RuntimeError("model unavailable")
+        answered = responses if outcome == "ok" else responses[:len(responses) // 2] if outcome == "half" else []
+        for response in answered:
+            analyzer._record(response, {"success": True, "details": "analyzed"})
+        remove_queued_responses([response["scenario_id"] for response in answered])
+        return [response["scenario_id"] for response in answered]
+    analyzer.analyze_batch = analyze_batch
+
+def test_batch_size_adapts():
+    """Test that the batch size halves on incomplete batches, grows back after clean ones and single items fall back"""
+    print("🧪 Testing adaptive analysis batches...")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            _queue(8)
+            analyzer, sizes = BatchResultAnalyzer(batch_size=4), []
+            _scripted(analyzer, ["half", "ok", "fail", "none", "fail"], sizes)
+            recorded = analyzer.run()
+            results = {r["scenario_id"]: r for r in json.loads(load_results_state()[1])["results"]}
+            left = json.loads(get_queued_responses()[1])
+        finally:
+            os.chdir(cwd)
+
+    # half -> 2, clean -> 4, failed -> 2, no verdicts -> 1, failed single item falls back -> 2, then clean batches
+    assert sizes == [4, 2, 4, 2, 1, 2, 1], sizes
+    assert recorded == 8 and len(results) == 8 and left == []
+    assert analyzer.failed_batches == 3 and analyzer.batch_size == 4, analyzer.to_dict()
+    fallback = [r for r in results.values() if r["details"].startswith("Automated analysis failed")]
+    assert len(fallback) == 1 and "model unavailable" in fallback[0]["details"], fallback
+    assert fallback[0]["success"] == (fallback[0]["status_code"] < 400), "the raw status decides the fallback verdict"
+    print(f"✅ Batch sizes {sizes}, {len(fallback)} fallback verdict")
+
+def test_batch_token_cap():
+    """Test that batches are cut by batch_tokens and by the token budget left"""
+    print("🧪 Testing analysis batch token caps...")
+
+    items = [{"response": "x" * 396}] * 5
+    per_item = len(json.dumps(items[0], separators=(",", ":"))) // 4 + 1
+    assert batch_length(items, 10, per_item * 3) == 3
+    assert batch_length(items, 2, per_item * 3) == 2
+    assert batch_length(items, 10, 1) == 1, "an oversized item still goes alone"
+    assert batch_length(items[:2], 10, 10 ** 6) == 2
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            _queue(6, body="x" * 2000)
+            capped, sizes = BatchResultAnalyzer(batch_size=6, batch_tokens=500), []
+            _scripted(capped, [], sizes)
+            assert capped.run() == 6
+            assert sizes and max(sizes) < 6 and sum(sizes) == 6, sizes
+            assert capped.batch_size == 6, "token-capped batches are not failures"
+
+            _queue(4)
+            spent, spent_sizes = BatchResultAnalyzer(batch_size=4, remaining_tokens=lambda: ANALYSIS_OVERHEAD_TOKENS), []
+            _scripted(spent, [], spent_sizes)
+            assert spent.run() == 0 and spent_sizes == [], "no call once the budget cannot fit one"
+            assert len(json.loads(get_queued_responses()[1])) == 4
+
+            budgeted, budgeted_sizes = BatchResultAnalyzer(
+                batch_size=4, remaining_tokens=lambda: ANALYSIS_OVERHEAD_TOKENS + 4 * OUTPUT_TOKENS_PER_VERDICT + 30), []
+            _scripted(budgeted, [], budgeted_sizes)
+            assert budgeted.run() == 4 and max(budgeted_sizes) < 4, budgeted_sizes
+        finally:
+            os.chdir(cwd)
+    print(f"✅ Batches cut to {sizes} by batch_tokens and {budgeted_sizes} by the budget")
+
+if __name__ == "__main__":
+    test_unsent_request_stays_pending()
+    test_batch_size_adapts()
+    test_batch_token_cap()
+    print("\n🎉 Batch analysis tests passed!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Simple test script for scan budgets and risk-ranked scheduling
+"""
+
+import os
+import time
+import tempfile
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from tools.scheduler import rank_scenarios, score_scenario, vulnerable_prefixes
+from tools.separate_states import TestScenario
+from utils.budget import (ScanBudget, BudgetCallbackHandler, BudgetExhausted, set_active_budget, reset_active_budget,
+                          get_active_budget, budget_exhausted)
+
+def _llm_result(input_tokens: int, output_tokens: int) -> LLMResult:
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+    return LLMResult(generations=[[ChatGeneration(message=AIMessage(content="", usage_metadata=usage))]])
+
+def test_scan_budget_limits():
+    """Test each limit, the cancel file and what is left for other processes"""
+    print("🧪 Testing scan budget limits...")
+
+    budget = ScanBudget(max_requests=2, max_tokens=100)
+    budget.record_request()
+    assert budget.exhausted() is None
+    budget.record_request()
+    assert budget.exhausted() == "request budget of 2 reached"
+    assert budget.exhausted(include_requests=False) is None, "model-only work ignores the request budget"
+    budget.record_tokens(100)
+    assert budget.exhausted(include_requests=False) == "token budget of 100 reached"
+    assert budget.remaining()["max_requests"] == 0 and budget.remaining()["max_tokens"] == 0
+
+    timed = ScanBudget(max_seconds=0.05)
+    assert timed.exhausted() is None and 0 < timed.remaining()["max_seconds"] <= 0.05
+    time.sleep(0.06)
+    assert timed.exhausted() == "time budget of 0.05s reached"
+    assert ScanBudget().remaining() == {"max_seconds": None, "max_requests": None, "max_tokens": None}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cancel_path = os.path.join(tmp, "CANCEL")
+        cancellable = ScanBudget(cancel_path=cancel_path)
+        assert cancellable.exhausted() is None
+        open(cancel_path, "w").close()
+        assert cancellable.exhausted() == "scan cancelled"
+    print("✅ Request, token, time and cancel limits enforced")
+
+def test_budget_callback_and_active_budget():
+    """Test that the callback counts tokens and aborts model calls, and that the active budget is restored"""
+    print("🧪 Testing the budget callback and the active budget...")
+
+    budget = ScanBudget(max_tokens=50)
+    handler = BudgetCallbackHandler(budget)
+    handler.on_chat_model_start({}, [])
+    handler.on_llm_end(_llm_result(40, 10))
+    assert budget.tokens == 50
+    try:
+        handler.on_chat_model_start({}, [])
+        raise AssertionError("the model call should have been aborted")
+    except BudgetExhausted as e:
+        assert "token budget" in str(e)
+
+    outer = set_active_budget(ScanBudget())
+    inner = set_active_budget(budget)
+    assert get_active_budget() is budget and budget_exhausted() == "token budget of 50 reached"
+    reset_active_budget(inner)
+    assert get_active_budget() is not budget and budget_exhausted() is None
+    reset_active_budget(outer)
+    assert get_active_budget() is None
+    print("✅ Tokens counted, model calls aborted, previous budget restored")
+
+def test_rank_scenarios():
+    """Test that scenarios are ranked by class, sensitivity, method and sibling findings, ties in order"""
+    print("🧪 Testing risk-ranked scheduling...")
+
+    scenarios = [
+        TestScenario(id="session_fixation", description="", endpoint="/api/docs", method="GET"),
+        TestScenario(id="rule_idor_orders", description="", endpoint="GET /api/orders/{id}", method=""),
+        TestScenario(id="bulk_export", description="", endpoint="/api/reports", method="GET"),
+        TestScenario(id="business_logic_refund", description="", endpoint="/api/payments", method="POST"),
+        TestScenario(id="bulk_import", description="", endpoint="/api/reports", method="GET"),
+    ]
+    # idor 5 + order 3, business_logic 3 + payment 3 + write 2, session 2, bulk 2
+    assert [score_scenario(s) for s in scenarios] == [2, 8, 2, 8, 2]
+    ranked = rank_scenarios(scenarios)
+    assert [s.id for s in ranked] == ["rule_idor_orders", "business_logic_refund", "session_fixation", "bulk_export", "bulk_import"]
+    assert [s.id for s in rank_scenarios(scenarios, limit=1)] == ["rule_idor_orders"]
+
+    hot = vulnerable_prefixes([{"scenario_id": "bulk_export"}, {"endpoint": "GET /api/docs"}], scenarios)
+    assert hot == {"reports", "docs"}
+    ranked = rank_scenarios(scenarios, hot)
+    assert [s.id for s in ranked][:3] == ["rule_idor_orders", "business_logic_refund", "session_fixation"]
+    assert score_scenario(scenarios[2], hot) == 5
+    print("✅ Highest risk first, findings boost their siblings, ties keep their order")
+
+if __name__ == "__main__":
+    test_scan_budget_limits()
+    test_budget_callback_and_active_budget()
+    test_rank_scenarios()
+    print("\n🎉 Budget and scheduling tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Simple test script for checkpoint retention
+"""
+
+import os
+import operator
+import tempfile
+from typing import Annotated, List, TypedDict
+from langgraph.graph import StateGraph, START, END
+from utils.checkpointer import create_checkpointer, prune_checkpoints
+
+class StepState(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+def _build_graph(checkpointer):
+    """Two-node graph that pauses before its second node"""
+    graph = StateGraph(StepState)
+    graph.add_node("plan", lambda state: {"steps": ["plan"]})
+    graph.add_node("execute", lambda state: {"steps": ["execute"]})
+    graph.add_edge(START, "plan")
+    graph.add_edge("plan", "execute")
+    graph.add_edge("execute", END)
+    return graph.compile(checkpointer=checkpointer, interrupt_before=["execute"])
+
+def _checkpoint_count(checkpointer, thread_id: str) -> int:
+    return len(list(checkpointer.list({"configurable": {"thread_id": thread_id}})))
+
+def _prune_and_resume(backend: str, path: str):
+    """Run a thread three times, pause the fourth run, prune and resume it"""
+    checkpointer = create_checkpointer(backend, path)
+    graph = _build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "scan:nonce:planner"}}
+    other = {"configurable": {"thread_id": "scan:nonce:executor"}}
+
+    for _ in range(3):
+        graph.invoke({"steps": ["start"]}, config)
+        graph.invoke(None, config)
+    graph.invoke({"steps": ["start"]}, other)
+    graph.invoke({"steps": ["start"]}, config)
+    assert graph.get_state(config).next == ("execute",)
+
+    before = _checkpoint_count(checkpointer, config["configurable"]["thread_id"])
+    other_before = _checkpoint_count(checkpointer, other["configurable"]["thread_id"])
+    removed = prune_checkpoints(checkpointer, [config["configurable"]["thread_id"]], keep_last=2)
+    assert removed == before - 2, (removed, before)
+    assert _checkpoint_count(checkpointer, config["configurable"]["thread_id"]) == 2
+    assert _checkpoint_count(checkpointer, other["configurable"]["thread_id"]) == other_before, "other threads untouched"
+
+    # The paused run picks up where it stopped, with the thread's whole history
+    state = graph.get_state(config)
+    assert state.next == ("execute",), state.next
+    result = graph.invoke(None, config)
+    assert result["steps"] == ["start", "plan", "execute"] * 4, result["steps"]
+    assert graph.get_state(config).next == ()
+
+    assert prune_checkpoints(checkpointer, [config["configurable"]["thread_id"]], keep_last=None) == 0
+    prune_checkpoints(checkpointer, [config["configurable"]["thread_id"]], keep_last=0)
+    assert _checkpoint_count(checkpointer, config["configurable"]["thread_id"]) == 0
+    return checkpointer, removed
+
+def test_prune_memory():
+    """Test pruning the in-memory checkpointer, including the blobs no checkpoint points at"""
+    print("🧪 Testing in-memory checkpoint pruning...")
+
+    checkpointer, removed = _prune_and_resume("memory", "")
+    thread_blobs = [key for key in checkpointer.blobs if key[0] == "scan:nonce:planner"]
+    assert not thread_blobs, thread_blobs
+    assert not [key for key in checkpointer.writes if key[0] == "scan:nonce:planner"]
+    assert [key for key in checkpointer.blobs if key[0] == "scan:nonce:executor"]
+    print(f"✅ {removed} checkpoints pruned, paused run resumed")
+
+def test_prune_sqlite():
+    """Test pruning the sqlite checkpointer, including writes of dropped checkpoints"""
+    print("🧪 Testing sqlite checkpoint pruning...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpointer, removed = _prune_and_resume("sqlite", os.path.join(tmp, "checkpoints.sqlite"))
+        orphaned = checkpointer.conn.execute(
+            "SELECT COUNT(*) FROM writes w WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE c.thread_id = w.thread_id "
+            "AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id)").fetchone()[0]
+        checkpointer.conn.close()
+    assert orphaned == 0, orphaned
+    print(f"✅ {removed} checkpoints pruned, paused run resumed")
+
+if __name__ == "__main__":
+    test_prune_memory()
+    test_prune_sqlite()
+    print("\n🎉 Checkpointer tests passed!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Simple test script for message-history compaction
+"""
+
+import json
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from utils.compaction import make_compaction_hook
+
+def _call(call_id: str, name: str, args: dict, output, status: str = "success"):
+    """An AI turn with one tool call and the tool's answer"""
+    return [
+        AIMessage(content="", tool_calls=[{"id": call_id, "name": name, "args": args}]),
+        ToolMessage(content=json.dumps(output), tool_call_id=call_id, status=status),
+    ]
+
+def _history():
+    messages = [HumanMessage(content="Execute the pending scenarios.")]
+    messages += _call("c1", "add_test_result", {"result_data": {"scenario_id": "idor_user", "success": False}}, [200, "ok"])
+    messages += _call("c2", "add_test_result", {"result_data": {"scenario_id": "bola_article", "success": True}},
+                      [500, "Error adding test result: disk full"])
+    messages += _call("c3", "add_vulnerability", {"vuln_data": {"scenario_id": "idor_user", "severity": "high"}},
+                      "Error: invalid vuln_data", status="error")
+    messages += _call("c4", "mark_scenario_executed", {"scenario_id": "idor_user"}, [200, "ok"])
+    messages += _call("c5", "add_test_scenarios", {"scenarios_data": [{"id": "a"}, {"id": "b"}]}, [200, "{}"])
+    messages += _call("c6", "get_pending_scenarios", {}, [200, "[]"])
+    # Probes the target correctly rejected, or that were never sent, are not failed writes
+    messages += _call("c7", "http_request", {"method": "GET", "url": "http://target/api/admin"}, [403, "forbidden"])
+    messages += _call("c8", "execute_scenario", {"scenario_id": "bola_article", "method": "GET", "url": "http://target/x"},
+                      [404, "not found"])
+    messages += _call("c9", "http_request", {"method": "GET", "url": "http://target/api/user"}, [500, "Error: timed out"])
+    # Recent turns, kept verbatim
+    for i in range(3):
+        messages += _call(f"r{i}", "get_pending_scenarios", {}, [200, "x" * 400])
+    return messages
+
+def test_compaction_hook():
+    """Test that the hook compacts old turns into a digest of what was saved, and only what was saved"""
+    print("🧪 Testing the compaction hook...")
+
+    messages = _history()
+    state = {"messages": messages}
+
+    unchanged = make_compaction_hook(max_tokens=100000, keep_recent=6)(state)
+    assert unchanged["llm_input_messages"] is messages, "short histories pass through"
+
+    compacted = make_compaction_hook(max_tokens=100, keep_recent=6)(state)["llm_input_messages"]
+    assert state["messages"] is messages and len(messages) == 25, "the graph state keeps the full history"
+    assert isinstance(compacted[0], HumanMessage) and isinstance(compacted[1], AIMessage)
+    assert compacted[1:] == messages[-6:]
+
+    digest = compacted[0].content
+    assert digest.startswith("Execute the pending scenarios.")
+    assert "Results recorded (1): idor_user=fail" in digest, digest
+    assert "bola_article" not in digest, "a result that failed to save is not listed as saved"
+    assert "Vulnerabilities recorded" not in digest
+    assert "Scenarios marked executed (1): idor_user" in digest
+    assert "Scenarios added: 2" in digest
+    assert "Other tool calls: execute_scenario x1, get_pending_scenarios x1, http_request x2" in digest, digest
+    assert "Failed state writes, nothing saved (redo them if still needed): add_test_result x1, add_vulnerability x1" in digest, digest
+    print("✅ Old turns compacted to a digest of the saved writes, failed ones flagged")
+
+if __name__ == "__main__":
+    test_compaction_hook()
+    print("\n🎉 Compaction tests passed!")
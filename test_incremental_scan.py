@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Simple test script for spec fingerprinting and incremental scan pruning
+"""
+
+import os
+import json
+import tempfile
+from tools.openapi_model import parse_operations, fingerprint_operations
+from tools.spec_diff import diff_fingerprints, scenario_operation_key
+from tools.separate_states import TestScenario
+from tools.separate_state_tools import add_test_scenario, add_test_result, add_vulnerability, prune_operations, get_scenarios_summary
+
+SPEC = {
+    "openapi": "3.0.0",
+    "paths": {
+        "/api/user": {
+            "get": {"security": [{"Token": []}], "responses": {"200": {"description": "ok"}}},
+            "put": {
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}},
+                "responses": {"200": {"description": "ok"}}
+            }
+        },
+        "/api/tags": {"get": {"responses": {"200": {"description": "ok"}}}}
+    },
+    "components": {"schemas": {"User": {"type": "object", "properties": {"email": {"type": "string"}}}}}
+}
+
+def test_spec_diff():
+    """Test that only schema changes show up in the diff"""
+    print("🧪 Testing spec diff...")
+
+    previous = fingerprint_operations(parse_operations(SPEC))
+
+    changed_spec = json.loads(json.dumps(SPEC))
+    changed_spec["components"]["schemas"]["User"]["properties"]["admin"] = {"type": "boolean"}
+    del changed_spec["paths"]["/api/tags"]
+    changed_spec["paths"]["/api/articles"] = {"get": {"responses": {"200": {"description": "ok"}}}}
+
+    diff = diff_fingerprints(previous, fingerprint_operations(parse_operations(changed_spec)))
+
+    assert diff.added == ["GET /api/articles"]
+    assert diff.changed == ["PUT /api/user"]
+    assert diff.removed == ["GET /api/tags"]
+    assert diff.unchanged == ["GET /api/user"]
+    print("✅ Spec diff detected added, changed and removed operations")
+
+def test_prune_operations():
+    """Test that stale operations lose their scenarios, results and vulnerabilities"""
+    print("🧪 Testing operation pruning...")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            add_test_scenario({"id": "a", "description": "", "endpoint": "PUT /api/user", "method": "PUT"})
+            add_test_scenario({"id": "b", "description": "", "endpoint": "/api/user", "method": "GET"})
+            add_test_result({"scenario_id": "a", "status_code": 200, "response_body": "", "success": True})
+            add_test_result({"scenario_id": "b", "status_code": 401, "response_body": "", "success": True})
+            add_vulnerability({"id": "a", "title": "Mass assignment", "severity": "HIGH"})
+
+            status, data = prune_operations(["PUT /api/user"])
+            assert status == 200
+            assert json.loads(data) == {
+                "operations_pruned": 1,
+                "scenarios_removed": 1,
+                "results_removed": 1,
+                "vulnerabilities_removed": 1
+            }
+
+            _, summary = get_scenarios_summary()
+            assert json.loads(summary)["total_scenarios"] == 1
+        finally:
+            os.chdir(cwd)
+    print("✅ Stale operations pruned, unchanged ones carried forward")
+
+def test_prune_keeps_literal_sibling():
+    """Test that pruning a path template keeps the scenarios of an unchanged literal path next to it"""
+    print("🧪 Testing pruning next to a literal sibling path...")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            add_test_scenario({"id": "idor", "description": "", "endpoint": "/api/users/42", "method": "GET"})
+            add_test_scenario({"id": "me", "description": "", "endpoint": "http://target/api/users/me", "method": "GET"})
+            add_test_result({"scenario_id": "me", "status_code": 200, "response_body": "", "success": True})
+            add_vulnerability({"id": "me", "title": "Information disclosure", "severity": "LOW"})
+
+            known = ["GET /api/users/{id}", "GET /api/users/me"]
+            status, data = prune_operations(["GET /api/users/{id}"], known)
+            assert status == 200
+            summary = json.loads(data)
+            assert summary["scenarios_removed"] == 1 and summary["results_removed"] == 0, summary
+            assert summary["vulnerabilities_removed"] == 0, summary
+
+            _, scenarios = get_scenarios_summary()
+            assert json.loads(scenarios)["total_scenarios"] == 1
+        finally:
+            os.chdir(cwd)
+    print("✅ Only the changed template's scenarios pruned, the literal sibling kept its own")
+
+def test_scenario_operation_key():
+    """Test that full URLs and concrete paths resolve to the spec's operation"""
+    print("🧪 Testing scenario to operation resolution...")
+
+    operations = {"GET /api/users/{id}", "GET /api/users/me", "DELETE /api/users/{id}", "GET /api/articles/{slug}/comments"}
+
+    def key(endpoint, method=""):
+        return scenario_operation_key(TestScenario(id="s", description="", endpoint=endpoint, method=method), operations)
+
+    assert key("GET /api/users/{id}") == "GET /api/users/{id}"
+    assert key("/api/users/42", "get") == "GET /api/users/{id}"
+    assert key("DELETE http://target:8000/api/users/42?force=1") == "DELETE /api/users/{id}"
+    assert key("https://target/api/users/me", "GET") == "GET /api/users/me", "literal segments win over parameters"
+    assert key("GET /api/articles/hello-world/comments/") == "GET /api/articles/{slug}/comments"
+    assert key("GET http://target/v2/api/users/7") == "GET /api/users/{id}", "a base path in front of the spec's paths"
+    assert key("POST /api/users/42") == "POST /api/users/42", "no operation with that method"
+    # Without operations only the URL is normalized
+    assert scenario_operation_key(TestScenario(id="s", description="", endpoint="http://target/api/users/42/", method="get")) == "GET /api/users/42"
+    print("✅ URLs and concrete paths mapped to their operation templates")
+
+if __name__ == "__main__":
+    test_spec_diff()
+    test_prune_operations()
+    test_prune_keeps_literal_sibling()
+    test_scenario_operation_key()
+    print("\n🎉 Incremental scan tests passed!")
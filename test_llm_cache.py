@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the persistent LLM response cache
+"""
+
+import os
+import time
+import tempfile
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+from utils.llm_cache import SQLiteLRUCache, llm_cache_key
+
+def _generation(text):
+    usage = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+    return [ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))]
+
+def test_hit_and_broken_entry():
+    """Test that hits replay without usage and a broken entry counts as a miss and is dropped"""
+    print("🧪 Testing cache hits and broken entries...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteLRUCache(os.path.join(tmp, "llm_cache.sqlite"))
+        cache.update("prompt", "model", _generation("answer"))
+        cached = cache.lookup("prompt", "model")
+        assert cached[0].message.content == "answer"
+        assert cached[0].message.usage_metadata["total_tokens"] == 0, "replays cost nothing"
+        assert cache.lookup("prompt", "other model") is None
+
+        cache._conn.execute("UPDATE llm_cache SET value = ? WHERE key = ?", ('["not a generation"]', llm_cache_key("prompt", "model")))
+        cache._conn.commit()
+        assert cache.lookup("prompt", "model") is None
+        assert cache.to_dict() == {"hits": 1, "misses": 2, "entries": 0, "max_entries": cache.max_entries}
+        cache._conn.close()
+    print("✅ Hits replayed, broken entry counted as a miss and removed")
+
+def test_lru_eviction():
+    """Test that max_entries keeps the most recently used entries"""
+    print("🧪 Testing LRU eviction...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteLRUCache(os.path.join(tmp, "llm_cache.sqlite"), max_entries=2)
+        cache.update("a", "model", _generation("a"))
+        time.sleep(0.01)
+        cache.update("b", "model", _generation("b"))
+        time.sleep(0.01)
+        assert cache.lookup("a", "model") is not None, "using a makes b the least recently used"
+        time.sleep(0.01)
+        cache.update("c", "model", _generation("c"))
+
+        assert len(cache) == 2
+        assert cache.lookup("b", "model") is None
+        assert cache.lookup("a", "model") is not None and cache.lookup("c", "model") is not None
+        cache._conn.close()
+    print("✅ Least recently used entry evicted")
+
+if __name__ == "__main__":
+    test_hit_and_broken_entry()
+    test_lru_eviction()
+    print("\n🎉 LLM cache tests passed!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the Prometheus metrics
+"""
+
+from utils.metrics import MetricsRegistry, Counter, Histogram, endpoint_label
+
+def test_endpoint_label():
+    """Test that resource IDs collapse into one label value per endpoint"""
+    print("🧪 Testing endpoint labels...")
+
+    assert endpoint_label("http://localhost:8000/api/users/42/orders?x=1") == "/api/users/{id}/orders"
+    assert endpoint_label("http://h/api/items/3f2b8c1e-9d4a-4e6b-8a7c-1d2e3f4a5b6c") == "/api/items/{id}"
+    assert endpoint_label("http://h/api/user") == "/api/user"
+    print("✅ IDs replaced, plain segments kept")
+
+def test_render():
+    """Test the text exposition of counters and cumulative histogram buckets"""
+    print("🧪 Testing rendering...")
+
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests", ("endpoint",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ("endpoint",), (0.1, 1.0)))
+    requests.inc(endpoint='/a"b')
+    requests.inc(endpoint='/a"b')
+    for seconds in (0.05, 0.5, 5.0):
+        latency.observe(seconds, endpoint="/a")
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="/a\\"b"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{endpoint="/a"} 3' in text
+
+    registry.reset()
+    assert "requests_total{" not in registry.render()
+    print("✅ Labels escaped, buckets cumulative")
+
+if __name__ == "__main__":
+    test_endpoint_label()
+    test_render()
+    print("\n🎉 Metrics tests passed!")
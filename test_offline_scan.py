@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Simple test script for full scans against the mock target with fake models
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import sqlite3
+import subprocess
+import tempfile
+import contextlib
+from benchmarks.mock_target import MockTarget
+from benchmarks.model_tiering import fake_models
+from utils.model import set_model
+from utils.budget import get_active_budget
+
+for tier, fake in fake_models(0.1).items():
+    set_model(tier, fake)
+
+def _offline_scan(workdir: str, **options):
+    """Run a scan in workdir; returns the result, the printed output and the scenarios state"""
+    from security_agent import run_security_test
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    output = io.StringIO()
+    try:
+        with MockTarget() as target, contextlib.redirect_stdout(output):
+            options.setdefault("use_plan_cache", False)
+            options.setdefault("usage_report_path", None)
+            result = run_security_test(target.swagger_url, target.base_url, **options)
+        with open("scenarios_state.json") as f:
+            scenarios = json.load(f)["scenarios"]
+    finally:
+        os.chdir(cwd)
+    return result, output.getvalue(), scenarios
+
+def test_chunk_loop_request_budget():
+    """Test that a chunk cut short by the request budget reports what really ran and what is left"""
+    print("🧪 Testing the executor chunk loop under a request budget...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, output, scenarios = _offline_scan(tmp, max_requests=4, analysis_batch_size=5, executor_chunk_size=10)
+
+    executed = sum(1 for scenario in scenarios if scenario["executed"])
+    pending = len(scenarios) - executed
+    chunk = re.search(r"Chunk 1: (\d+)/(\d+) executed .*?, (\d+) remaining", output)
+    assert result["status"] == "success"
+    assert executed == 4, executed
+    assert chunk and int(chunk.group(1)) == executed and int(chunk.group(3)) == pending, chunk and chunk.group(0)
+    assert "Chunk 2" not in output
+    assert get_active_budget() is None, "the run's budget stays active after it returned"
+    print(f"✅ {executed} executed, {pending} left pending for the next run")
+
+def test_queue_request_budget():
+    """Test that queue workers share the scan's request budget and the orchestrator sees their usage"""
+    print("🧪 Testing the request budget in queue mode...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, output, scenarios = _offline_scan(tmp, max_requests=6, analysis_batch_size=5, executor_chunk_size=3,
+                                                  work_queue_path=os.path.join(tmp, "queue.sqlite"), queue_workers=2,
+                                                  session_id="queue_budget")
+
+    executed = sum(1 for scenario in scenarios if scenario["executed"])
+    assert result["status"] == "success"
+    assert result["budget"]["requests"] == 6 and executed == 6, (result["budget"], executed)
+    assert "Stopping execution: request budget of 6 reached" in output
+    print(f"✅ {executed} executed by the workers, {len(scenarios) - executed} withdrawn")
+
+def test_rerun_gets_fresh_threads():
+    """Test that re-running a session on the same checkpoint file does not append to the earlier run's threads"""
+    print("🧪 Testing a re-run on a reused checkpoint file...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        options = {"session_id": "rerun", "checkpointer_backend": "sqlite",
+                   "checkpoint_path": os.path.join(tmp, "checkpoints.sqlite"), "keep_checkpoints": None}
+        first, _, _ = _offline_scan(tmp, **options)
+        second, output, scenarios = _offline_scan(tmp, **options)
+        with sqlite3.connect(options["checkpoint_path"]) as conn:
+            swagger_threads = [row[0] for row in conn.execute(
+                "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE 'rerun:%:swagger'")]
+
+    assert first["status"] == "success" and second["status"] == "success", second
+    assert "Error during security testing" not in output
+    assert len(swagger_threads) == 2, swagger_threads
+    assert all(scenario["executed"] for scenario in scenarios)
+    print(f"✅ Each run on its own threads: {swagger_threads}")
+
+def test_usage_report_on_failure():
+    """Test that a failed run still writes its usage report"""
+    print("🧪 Testing the usage report of a failed run...")
+    from security_agent import run_security_test
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with MockTarget() as target, contextlib.redirect_stdout(io.StringIO()):
+                # The swagger agent cannot parse a missing spec, so the run fails after its first model calls
+                result = run_security_test(target.swagger_url + ".missing", target.base_url, use_plan_cache=False,
+                                           usage_report_path="usage_report.json")
+            with open("usage_report.json") as f:
+                report = json.load(f)
+        finally:
+            os.chdir(cwd)
+
+    assert result["status"] == "error", result
+    assert report["totals"]["model_calls"] >= 1 and "swagger" in report["by_phase"], report["totals"]
+    assert result["usage"]["totals"] == report["totals"]
+    print(f"✅ Usage report written with {report['totals']['model_calls']} model calls")
+
+def test_pipeline_with_incremental():
+    """Test that an incremental scan says it does not pipeline and the command line rejects the combination"""
+    print("🧪 Testing pipeline mode with an incremental scan...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, output, scenarios = _offline_scan(tmp, incremental=True, pipeline=True)
+
+    assert result["status"] == "success", result
+    assert "Pipeline mode is disabled for incremental scans" in output
+    assert "Pipelined Discovery" not in output and all(scenario["executed"] for scenario in scenarios)
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "security_agent.py")
+    run = subprocess.run([sys.executable, script, "--pipeline", "--incremental"], capture_output=True, text=True, timeout=120)
+    assert run.returncode == 2 and "--pipeline cannot be combined with --incremental" in run.stderr, run.stderr
+    print("✅ Incremental scan ran its phases in sequence and said so, the CLI rejects the combination")
+
+if __name__ == "__main__":
+    test_chunk_loop_request_budget()
+    test_queue_request_budget()
+    test_rerun_gets_fresh_threads()
+    test_usage_report_on_failure()
+    test_pipeline_with_incremental()
+    print("\n🎉 Offline scan tests passed!")
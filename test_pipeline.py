@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the streaming pipeline
+"""
+
+import time
+import uuid
+import threading
+from langchain_core.messages import ToolMessage
+from utils.pipeline import Pipeline, Stage, ToolInputStreamHandler
+
+def _run(pipeline, timeout=10):
+    """Run a pipeline, failing instead of hanging if it deadlocks"""
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(stats=pipeline.run()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "the pipeline did not finish"
+    return outcome["stats"]
+
+def _numbers(count):
+    def source(emit):
+        for number in range(count):
+            emit(number)
+    return source
+
+def test_end_marker_with_many_workers():
+    """Test that every worker of a multi-worker stage stops and the next stage still ends"""
+    print("🧪 Testing the end marker with several workers...")
+
+    collected = []
+    pipeline = Pipeline(_numbers(20))
+    pipeline.add_stage(Stage("double", lambda item, emit: emit(item * 2), workers=4))
+    pipeline.add_stage(Stage("square", lambda item, emit: emit(item * item), workers=3))
+    pipeline.add_stage(Stage("collect", lambda item, emit: collected.append(item)))
+    stats = _run(pipeline)
+
+    assert sorted(collected) == sorted((n * 2) ** 2 for n in range(20))
+    assert stats["double"]["items"] == 20 and stats["square"]["items"] == 20 and stats["collect"]["items"] == 20
+    print("✅ All workers stopped, all items delivered")
+
+def test_errors_do_not_stall():
+    """Test that a failing handler or flush is recorded and the stages after it still finish"""
+    print("🧪 Testing handler and flush errors...")
+
+    def odd_only(item, emit):
+        if item % 2 == 0:
+            raise ValueError(f"even {item}")
+        emit(item)
+
+    def failing_flush(emit):
+        emit("flushed")
+        raise RuntimeError("flush failed")
+
+    collected = []
+    pipeline = Pipeline(_numbers(10))
+    pipeline.add_stage(Stage("filter", odd_only, workers=2, flush=failing_flush))
+    pipeline.add_stage(Stage("collect", lambda item, emit: collected.append(item)))
+    stats = _run(pipeline)
+
+    assert sorted(item for item in collected if item != "flushed") == [1, 3, 5, 7, 9] and "flushed" in collected
+    assert len(stats["filter"]["errors"]) == 6 and "flush failed" in stats["filter"]["errors"]
+    assert stats["collect"]["errors"] == []
+    print("✅ Errors recorded, downstream stages finished")
+
+def test_backpressure():
+    """Test that a slow stage blocks the source once its bounded queue is full"""
+    print("🧪 Testing backpressure...")
+
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def source(emit):
+        for number in range(10):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            emit(number)
+
+    def slow(item, emit):
+        time.sleep(0.02)
+        with lock:
+            in_flight["now"] -= 1
+
+    pipeline = Pipeline(source)
+    pipeline.add_stage(Stage("slow", slow, queue_size=2))
+    stats = _run(pipeline)
+
+    # At most the queue, the item being handled and the one the source is putting
+    assert in_flight["max"] <= 4, in_flight
+    assert stats["source"]["blocked_seconds"] > 0.05, stats["source"]
+    print(f"✅ At most {in_flight['max']} items in flight, source blocked {stats['source']['blocked_seconds']}s")
+
+def test_tool_input_stream_only_successful_calls():
+    """Test that only calls returning status 200 are streamed"""
+    print("🧪 Testing tool input streaming...")
+
+    emitted = []
+    handler = ToolInputStreamHandler("add_endpoint", "endpoint", emitted.append)
+    outputs = [
+        (200, "saved"),
+        (500, "Error adding endpoint: disk full"),
+        ToolMessage(content='[200, "saved"]', tool_call_id="1"),
+        ToolMessage(content='[400, "bad endpoint"]', tool_call_id="2"),
+        ToolMessage(content="Error: boom", tool_call_id="3", status="error"),
+    ]
+    for index, output in enumerate(outputs):
+        run_id = uuid.uuid4()
+        handler.on_tool_start({"name": "add_endpoint"}, "", run_id=run_id, inputs={"endpoint": f"GET /{index}"})
+        handler.on_tool_end(output, run_id=run_id)
+    handler.on_tool_start({"name": "get_endpoints"}, "", run_id=uuid.uuid4(), inputs={"endpoint": "GET /other"})
+
+    assert emitted == ["GET /0", "GET /2"], emitted
+    print("✅ Failed tool calls are not streamed")
+
+if __name__ == "__main__":
+    test_end_marker_with_many_workers()
+    test_errors_do_not_stall()
+    test_backpressure()
+    test_tool_input_stream_only_successful_calls()
+    print("\n🎉 Pipeline tests passed!")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the plan cache
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import subprocess
+import tempfile
+import contextlib
+from benchmarks.mock_target import MockTarget
+from benchmarks.model_tiering import fake_models
+from utils.model import set_model
+from agents.planner_agent import PLANNER_PROMPT_VERSION
+from tools.plan_cache import PlanCache, plan_cache_key, load_plan_cache, save_plan_cache
+from tools.separate_states import TestScenario
+from tools.openapi_model import Operation
+from tools.separate_state_tools import add_test_scenario
+
+for tier, fake in fake_models(0.1).items():
+    set_model(tier, fake)
+
+def _scenario(scenario_id: str, endpoint: str = "GET /api/user") -> dict:
+    return {"id": scenario_id, "description": "", "endpoint": endpoint, "method": "", "payload": None, "auth_token": None}
+
+def test_ttl_expiry():
+    """Test that entries past the TTL are misses and are dropped on save"""
+    print("🧪 Testing plan cache TTL...")
+
+    cache = PlanCache(ttl_seconds=60)
+    cache.put("fresh", "GET /api/user", [_scenario("fresh_check")])
+    cache.put("old", "PUT /api/user", [TestScenario(id="old_check", description="", endpoint="PUT /api/user", method="PUT", executed=True)])
+    cache.put("stale", "GET /api/profiles/{username}", [_scenario("stale_check")])
+    cache.entries["old"]["created_at"] = time.time() - 120
+    cache.entries["stale"]["created_at"] = time.time() - 120
+
+    assert cache.get("old") is None and "old" not in cache.entries, "expired entries are misses and dropped"
+    assert cache.get("fresh")[0]["id"] == "fresh_check"
+    assert cache.entries["fresh"]["scenarios"][0]["executed"] is False, "cached scenarios replay as pending"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plan_cache.json")
+        save_plan_cache(cache, path)
+        reloaded = load_plan_cache(60, path)
+        assert set(reloaded.entries) == {"fresh"}, reloaded.entries
+        assert load_plan_cache(None, path).get("fresh") is not None
+        assert load_plan_cache(60, os.path.join(tmp, "missing.json")).entries == {}
+    assert PlanCache(ttl_seconds=None).prune_expired() == 0
+    print("✅ Expired entries missed and pruned, fresh ones kept")
+
+def test_prompt_version_and_invalidation():
+    """Test that a new planner prompt misses and invalidate drops only the given operations"""
+    print("🧪 Testing plan cache invalidation...")
+
+    cache = PlanCache()
+    cache.put(plan_cache_key("fp_user", "v1"), "GET /api/user", [_scenario("user_check")])
+    cache.put(plan_cache_key("fp_user_old", "v1"), "GET /api/user", [_scenario("user_check_old")])
+    cache.put(plan_cache_key("fp_login", "v1"), "POST /api/users/login", [_scenario("login_check")])
+
+    assert plan_cache_key("fp_user", "v1") != plan_cache_key("fp_user", "v2")
+    assert cache.get(plan_cache_key("fp_user", "v2")) is None, "another prompt version is a miss"
+    assert cache.get(plan_cache_key("fp_user", "v1"))[0]["id"] == "user_check"
+
+    assert cache.invalidate(["GET /api/user", "DELETE /api/unknown"]) == 2
+    assert [entry["operation"] for entry in cache.entries.values()] == ["POST /api/users/login"]
+    assert cache.invalidate([]) == 0 and len(cache.entries) == 1
+    print("✅ Prompt versions kept apart, invalidation scoped to operations")
+
+def test_replay():
+    """Test that a scan replays cached plans for the current prompt and re-plans the rest"""
+    print("🧪 Testing plan cache replay...")
+    from security_agent import run_security_test, load_operations
+
+    cwd = os.getcwd()
+    output = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with MockTarget() as target, contextlib.redirect_stdout(output):
+                operations = {op.key: op for op in load_operations(target.swagger_url)}
+                user, login = operations["GET /api/user"], operations["POST /api/users/login"]
+                cache = PlanCache()
+                cache.put(plan_cache_key(user.fingerprint(), PLANNER_PROMPT_VERSION), user.key,
+                          [_scenario("cached_user_check", user.key)])
+                # Planned with an older prompt, ignored
+                cache.put(plan_cache_key(login.fingerprint(), "outdated"), login.key,
+                          [_scenario("outdated_login_check", login.key)])
+                save_plan_cache(cache)
+                result = run_security_test(target.swagger_url, target.base_url, usage_report_path=None)
+            with open("scenarios_state.json") as f:
+                scenarios = {s["id"]: s for s in json.load(f)["scenarios"]}
+        finally:
+            os.chdir(cwd)
+
+    assert result["status"] == "success", result
+    assert f"Plan cache: 1 hits, {len(operations) - 1} misses" in output.getvalue(), output.getvalue()
+    assert scenarios["cached_user_check"]["executed"], "replayed scenarios are executed"
+    assert "outdated_login_check" not in scenarios
+    print(f"✅ 1 operation replayed from cache, {len(operations) - 1} planned")
+
+def test_store_plans_resolves_against_spec():
+    """Test that a scenario of an operation outside the stored ones is not cached under their template"""
+    print("🧪 Testing plan storage across shards...")
+    from security_agent import _store_plans
+
+    template, literal = Operation(method="GET", path="/api/users/{id}"), Operation(method="GET", path="/api/users/me")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            add_test_scenario({"id": "idor_user", "description": "", "endpoint": "/api/users/42", "method": "GET"})
+            # Planned by another shard for its literal path
+            add_test_scenario({"id": "me_disclosure", "description": "", "endpoint": "http://target/api/users/me", "method": "GET"})
+            cache = PlanCache()
+            stored = _store_plans(cache, [template], [template.key], [template.key, literal.key])
+        finally:
+            os.chdir(cwd)
+
+    assert stored == 1
+    cached = cache.get(plan_cache_key(template.fingerprint(), PLANNER_PROMPT_VERSION))
+    assert [scenario["id"] for scenario in cached] == ["idor_user"], cached
+    print("✅ Only the template's own scenarios cached")
+
+def test_clear_plan_cache_cli():
+    """Test that --clear-plan-cache empties the cache before the scan starts"""
+    print("🧪 Testing --clear-plan-cache...")
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "security_agent.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PlanCache()
+        cache.put("a", "GET /api/user", [_scenario("user_check")])
+        cache.put("b", "POST /api/users/login", [_scenario("login_check")])
+        save_plan_cache(cache, os.path.join(tmp, "plan_cache.json"))
+
+        # A zero time budget ends the scan right after the cache was cleared, nothing is contacted
+        run = subprocess.run([sys.executable, script, "--swagger-url", "http://127.0.0.1:9/openapi.json",
+                              "--base-url", "http://127.0.0.1:9", "--clear-plan-cache", "--max-seconds", "0"],
+                             cwd=tmp, capture_output=True, text=True, timeout=120)
+        cleared = load_plan_cache(None, os.path.join(tmp, "plan_cache.json"))
+
+    assert "Cleared 2 cached plans" in run.stdout, run.stdout + run.stderr
+    assert cleared.entries == {}
+    print("✅ Every cached plan cleared from the command line")
+
+if __name__ == "__main__":
+    test_ttl_expiry()
+    test_prompt_version_and_invalidation()
+    test_replay()
+    test_store_plans_resolves_against_spec()
+    test_clear_plan_cache_cli()
+    print("\n🎉 Plan cache tests passed!")
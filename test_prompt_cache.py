@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Simple test script for prompt caching on the agent system prompts
+"""
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.prebuilt import create_react_agent
+from utils.model import cached_system_prompt, PromptCacheCallbackHandler
+
+class RecordingChatModel(FakeMessagesListChatModel):
+    """Fake chat model that keeps the messages of every call"""
+    calls: list = []
+
+    def _generate(self, messages, *args, **kwargs):
+        self.calls.append(messages)
+        return super()._generate(messages, *args, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def test_system_prompt_cache_breakpoint():
+    """Test that agents send the system prompt with a cache breakpoint and hits are counted"""
+    print("🧪 Testing prompt cache breakpoints...")
+
+    usage = {"input_tokens": 1000, "output_tokens": 10, "total_tokens": 1010, "input_token_details": {"cache_read": 800}}
+    fake = RecordingChatModel(responses=[AIMessage(content="done", usage_metadata=usage)])
+    agent = create_react_agent(model=fake, tools=[], prompt=cached_system_prompt("STATIC PROMPT"))
+
+    stats = PromptCacheCallbackHandler()
+    agent.invoke({"messages": [HumanMessage(content="go")]}, {"callbacks": [stats]})
+
+    system = fake.calls[0][0]
+    assert isinstance(system, SystemMessage)
+    assert system.content[-1]["cache_control"] == {"type": "ephemeral"}
+    assert system.content[-1]["text"] == "STATIC PROMPT"
+
+    assert stats.to_dict()["cache_read_tokens"] == 800
+    assert stats.hit_rate() == 0.8
+    print(f"✅ Cache hit rate recorded: {stats.hit_rate():.0%}")
+
+if __name__ == "__main__":
+    test_system_prompt_cache_breakpoint()
+    print("\n🎉 Prompt cache tests passed!")
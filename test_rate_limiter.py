@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Simple test script for model call rate limiting
+"""
+
+import os
+import time
+import tempfile
+import threading
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from utils.rate_limiter import LLMRateLimiter, RateLimitCallbackHandler
+from utils.model import _models, set_model, get_model, configure_llm_cache, disable_llm_cache, configure_rate_limit
+
+class RateLimitError(Exception):
+    """Shaped like a provider's 429 error"""
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": retry_after}})()
+
+def test_token_bucket():
+    """Test that a full bucket allows a burst and then spreads calls at the configured rate"""
+    print("🧪 Testing the token bucket...")
+
+    # 600 requests per minute with a half-second burst: 5 at once, then one every 0.1s
+    limiter = LLMRateLimiter(requests_per_minute=600, burst_seconds=0.5)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05, "the burst should not wait"
+    for _ in range(3):
+        limiter.acquire()
+    elapsed = time.monotonic() - started
+    assert 0.25 <= elapsed < 1.0, elapsed
+    assert limiter.throttled_calls >= 2
+
+    tokens = LLMRateLimiter(tokens_per_minute=60000, burst_seconds=0.1)
+    tokens.acquire(100)
+    started = time.monotonic()
+    tokens.acquire(50)
+    assert time.monotonic() - started >= 0.04, "the second call waits for 50 tokens at 1000/s"
+    print(f"✅ Burst of 5, then {elapsed:.2f}s for 3 more")
+
+def test_round_robin_by_scan():
+    """Test that waiting callers of different scans take turns"""
+    print("🧪 Testing round-robin by scan...")
+
+    limiter = LLMRateLimiter(requests_per_minute=1200, burst_seconds=0.05)
+    limiter.pause(0.3)
+    order = []
+    lock = threading.Lock()
+
+    def call(scan_id, label):
+        limiter.acquire(0, scan_id)
+        with lock:
+            order.append(label)
+
+    threads = []
+    for scan_id, label in (("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("b", "b2")):
+        threads.append(threading.Thread(target=call, args=(scan_id, label)))
+        threads[-1].start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(10)
+
+    assert order == ["a1", "b1", "a2", "b2", "a3"], order
+    print(f"✅ Served in turns: {order}")
+
+def test_429_pauses_every_caller():
+    """Test that a 429 with retry-after holds back the next calls"""
+    print("🧪 Testing the 429 pause...")
+
+    limiter = LLMRateLimiter(requests_per_minute=6000)
+    handler = RateLimitCallbackHandler(limiter)
+    handler.on_llm_error(RateLimitError("0.3"), run_id="failed")
+    started = time.monotonic()
+    limiter.acquire(0, "other scan")
+    assert time.monotonic() - started >= 0.25
+    # Other errors do not pause
+    handler.on_llm_error(ValueError("bad request"), run_id="other")
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started < 0.05
+    print("✅ Callers paused for the retry-after")
+
+def test_cache_hits_are_not_metered():
+    """Test that with the response cache on, only calls missing the cache take from the limiter"""
+    print("🧪 Testing rate limiting behind the response cache...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        set_model("test_rate_limit", FakeListChatModel(responses=["first", "second"]))
+        limiter = configure_rate_limit(requests_per_minute=600)
+        cache = configure_llm_cache(os.path.join(tmp, "llm_cache.sqlite"))
+        acquired = []
+        original = limiter.acquire
+        limiter.acquire = lambda tokens=0, scan_id="default": acquired.append(scan_id) or original(tokens, scan_id)
+        try:
+            model = get_model("test_rate_limit")
+            assert model.invoke("same prompt", {"metadata": {"scan_id": "s1"}}).content == "first"
+            assert model.invoke("same prompt", {"metadata": {"scan_id": "s1"}}).content == "first"
+            assert model.invoke("other prompt").content == "second"
+            assert cache.to_dict()["hits"] == 1
+            assert acquired == ["s1", "default"], acquired
+        finally:
+            disable_llm_cache()
+            configure_rate_limit()
+            cache._conn.close()
+            _models.pop("test_rate_limit")
+    print("✅ Cache hits skip the limiter")
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_round_robin_by_scan()
+    test_429_pauses_every_caller()
+    test_cache_hits_are_not_metered()
+    print("\n🎉 Rate limiter tests passed!")
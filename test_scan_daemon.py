@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the scan daemon's job API
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import multiprocessing
+import urllib.error
+import urllib.request
+import scan_daemon
+from scan_daemon import ScanDaemon, serve
+
+RELEASE_FILE = "RELEASE"
+
+def fake_scan_target(target, output_dir, defaults, overrides=None):
+    """Stand-in for batch_scan.scan_target: waits until released or cancelled, then writes a report"""
+    options = {**defaults, **target["options"], **(overrides or {})}
+    workdir = os.path.join(output_dir, target["name"])
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if os.path.exists(options["cancel_path"]) or os.path.exists(os.path.join(output_dir, RELEASE_FILE)):
+            break
+        time.sleep(0.05)
+    pdf_file = os.path.join(workdir, "report.pdf")
+    with open(pdf_file, "wb") as f:
+        f.write(b"%PDF-1.4 fake")
+    return {"name": target["name"], "status": "success", "pdf_file": pdf_file, "options": options}
+
+def _call(base, method, path, body=None):
+    """Status and decoded body of a request to the daemon"""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(base + path, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            status, payload, content_type = response.status, response.read(), response.headers["Content-Type"]
+    except urllib.error.HTTPError as e:
+        status, payload, content_type = e.code, e.read(), e.headers["Content-Type"]
+    return status, (json.loads(payload) if content_type == "application/json" else payload)
+
+def _wait_for(base, job_id, statuses):
+    """Poll a job until it reaches one of the statuses"""
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        job = _call(base, "GET", f"/jobs/{job_id}")[1]
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} stuck in {job['status']}")
+
+def test_job_api():
+    """Test submit, status, cancelling queued and running jobs and the report endpoint"""
+    print("🧪 Testing the scan daemon job API...")
+
+    original = scan_daemon.scan_target
+    scan_daemon.scan_target = fake_scan_target
+    with tempfile.TemporaryDirectory() as tmp:
+        daemon = ScanDaemon(1, tmp, {"max_seconds": 60}, mp_context=multiprocessing.get_context("fork"))
+        server = serve(daemon, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            target = {"swagger_url": "http://target/openapi.json", "base_url": "http://target"}
+            status, body = _call(base, "POST", "/jobs", dict(target, options={"checkpoint_path": "/tmp/elsewhere"}))
+            assert status == 400 and "checkpoint_path" in body["error"], body
+
+            status, body = _call(base, "POST", "/jobs", dict(target, options={"max_requests": 5, "cancel_path": "x"}))
+            assert status == 400, "daemon-owned options are rejected"
+            status, running = _call(base, "POST", "/jobs", dict(target, options={"max_requests": 5}))
+            assert status == 202 and running["status"] == "running"
+            # One worker, the next jobs wait for it
+            second = _call(base, "POST", "/jobs", target)[1]
+            queued = _call(base, "POST", "/jobs", target)[1]
+            assert second["status"] == "queued" and queued["status"] == "queued"
+
+            status, cancelled = _call(base, "DELETE", f"/jobs/{queued['id']}")
+            assert status == 200 and cancelled["status"] == "cancelled", cancelled
+            assert _call(base, "GET", f"/jobs/{queued['id']}/report")[0] == 409
+
+            status, body = _call(base, "GET", f"/jobs/{running['id']}/report")
+            assert status == 409 and "running" in body["error"], body
+            _call(base, "DELETE", f"/jobs/{running['id']}")
+            stopped = _wait_for(base, running["id"], ("cancelled",))
+            options = stopped["summary"]["options"]
+            assert options["max_requests"] == 5 and options["max_seconds"] == 60
+            assert options["session_id"] == running["id"] and options["cancel_path"].startswith(tmp)
+
+            open(os.path.join(tmp, RELEASE_FILE), "w").close()
+            finished = _wait_for(base, second["id"], ("success",))
+            assert finished["finished"] is not None
+            status, report = _call(base, "GET", f"/jobs/{second['id']}/report")
+            assert status == 200 and report.startswith(b"%PDF")
+
+            assert _call(base, "GET", "/jobs/unknown")[0] == 404
+            assert _call(base, "GET", "/health")[1]["jobs"] == {"cancelled": 2, "success": 1}
+        finally:
+            server.shutdown()
+            server.server_close()
+            daemon.shutdown()
+            scan_daemon.scan_target = original
+    print("✅ Jobs submitted, cancelled before and while running, reports served once finished")
+
+if __name__ == "__main__":
+    test_job_api()
+    print("\n🎉 Scan daemon tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Simple test script for deterministic scenario generation
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tools.openapi_model import parse_operations
+from tools.scenario_rules import generate_rule_based_scenarios
+from tools.payload_mutator import generate_mutations, mutation_scenarios, expand_oversized, MAX_INLINE_OVERSIZED
+from tools.http_tool import http_request
+
+SPEC = {
+    "openapi": "3.0.0",
+    "paths": {
+        "/api/user": {
+            "put": {
+                "security": [{"Token": []}],
+                "requestBody": {"content": {"application/json": {"schema": {
+                    "type": "object",
+                    "properties": {"user": {"type": "object", "properties": {"email": {"type": "string", "format": "email"}}}}
+                }}}}
+            }
+        },
+        "/api/membership": {
+            "post": {
+                "requestBody": {"content": {"application/json": {"schema": {
+                    "type": "object",
+                    "properties": {"number": {"type": "string"}, "amount": {"type": "number"}}
+                }}}}
+            }
+        },
+        "/api/profiles/{username}": {"get": {}},
+        "/api/users/login": {"post": {}}
+    }
+}
+
+def test_rule_based_scenarios():
+    """Test that each standard vulnerability class is expanded from the spec"""
+    print("🧪 Testing rule-based scenario generation...")
+
+    scenarios = {s.id: s for s in generate_rule_based_scenarios(parse_operations(SPEC))}
+
+    unauthenticated = scenarios["rule_function_level_bypass_unauthenticated_put_api_user"]
+    assert unauthenticated.auth_token is None
+
+    mass_assignment = scenarios["rule_privilege_escalation_admin_flag_put_api_user"]
+    assert mass_assignment.payload["user"]["admin"] is True
+    assert mass_assignment.payload["user"]["email"] == "user@example.com"
+
+    negative = scenarios["rule_business_logic_negative_post_api_membership_amount"]
+    assert negative.payload["amount"] == -100
+
+    idor = scenarios["rule_idor_cross_user_get_api_profiles_username_username"]
+    assert idor.endpoint == "/api/profiles/{username}"
+
+    # Login endpoints are public by design
+    assert not any("login" in scenario_id for scenario_id in scenarios)
+
+    # Generation is deterministic
+    again = [s.id for s in generate_rule_based_scenarios(parse_operations(SPEC))]
+    assert again == list(scenarios)
+    print(f"✅ Generated {len(scenarios)} rule-based scenarios")
+
+def test_payload_mutations():
+    """Test that mutations cover each family and are reproducible"""
+    print("🧪 Testing payload mutations...")
+
+    membership = next(op for op in parse_operations(SPEC) if op.path == "/api/membership")
+    variants = generate_mutations(membership.request_body_schema)
+    families = {name for name, _, _ in variants}
+    assert {"numeric_boundary", "type_swap", "null", "missing", "oversized_string", "extra_privileged_field"} <= families
+
+    amounts = [payload["amount"] for name, target, payload in variants if name == "numeric_boundary"]
+    assert -1 in amounts and 2 ** 63 in amounts
+    assert any(name == "missing" and "number" not in payload for name, _, payload in variants)
+
+    first = mutation_scenarios(membership, count=5, seed=7)
+    second = mutation_scenarios(membership, count=5, seed=7)
+    assert len(first) == 5
+    assert [(s.id, s.payload) for s in first] == [(s.id, s.payload) for s in second]
+    print(f"✅ Generated {len(variants)} payload mutations")
+
+class _BodyLengthHandler(BaseHTTPRequestHandler):
+    """Answers with the length of the request body it received"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        answer = str(len(json.loads(body)["user"]["email"])).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_oversized_payloads():
+    """Test that oversized strings are stored as a size marker and sent at full length"""
+    print("🧪 Testing oversized payloads...")
+
+    user = next(op for op in parse_operations(SPEC) if op.path == "/api/user")
+    oversized = [payload for name, _, payload in generate_mutations(user.request_body_schema) if name == "oversized_string"]
+    emails = [payload["user"]["email"] for payload in oversized]
+    assert emails[0] == "A" * 1024 and emails[1] == {"__oversized__": 65536}, [str(email)[:40] for email in emails]
+    assert all(len(json.dumps(payload)) < 2 * MAX_INLINE_OVERSIZED for payload in oversized), "scenario state stays small"
+
+    expanded = expand_oversized(oversized[1])
+    assert expanded["user"]["email"] == "A" * 65536 and oversized[1]["user"]["email"] == {"__oversized__": 65536}
+    assert expand_oversized(oversized[0]) is oversized[0], "payloads without markers are sent as they are"
+    assert expand_oversized([{"__oversized__": 3}, {"__oversized__": "x"}]) == ["AAA", {"__oversized__": "x"}]
+
+    server = HTTPServer(("127.0.0.1", 0), _BodyLengthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status, body = http_request("POST", f"http://127.0.0.1:{server.server_port}/api/user", json=oversized[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert status == 200 and body == "65536", (status, body)
+    print("✅ 64 KiB variant stored as a marker and sent in full")
+
+if __name__ == "__main__":
+    test_rule_based_scenarios()
+    test_payload_mutations()
+    test_oversized_payloads()
+    print("\n🎉 Scenario generation tests passed!")
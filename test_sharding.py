@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Simple test script for planning endpoint shards in parallel
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import tools.separate_state_tools as state_tools
+from tools.separate_state_tools import add_test_scenario, deduplicate_scenarios, load_scenarios_state
+from utils.sharding import shard_endpoints, run_concurrently, merge_results
+
+ENDPOINTS = [f"GET /api/{group}/{i}" for group in ("users", "orders", "items") for i in range(4)]
+
+def _plan(shard):
+    """A planner shard: one scenario per endpoint, plus a shared check every shard writes and a colliding ID"""
+    for endpoint in shard:
+        method, path = endpoint.split(" ", 1)
+        add_test_scenario({"id": f"scenario_{path.strip('/').replace('/', '_')}", "description": "", "endpoint": path, "method": method})
+    # Identical test planned by every shard, kept once
+    add_test_scenario({"id": "health", "description": "", "endpoint": "/health", "method": "GET"})
+    # Same ID, different test per shard, kept under distinct IDs
+    add_test_scenario({"id": "auth_bypass", "description": "", "endpoint": shard[0].split(" ", 1)[1], "method": "GET",
+                       "auth_token": "forged"})
+    return len(shard)
+
+def test_parallel_shard_planning():
+    """Test that overlapping shards planned in parallel lose no updates and dedupe to stable IDs"""
+    print("🧪 Testing parallel shard planning...")
+
+    shards = shard_endpoints(ENDPOINTS, by="path", max_shard_size=2)
+    assert len(shards) == 6 and all(len(shard) == 2 for shard in shards)
+
+    cwd = os.getcwd()
+    original_write = state_tools._write_state_file
+    torn_reads = []
+
+    def slow_write(path, content):
+        # Widen the read-modify-write window, updates get lost here unless mutations hold the state lock
+        time.sleep(0.002)
+        original_write(path, content)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        state_tools._write_state_file = slow_write
+        stop = threading.Event()
+
+        def reader():
+            # Writes replace the file atomically, a reader never sees a partial document
+            while not stop.is_set():
+                try:
+                    with open("scenarios_state.json") as f:
+                        json.loads(f.read())
+                except FileNotFoundError:
+                    pass
+                except ValueError as e:
+                    torn_reads.append(str(e))
+
+        watcher = threading.Thread(target=reader)
+        watcher.start()
+        try:
+            summary = merge_results(run_concurrently(_plan, shards, max_workers=4))
+        finally:
+            stop.set()
+            watcher.join()
+            state_tools._write_state_file = original_write
+
+        try:
+            before = json.loads(load_scenarios_state()[1])["scenarios"]
+            status, data = deduplicate_scenarios()
+            after = json.loads(load_scenarios_state()[1])["scenarios"]
+            again = json.loads(deduplicate_scenarios()[1])
+            final = json.loads(load_scenarios_state()[1])["scenarios"]
+            leftovers = [name for name in os.listdir(".") if name.startswith(".tmp_")]
+        finally:
+            os.chdir(cwd)
+
+    assert summary["succeeded"] == len(shards) and not summary["errors"], summary
+    assert not torn_reads, torn_reads[:1]
+    assert not leftovers, leftovers
+    # Every shard's writes survived: 12 endpoint scenarios plus a health and an auth_bypass check per shard
+    assert len(before) == len(ENDPOINTS) + 2 * len(shards), len(before)
+
+    assert status == 200 and json.loads(data)["duplicates_removed"] == len(shards) - 1, data
+    ids = [scenario["id"] for scenario in after]
+    assert len(ids) == len(set(ids)) == len(ENDPOINTS) + 1 + len(shards), ids
+    assert ids.count("health") == 1
+    assert sorted(i for i in ids if i.startswith("auth_bypass")) == sorted(
+        ["auth_bypass"] + [f"auth_bypass_{n}" for n in range(2, len(shards) + 1)])
+    assert {scenario["endpoint"] for scenario in after if scenario["id"].startswith("auth_bypass")} == {
+        shard[0].split(" ", 1)[1] for shard in shards}
+
+    # A second pass changes nothing, IDs handed out stay put
+    assert again["duplicates_removed"] == 0
+    assert [scenario["id"] for scenario in final] == ids
+    print(f"✅ {len(before)} scenarios from {len(shards)} parallel shards, {len(ids)} after deduplication")
+
+if __name__ == "__main__":
+    test_parallel_shard_planning()
+    print("\n🎉 Sharding tests passed!")
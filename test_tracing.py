@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Simple test script for span tracing and the trace analysis
+"""
+
+import os
+import tempfile
+import threading
+import contextvars
+from utils import tracing
+from utils.tracing import Tracer, load_spans, build_tree, critical_path, self_times
+
+def test_parent_links():
+    """Test that spans nest under the active span, also in threads started from its context"""
+    print("🧪 Testing span parent links...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl")
+        tracer = Tracer(path)
+        tracing.set_active_tracer(tracer)
+        try:
+            with tracing.span("scan", "scan") as scan:
+                with tracing.span("GET /api/users/{id}", "http", status=200):
+                    pass
+                # Tools run in threads that inherit a copy of the context
+                def read_state():
+                    with tracing.span("read x.json", "state_io", bytes=12):
+                        pass
+                worker = threading.Thread(target=contextvars.copy_context().run, args=(read_state,))
+                worker.start()
+                worker.join()
+                try:
+                    with tracing.span("boom", "tool"):
+                        raise ValueError("bad input")
+                except ValueError:
+                    pass
+        finally:
+            tracing.set_active_tracer(None)
+            tracer.close()
+
+        spans = {record["name"]: record for record in load_spans(path)}
+        assert spans["GET /api/users/{id}"]["parentSpanId"] == scan.span_id
+        assert spans["GET /api/users/{id}"]["attributes"]["status"] == 200
+        assert spans["boom"]["status"]["code"] == "ERROR"
+        assert spans["read x.json"]["parentSpanId"] == scan.span_id
+        assert spans["scan"]["parentSpanId"] == ""
+    with tracing.span("untraced") as nothing:
+        assert nothing is None
+    print("✅ Children linked to their parents, failures marked")
+
+def _span(span_id, parent, start, end, kind="tool", name=None):
+    return {"traceId": "t", "spanId": span_id, "parentSpanId": parent, "name": name or span_id, "kind": kind,
+            "startTimeUnixNano": int(start * 1e9), "endTimeUnixNano": int(end * 1e9), "attributes": {}, "status": {"code": "OK"}}
+
+def test_critical_path_and_self_time():
+    """Test that the critical path follows the child that finished last and self time excludes children"""
+    print("🧪 Testing critical path and self time...")
+
+    spans = [
+        _span("root", "", 0, 10, "scan"),
+        _span("a", "root", 1, 4),            # overlaps b, finishes before it
+        _span("b", "root", 2, 9),            # the root waited on b
+        _span("b1", "b", 3, 8, "http"),
+    ]
+    roots, children = build_tree(spans)
+    assert [record["spanId"] for record in roots] == ["root"]
+
+    path = {record["spanId"]: round(own, 3) for record, own in critical_path(roots[0], children)}
+    # a only shows for the second before b started
+    assert path == {"root": 2.0, "a": 1.0, "b": 2.0, "b1": 5.0}, path
+
+    by_name = {entry["name"]: round(entry["self_seconds"], 3) for entry in self_times(spans, children)}
+    assert by_name == {"root": 2.0, "a": 3.0, "b": 2.0, "b1": 5.0}, by_name
+    print("✅ Critical path and self times computed")
+
+if __name__ == "__main__":
+    test_parent_links()
+    test_critical_path_and_self_time()
+    print("\n🎉 Tracing tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the lease-based work queue
+"""
+
+import os
+import time
+import tempfile
+from utils.work_queue import SQLiteWorkQueue
+
+def test_lease_and_complete():
+    """Test that leased items go to one worker only and completed results are taken once"""
+    print("🧪 Testing leases and completion...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteWorkQueue(os.path.join(tmp, "queue.sqlite"))
+        assert queue.publish("scan", [("a", {"n": 1}), ("b", {"n": 2}), ("c", {"n": 3})]) == 3
+        # Re-publishing leaves queued items alone
+        assert queue.publish("scan", [("a", {"n": 1})]) == 0
+
+        first = queue.lease("w1", 2, 60)
+        second = queue.lease("w2", 2, 60)
+        assert [item["item_id"] for item in first] == ["a", "b"]
+        assert [item["item_id"] for item in second] == ["c"]
+
+        assert queue.complete("w1", first[0], {"results": [1]})
+        assert not queue.complete("w2", first[1], {"results": [2]}), "only the lease owner may complete"
+        assert queue.take_completed("scan") == [("a", {"results": [1]})]
+        assert queue.take_completed("scan") == []
+        queue.close()
+    print("✅ Items leased once and results taken once")
+
+def test_redelivery():
+    """Test that expired or released leases are redelivered until the attempts run out"""
+    print("🧪 Testing redelivery...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteWorkQueue(os.path.join(tmp, "queue.sqlite"))
+        queue.publish("scan", [("a", {})], max_attempts=2)
+
+        stale = queue.lease("w1", 1, 0.05)
+        time.sleep(0.1)
+        redelivered = queue.lease("w2", 1, 60)
+        assert [item["item_id"] for item in redelivered] == ["a"] and redelivered[0]["attempt"] == 2
+        assert not queue.complete("w1", stale[0], {}), "an expired lease cannot complete"
+
+        assert queue.release("w2", redelivered[0], "no result recorded")
+        assert queue.lease("w3", 1, 60) == []
+        counts = queue.counts("scan")
+        assert counts["failed"] == 1 and counts["redelivered"] == 1
+        assert queue.failures("scan") == {"a": "no result recorded"}
+
+        # Publishing again gives failed items a fresh set of attempts
+        assert queue.publish("scan", [("a", {})]) == 1
+        assert queue.lease("w3", 1, 60)[0]["attempt"] == 1
+        queue.close()
+    print("✅ Expired leases redelivered, exhausted items failed")
+
+def test_scan_budget():
+    """Test that recorded usage is taken once and a spent scan budget stops leasing"""
+    print("🧪 Testing scan budgets...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteWorkQueue(os.path.join(tmp, "queue.sqlite"))
+        queue.publish("scan", [("a", {}), ("b", {}), ("c", {})], budget={"max_requests": 3, "max_tokens": None, "max_seconds": None})
+        queue.publish("other", [("x", {})])
+        assert queue.remaining_budget("scan") == {"max_requests": 3, "max_tokens": None, "max_seconds": None}
+        assert queue.remaining_budget("other") is None
+
+        first = queue.lease("w1", 1, 60, "scan")
+        queue.record_usage("scan", requests=2, tokens=100)
+        assert queue.complete("w1", first[0], {"results": [1]})
+        assert [item["item_id"] for item in queue.lease("w2", 1, 60, "scan")] == ["b"]
+        queue.record_usage("scan", requests=1, tokens=50)
+        assert queue.take_usage("scan") == (3, 150)
+        assert queue.take_usage("scan") == (0, 0)
+        assert queue.remaining_budget("scan")["max_requests"] == 0
+
+        assert queue.lease("w1", 5, 60, "scan") == [], "a spent scan is not leased"
+        assert [item["item_id"] for item in queue.lease("w1", 5, 60)] == ["x"]
+        queue.close()
+    print("✅ Usage shared through the queue, spent scans not leased")
+
+if __name__ == "__main__":
+    test_lease_and_complete()
+    test_redelivery()
+    test_scan_budget()
+    print("\n🎉 Work queue tests passed!")
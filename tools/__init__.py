@@ -1,4 +1,4 @@
-from .http_tool import http_request
+from .http_tool import http_request, execute_scenario
 from .swagger_tool import get_swagger
 from .separate_state_tools import (
     # Endpoints tools
@@ -8,6 +8,7 @@ from .separate_state_tools import (
     
     # Scenarios tools
     add_test_scenario,
+    add_test_scenarios,
     get_pending_scenarios,
     mark_scenario_executed,
     get_scenarios_summary,
@@ -22,6 +23,11 @@ from .separate_state_tools import (
     get_vulnerabilities,
     get_vulnerabilities_summary,
     
+    # Analysis queue tools
+    queue_response,
+    get_queued_responses,
+    remove_queued_responses,
+    
     # Execution tracking tools
     check_execution_progress,
     is_testing_complete
@@ -29,6 +35,7 @@ from .separate_state_tools import (
 
 __all__ = [
     'http_request',
+    'execute_scenario',
     'get_swagger',
     
     # Endpoints tools
@@ -38,6 +45,7 @@ __all__ = [
     
     # Scenarios tools
     'add_test_scenario',
+    'add_test_scenarios',
     'get_pending_scenarios',
     'mark_scenario_executed',
     'get_scenarios_summary',
@@ -52,6 +60,11 @@ __all__ = [
     'get_vulnerabilities',
     'get_vulnerabilities_summary',
     
+    # Analysis queue tools
+    'queue_response',
+    'get_queued_responses',
+    'remove_queued_responses',
+    
     # Execution tracking tools
     'check_execution_progress',
     'is_testing_complete'
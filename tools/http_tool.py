@@ -1,4 +1,22 @@
+import time
+import threading
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from utils import metrics, tracing
+from utils.budget import get_active_budget, budget_exhausted
+from tools.payload_mutator import expand_oversized
+
+# One session per thread, so connections to the target are reused across probes
+_sessions = threading.local()
+
+def _session() -> requests.Session:
+    """HTTP session of the current thread; it never keeps cookies, each probe sends only its own"""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        _sessions.session = session
+    return session
 
 def http_request(
     method: str,
@@ -24,7 +42,7 @@ def http_request(
         headers (dict, optional): HTTP headers.
         params (dict, optional): URL query parameters.
         data (dict or str, optional): Form data or raw body.
-        json (dict, optional): JSON body (overrides `data` if provided).
+        json (dict, optional): JSON body (overrides `data` if provided); {"__oversized__": n} values are sent as n-character strings.
         files (dict, optional): Files to send in a multipart/form-data request.
         cookies (dict, optional): Cookies to send with the request.
         timeout (int, optional): Timeout for the request in seconds.
@@ -62,22 +80,36 @@ def http_request(
         error_msg = f"Invalid or missing URL: {url}"
         print(f"❌ {error_msg}")
         return None, None
+    
+    budget = get_active_budget()
+    if budget is not None:
+        reason = budget.exhausted()
+        if reason:
+            print(f"⏹️  Scan budget exhausted ({reason}), request not sent")
+            return None, None
+        budget.record_request()
 
+    started = time.perf_counter()
+    endpoint = metrics.endpoint_label(url)
     try:
-        response = requests.request(
-            method=method.upper(),
-            url=url,
-            headers=headers,
-            params=params,
-            data=data,
-            json=json,
-            files=files,
-            cookies=cookies,
-            timeout=timeout,
-            verify=verify,
-            allow_redirects=allow_redirects,
-            proxies=proxies
-        )
+        with tracing.span(f"{method.upper()} {endpoint}", "http", method=method.upper(), endpoint=endpoint, url=url) as probe:
+            response = _session().request(
+                method=method.upper(),
+                url=url,
+                headers=headers,
+                params=params,
+                data=data,
+                json=expand_oversized(json),
+                files=files,
+                cookies=cookies,
+                timeout=timeout,
+                verify=verify,
+                allow_redirects=allow_redirects,
+                proxies=proxies
+            )
+            if probe is not None:
+                probe.set_attributes(status=response.status_code, bytes=len(response.content))
+        metrics.observe_http_request(method, url, response.status_code, time.perf_counter() - started)
         
         print(f"✅ Response Status: {response.status_code}")
         print(f"📊 Response Length: {len(response.text)} characters")
@@ -90,11 +122,62 @@ def http_request(
         
         return response.status_code, response.text
     except requests.RequestException as e:
+        metrics.observe_http_request(method, url, None, time.perf_counter() - started)
         error_msg = f"HTTP request failed: {e}"
         print(f"❌ {error_msg}")
         return None, None
 
 
+# Characters of the response echoed back to the executor when the full body goes to the analysis queue
+QUEUED_PREVIEW_CHARS = 500
+
+def execute_scenario(
+    scenario_id: str,
+    method: str,
+    url: str,
+    *,
+    headers: dict = None,
+    params: dict = None,
+    json_body: dict = None,
+    timeout: int = 10
+):
+    """
+    Sends the request of a test scenario and queues the response for batched analysis.
+    The scenario is marked as executed; its verdict and any vulnerability are recorded later by the analysis stage.
+    A request that is not sent (scan budget used up, invalid URL, network error) leaves the scenario pending.
+
+    Args:
+        scenario_id (str): ID of the scenario being executed.
+        method (str): HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
+        url (str): The URL to send the request to.
+        headers (dict, optional): HTTP headers.
+        params (dict, optional): URL query parameters.
+        json_body (dict, optional): JSON body.
+        timeout (int, optional): Timeout for the request in seconds.
+
+    Returns:
+        tuple: (status_code: int, response_preview: str) with the first characters of the response body,
+        or (500, error message) when the request was not sent.
+    """
+    from tools.separate_state_tools import queue_response
+
+    status_code, body = http_request(method, url, headers=headers, params=params, json=json_body, timeout=timeout)
+    if status_code is None:
+        # Nothing reached the target, the scenario stays pending so it can be retried
+        reason = budget_exhausted() or "invalid URL or network error"
+        return 500, f"Error executing scenario {scenario_id}: request not sent ({reason})"
+    request = {"method": method.upper(), "url": url, "headers": headers, "params": params, "json": json_body}
+    queue_status, queue_data = queue_response({
+        "scenario_id": scenario_id,
+        "request": {key: value for key, value in request.items() if value},
+        "status_code": status_code or 0,
+        "response_body": body or ""
+    })
+    if queue_status != 200:
+        return queue_status, queue_data
+    return status_code, (body or "")[:QUEUED_PREVIEW_CHARS]
+
+
 if __name__ == "__main__":
     # Example: Simple GET request to a local endpoint
     status, body = http_request(
@@ -0,0 +1,177 @@
+"""
+Structured model of the operations declared in an OpenAPI/Swagger specification
+"""
+
+import re
+import json
+import hashlib
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+def operation_key(method: str, path: str) -> str:
+    """Build the canonical "METHOD /path" key used by the endpoints state"""
+    return f"{method.upper()} {path}"
+
+
+def resolve_refs(node: Any, spec: Dict[str, Any], _seen: Optional[tuple] = None) -> Any:
+    """Inline local JSON references ("#/components/...") so operations are self-contained"""
+    seen = _seen or ()
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/"):
+            if ref in seen:
+                # Recursive schema, keep the reference instead of looping forever
+                return {"$ref": ref}
+            target: Any = spec
+            for part in ref[2:].split("/"):
+                part = part.replace("~1", "/").replace("~0", "~")
+                if not isinstance(target, dict) or part not in target:
+                    return {"$ref": ref}
+                target = target[part]
+            return resolve_refs(target, spec, seen + (ref,))
+        return {k: resolve_refs(v, spec, seen) for k, v in node.items()}
+    if isinstance(node, list):
+        return [resolve_refs(v, spec, seen) for v in node]
+    return node
+
+
+@dataclass
+class Operation:
+    """A single METHOD + path operation with its references resolved"""
+    method: str
+    path: str
+    operation_id: Optional[str] = None
+    summary: str = ""
+    tags: List[str] = field(default_factory=list)
+    parameters: List[Dict[str, Any]] = field(default_factory=list)
+    request_body_schema: Optional[Dict[str, Any]] = None
+    requires_auth: bool = False
+    definition: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        """Canonical "METHOD /path" key"""
+        return operation_key(self.method, self.path)
+
+    @property
+    def slug(self) -> str:
+        """Identifier-safe form of the key, e.g. get_api_profiles_username"""
+        path = re.sub(r"[^a-zA-Z0-9]+", "_", self.path).strip("_").lower()
+        return f"{self.method.lower()}_{path}" if path else self.method.lower()
+
+    def fingerprint(self) -> str:
+        """Stable hash of the resolved operation definition"""
+        canonical = json.dumps({"key": self.key, "definition": self.definition}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def parse_operations(spec: Dict[str, Any]) -> List[Operation]:
+    """Extract every operation from a parsed OpenAPI 3 / Swagger 2 document"""
+    operations: List[Operation] = []
+    global_security = spec.get("security") or []
+
+    for path, path_item in (spec.get("paths") or {}).items():
+        if not isinstance(path_item, dict):
+            continue
+        path_item = resolve_refs(path_item, spec)
+        shared_params = path_item.get("parameters", [])
+
+        for method, op in path_item.items():
+            if method.lower() not in HTTP_METHODS or not isinstance(op, dict):
+                continue
+
+            # Path level parameters apply unless the operation overrides them
+            params = {(p.get("name"), p.get("in")): p for p in shared_params if isinstance(p, dict)}
+            for p in op.get("parameters", []):
+                if isinstance(p, dict):
+                    params[(p.get("name"), p.get("in"))] = p
+
+            body_schema = None
+            request_body = op.get("requestBody") or {}
+            for media_type, content in (request_body.get("content") or {}).items():
+                if "json" in media_type and isinstance(content, dict):
+                    body_schema = content.get("schema")
+                    break
+            if body_schema is None:
+                # Swagger 2 declares the body as an "in: body" parameter
+                for p in params.values():
+                    if p.get("in") == "body":
+                        body_schema = p.get("schema")
+                        break
+
+            security = op.get("security", global_security)
+
+            definition = dict(op)
+            definition["parameters"] = list(params.values())
+
+            operations.append(Operation(
+                method=method.upper(),
+                path=path,
+                operation_id=op.get("operationId"),
+                summary=op.get("summary", "") or "",
+                tags=list(op.get("tags", [])),
+                parameters=list(params.values()),
+                request_body_schema=body_schema,
+                requires_auth=bool(security),
+                definition=definition
+            ))
+
+    return operations
+
+
+def fingerprint_operations(operations: List[Operation]) -> Dict[str, str]:
+    """Map each operation key to its schema fingerprint"""
+    return {op.key: op.fingerprint() for op in operations}
+
+
+def example_payload(schema: Optional[Dict[str, Any]], _depth: int = 0) -> Any:
+    """Build a plausible example value for a resolved JSON schema"""
+    if not isinstance(schema, dict) or _depth > 8:
+        return None
+    if "example" in schema:
+        return schema["example"]
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+
+    if "allOf" in schema:
+        merged: Dict[str, Any] = {}
+        for part in schema["allOf"]:
+            value = example_payload(part, _depth + 1)
+            if isinstance(value, dict):
+                merged.update(value)
+        return merged
+    for combinator in ("oneOf", "anyOf"):
+        if schema.get(combinator):
+            return example_payload(schema[combinator][0], _depth + 1)
+
+    schema_type = schema.get("type")
+    if schema_type == "object" or "properties" in schema:
+        return {
+            name: example_payload(prop, _depth + 1)
+            for name, prop in (schema.get("properties") or {}).items()
+        }
+    if schema_type == "array":
+        return [example_payload(schema.get("items"), _depth + 1)]
+    if schema_type == "integer":
+        return 1
+    if schema_type == "number":
+        return 1.0
+    if schema_type == "boolean":
+        return False
+    if schema_type == "string":
+        string_format = schema.get("format", "")
+        if string_format == "email":
+            return "user@example.com"
+        if string_format == "date-time":
+            return "2025-01-01T00:00:00Z"
+        if string_format == "date":
+            return "2025-01-01"
+        if string_format == "uuid":
+            return "00000000-0000-0000-0000-000000000000"
+        return "string"
+    return None
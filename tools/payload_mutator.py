@@ -0,0 +1,194 @@
+"""
+Bulk payload mutation for boundary and type-confusion testing.
+
+Takes a request body schema and a seed payload and derives variants per field
+(numeric boundaries, type swaps, null/empty values, oversized strings) plus
+extra privileged fields at the top level. Variants share unchanged sub-objects
+with the seed instead of deep-copying it, so thousands of scenarios can be
+produced per second without the model.
+"""
+
+import random
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from tools.openapi_model import Operation, example_payload
+from tools.separate_states import TestScenario
+
+MUTATION_PREFIX = "mut_"
+
+NUMERIC_BOUNDARIES = (0, -1, -100, 0.0001, 2 ** 31 - 1, -(2 ** 31), 2 ** 63, 1e308)
+
+OVERSIZED_LENGTHS = (1024, 65536)
+# Oversized strings longer than this are stored as {OVERSIZED_MARKER: length} and only expanded when the request is sent,
+# so scenario state and executor prompts stay small
+MAX_INLINE_OVERSIZED = 1024
+OVERSIZED_MARKER = "__oversized__"
+
+EXTRA_PRIVILEGED_FIELDS = (
+    ("admin", True),
+    ("is_admin", True),
+    ("role", "administrator"),
+    ("permissions", ["*"]),
+    ("user_id", 1),
+    ("owner_id", 1),
+    ("verified", True),
+    ("balance", 1000000),
+)
+
+Path = Tuple[str, ...]
+
+
+def _field_paths(schema: Optional[Dict[str, Any]], payload: Any, prefix: Path = (), _depth: int = 0) -> Iterator[Tuple[Path, Optional[Dict[str, Any]], Any]]:
+    """Yield (path, field schema, seed value) for every leaf and object field"""
+    if _depth > 6 or not isinstance(payload, dict):
+        return
+    properties = (schema or {}).get("properties") or {}
+    for name, value in payload.items():
+        field_schema = properties.get(name) if isinstance(properties.get(name), dict) else None
+        path = prefix + (name,)
+        yield path, field_schema, value
+        if isinstance(value, dict):
+            yield from _field_paths(field_schema, value, path, _depth + 1)
+
+
+def _field_type(field_schema: Optional[Dict[str, Any]], value: Any) -> str:
+    if field_schema and field_schema.get("type"):
+        return field_schema["type"]
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return "null"
+
+
+_MISSING = object()
+
+
+def _with_value(payload: Dict[str, Any], path: Path, value: Any) -> Dict[str, Any]:
+    """Copy only the containers along path, sharing every other sub-object with payload"""
+    root = dict(payload)
+    target = root
+    for part in path[:-1]:
+        child = target.get(part)
+        child = dict(child) if isinstance(child, dict) else {}
+        target[part] = child
+        target = child
+    if value is _MISSING:
+        target.pop(path[-1], None)
+    else:
+        target[path[-1]] = value
+    return root
+
+
+def _field_mutations(field_type: str, value: Any) -> Iterator[Tuple[str, Any]]:
+    """(mutation name, new value) pairs for one field"""
+    if field_type in ("integer", "number"):
+        for boundary in NUMERIC_BOUNDARIES:
+            yield "numeric_boundary", boundary
+        yield "type_swap", str(value if value is not None else 1)
+        yield "type_swap", [value]
+    elif field_type == "string":
+        yield "type_swap", 12345
+        yield "type_swap", True
+        yield "type_swap", {"$ne": None}
+        for length in OVERSIZED_LENGTHS:
+            yield "oversized_string", "A" * length if length <= MAX_INLINE_OVERSIZED else {OVERSIZED_MARKER: length}
+        yield "empty", ""
+    elif field_type == "boolean":
+        yield "type_swap", "true"
+        yield "type_swap", 1
+    elif field_type == "array":
+        yield "type_swap", {}
+        yield "empty", []
+    elif field_type == "object":
+        yield "type_swap", []
+        yield "empty", {}
+    yield "null", None
+    yield "missing", _MISSING
+
+
+def expand_oversized(payload: Any) -> Any:
+    """Payload as sent: every {OVERSIZED_MARKER: length} becomes a string of that length, other values are shared"""
+    if isinstance(payload, dict):
+        if len(payload) == 1 and isinstance(payload.get(OVERSIZED_MARKER), int):
+            return "A" * payload[OVERSIZED_MARKER]
+        expanded = {key: expand_oversized(value) for key, value in payload.items()}
+        return payload if all(expanded[key] is payload[key] for key in payload) else expanded
+    if isinstance(payload, list):
+        expanded = [expand_oversized(value) for value in payload]
+        return payload if all(new is old for new, old in zip(expanded, payload)) else expanded
+    return payload
+
+
+def generate_mutations(schema: Optional[Dict[str, Any]], seed_payload: Any = None) -> List[Tuple[str, str, Any]]:
+    """Every mutation of the seed payload as (mutation name, target, payload) tuples"""
+    if seed_payload is None:
+        seed_payload = example_payload(schema)
+    if not isinstance(seed_payload, dict):
+        seed_payload = {}
+
+    variants: List[Tuple[str, str, Any]] = []
+    for path, field_schema, value in _field_paths(schema, seed_payload):
+        field_type = _field_type(field_schema, value)
+        target = ".".join(path)
+        for name, new_value in _field_mutations(field_type, value):
+            variants.append((name, target, _with_value(seed_payload, path, new_value)))
+
+    for field_name, field_value in EXTRA_PRIVILEGED_FIELDS:
+        if field_name not in seed_payload:
+            variants.append(("extra_privileged_field", field_name, _with_value(seed_payload, (field_name,), field_value)))
+
+    return variants
+
+
+def sample_mutations(schema: Optional[Dict[str, Any]], seed_payload: Any = None, count: int = 0,
+                     seed: int = 0) -> List[Tuple[str, str, Any]]:
+    """Up to count mutations, sampled reproducibly for a given seed (0 or less keeps all)"""
+    variants = generate_mutations(schema, seed_payload)
+    if count <= 0 or count >= len(variants):
+        return variants
+    indexes = sorted(random.Random(seed).sample(range(len(variants)), count))
+    return [variants[i] for i in indexes]
+
+
+def mutation_scenarios(operation: Operation, count: int = 0, seed: int = 0, seed_payload: Any = None,
+                       auth_token: Optional[str] = "VALID_TOKEN") -> List[TestScenario]:
+    """Scenarios for mutated request bodies of one operation"""
+    if operation.request_body_schema is None and seed_payload is None:
+        return []
+    scenarios = []
+    for index, (name, target, payload) in enumerate(
+            sample_mutations(operation.request_body_schema, seed_payload, count, seed)):
+        scenarios.append(TestScenario(
+            id=f"{MUTATION_PREFIX}{operation.slug}_{index:04d}_{name}",
+            description=f"Payload Mutation ({name}): {target} on {operation.method} {operation.path}",
+            endpoint=operation.path,
+            method=operation.method,
+            payload=payload,
+            auth_token=auth_token
+        ))
+    return scenarios
+
+
+def mutation_scenario_dicts(operations: List[Operation], count: int = 0, seed: int = 0) -> List[Dict[str, Any]]:
+    """Mutation scenarios for every operation in the dict format accepted by add_test_scenarios"""
+    return [
+        {
+            "id": s.id,
+            "description": s.description,
+            "endpoint": s.endpoint,
+            "method": s.method,
+            "payload": s.payload,
+            "auth_token": s.auth_token,
+            "executed": s.executed
+        }
+        for operation in operations
+        for s in mutation_scenarios(operation, count, seed)
+    ]
@@ -0,0 +1,100 @@
+"""
+Persistent cache of planned scenarios keyed by operation fingerprint
+"""
+
+import json
+import time
+import hashlib
+from dataclasses import asdict
+from typing import List, Dict, Any, Optional, Iterable
+
+PLAN_CACHE_FILE = "plan_cache.json"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def plan_cache_key(fingerprint: str, prompt_version: str) -> str:
+    """Cache key for an operation definition planned with a given planner prompt"""
+    return hashlib.sha256(f"{prompt_version}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Maps cache keys to the scenarios the planner produced for one operation"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached scenario dicts, or None on a miss or expired entry"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds is not None and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            del self.entries[key]
+            return None
+        return entry.get("scenarios", [])
+
+    def put(self, key: str, operation: str, scenarios: Iterable[Any]):
+        """Store scenarios (TestScenario or dict) for an operation"""
+        stored = []
+        for scenario in scenarios:
+            data = dict(scenario) if isinstance(scenario, dict) else asdict(scenario)
+            data["executed"] = False
+            stored.append(data)
+        self.entries[key] = {"operation": operation, "created_at": time.time(), "scenarios": stored}
+
+    def clear(self) -> int:
+        """Drop every entry"""
+        removed = len(self.entries)
+        self.entries = {}
+        return removed
+
+    def invalidate(self, operations: Iterable[str]) -> int:
+        """Drop every entry of the given operation keys, whatever definition or prompt version it was planned for"""
+        targets = set(operations)
+        stale = [key for key, entry in self.entries.items() if entry.get("operation") in targets]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def prune_expired(self) -> int:
+        """Drop entries older than the TTL"""
+        if self.ttl_seconds is None:
+            return 0
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if now - entry.get("created_at", 0) > self.ttl_seconds]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
+
+    def to_json(self) -> str:
+        """Serialize to JSON"""
+        return json.dumps({"entries": self.entries}, indent=2)
+
+    @classmethod
+    def from_json(cls, json_str: str, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> 'PlanCache':
+        """Deserialize from JSON"""
+        cache = cls(ttl_seconds)
+        if json_str and json_str != "{}":
+            try:
+                data = json.loads(json_str)
+                cache.entries = data.get("entries", {})
+            except json.JSONDecodeError:
+                pass
+        return cache
+
+
+def load_plan_cache(ttl_seconds: float = DEFAULT_TTL_SECONDS, path: str = PLAN_CACHE_FILE) -> PlanCache:
+    """Load the plan cache, starting empty if it does not exist"""
+    try:
+        with open(path, "r") as f:
+            return PlanCache.from_json(f.read(), ttl_seconds)
+    except FileNotFoundError:
+        return PlanCache(ttl_seconds)
+
+
+def save_plan_cache(cache: PlanCache, path: str = PLAN_CACHE_FILE):
+    """Persist the plan cache"""
+    cache.prune_expired()
+    with open(path, "w") as f:
+        f.write(cache.to_json())
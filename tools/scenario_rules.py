@@ -0,0 +1,204 @@
+"""
+Deterministic scenario generation for the standard vulnerability classes.
+
+The planner prompt describes several mechanical patterns (unauthenticated access,
+cross-user ID swaps, admin-flag mass assignment, negative amounts). These are
+expanded here straight from the structured endpoint model so the LLM planner
+only has to come up with the novel business logic cases.
+"""
+
+import re
+import copy
+from typing import List, Dict, Any, Optional, Tuple
+from tools.openapi_model import Operation, example_payload
+from tools.separate_states import TestScenario
+
+RULE_PREFIX = "rule_"
+
+# Path fragments that usually indicate user-owned or privileged resources
+SENSITIVE_KEYWORDS = (
+    "user", "profile", "account", "admin", "member", "payment", "order", "invoice",
+    "billing", "wallet", "transfer", "debug", "internal", "settings", "feed", "comment"
+)
+
+# Path fragments of endpoints that are public by design
+PUBLIC_KEYWORDS = ("login", "signin", "signup", "register", "token", "health", "openapi", "swagger", "docs")
+
+# Path fragments of money-moving endpoints
+PAYMENT_KEYWORDS = ("payment", "membership", "checkout", "order", "transfer", "wallet", "billing", "subscription")
+
+# Body fields that carry amounts or quantities
+AMOUNT_FIELDS = ("amount", "price", "quantity", "qty", "total", "balance", "credit", "cost", "fee", "count", "value")
+
+PRIVILEGED_FIELDS = {"admin": True, "is_admin": True, "role": "administrator"}
+
+WRITE_METHODS = ("POST", "PUT", "PATCH")
+
+
+def _path_params(operation: Operation) -> List[str]:
+    """Names of the templated path parameters"""
+    return re.findall(r"{([^}]+)}", operation.path)
+
+
+def _matches(path: str, keywords: Tuple[str, ...]) -> bool:
+    lowered = path.lower()
+    return any(keyword in lowered for keyword in keywords)
+
+
+def _body_target(payload: Any) -> Any:
+    """Return the object fields should be injected into.
+
+    Many APIs wrap the resource in a single key ({"user": {...}}), in which case
+    the inner object is the one the server binds to its model.
+    """
+    if isinstance(payload, dict) and len(payload) == 1:
+        inner = next(iter(payload.values()))
+        if isinstance(inner, dict):
+            return inner
+    return payload
+
+
+def _amount_paths(schema: Optional[Dict[str, Any]], prefix: Tuple[str, ...] = (), _depth: int = 0) -> List[Tuple[str, ...]]:
+    """Paths to numeric fields whose names look like amounts"""
+    if not isinstance(schema, dict) or _depth > 6:
+        return []
+    paths: List[Tuple[str, ...]] = []
+    for name, prop in (schema.get("properties") or {}).items():
+        if not isinstance(prop, dict):
+            continue
+        if prop.get("type") in ("integer", "number") and any(f in name.lower() for f in AMOUNT_FIELDS):
+            paths.append(prefix + (name,))
+        elif prop.get("type") == "object" or "properties" in prop:
+            paths.extend(_amount_paths(prop, prefix + (name,), _depth + 1))
+    return paths
+
+
+def _set_path(payload: Dict[str, Any], path: Tuple[str, ...], value: Any):
+    target = payload
+    for part in path[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    target[path[-1]] = value
+
+
+def _scenario(kind: str, operation: Operation, description: str, payload: Any = None,
+              auth_token: Optional[str] = None, suffix: str = "") -> TestScenario:
+    scenario_id = f"{RULE_PREFIX}{kind}_{operation.slug}"
+    if suffix:
+        scenario_id += f"_{suffix}"
+    return TestScenario(
+        id=scenario_id,
+        description=description,
+        endpoint=operation.path,
+        method=operation.method,
+        payload=payload,
+        auth_token=auth_token
+    )
+
+
+def unauthenticated_access(operation: Operation) -> List[TestScenario]:
+    """Protected endpoint called without any token"""
+    if _matches(operation.path, PUBLIC_KEYWORDS):
+        return []
+    if not (operation.requires_auth or _matches(operation.path, SENSITIVE_KEYWORDS)):
+        return []
+    payload = example_payload(operation.request_body_schema) if operation.method in WRITE_METHODS else None
+    return [_scenario(
+        "function_level_bypass_unauthenticated", operation,
+        f"Function-Level Authorization: Unauthenticated access to {operation.method} {operation.path}",
+        payload=payload
+    )]
+
+
+def cross_user_id_swap(operation: Operation) -> List[TestScenario]:
+    """User A addresses User B's resource through the path parameters"""
+    scenarios = []
+    for param in _path_params(operation):
+        payload = example_payload(operation.request_body_schema) if operation.method in WRITE_METHODS else None
+        scenarios.append(_scenario(
+            "idor_cross_user", operation,
+            f"IDOR: User A substitutes User B's {param} in {operation.method} {operation.path}",
+            payload=payload,
+            auth_token="USER_A_TOKEN_ACCESSING_USER_B_RESOURCE",
+            suffix=re.sub(r"[^a-zA-Z0-9]+", "_", param).lower()
+        ))
+    return scenarios
+
+
+def admin_flag_mass_assignment(operation: Operation) -> List[TestScenario]:
+    """Write endpoint receives privileged fields it should not bind"""
+    if operation.method not in WRITE_METHODS or operation.request_body_schema is None:
+        return []
+    payload = example_payload(operation.request_body_schema)
+    if not isinstance(payload, dict):
+        payload = {}
+    target = _body_target(payload)
+    if not isinstance(target, dict):
+        return []
+    target.update(PRIVILEGED_FIELDS)
+    return [_scenario(
+        "privilege_escalation_admin_flag", operation,
+        f"Privilege Escalation: Regular user sets admin flag via mass assignment on {operation.method} {operation.path}",
+        payload=payload,
+        auth_token="REGULAR_USER_TOKEN"
+    )]
+
+
+def negative_amounts(operation: Operation) -> List[TestScenario]:
+    """Amount-like fields submitted as negative values"""
+    if operation.method not in WRITE_METHODS:
+        return []
+    base = example_payload(operation.request_body_schema)
+    if not isinstance(base, dict):
+        base = {}
+
+    paths = _amount_paths(operation.request_body_schema)
+    if not paths and _matches(operation.path, PAYMENT_KEYWORDS):
+        # No declared amount field, probe for an undocumented one
+        paths = [("amount",)]
+
+    scenarios = []
+    for path in paths:
+        payload = copy.deepcopy(base)
+        _set_path(payload, path, -100)
+        scenarios.append(_scenario(
+            "business_logic_negative", operation,
+            f"Business Logic: Negative {'.'.join(path)} on {operation.method} {operation.path} to credit instead of debit",
+            payload=payload,
+            auth_token="VALID_TOKEN",
+            suffix=re.sub(r"[^a-zA-Z0-9]+", "_", "_".join(path)).lower()
+        ))
+    return scenarios
+
+
+RULES = (unauthenticated_access, cross_user_id_swap, admin_flag_mass_assignment, negative_amounts)
+
+
+def generate_rule_based_scenarios(operations: List[Operation]) -> List[TestScenario]:
+    """Expand every rule over the given operations"""
+    scenarios: List[TestScenario] = []
+    seen = set()
+    for operation in operations:
+        for rule in RULES:
+            for scenario in rule(operation):
+                if scenario.id not in seen:
+                    seen.add(scenario.id)
+                    scenarios.append(scenario)
+    return scenarios
+
+
+def rule_based_scenario_dicts(operations: List[Operation]) -> List[Dict[str, Any]]:
+    """Rule-based scenarios in the dict format accepted by add_test_scenarios"""
+    return [
+        {
+            "id": s.id,
+            "description": s.description,
+            "endpoint": s.endpoint,
+            "method": s.method,
+            "payload": s.payload,
+            "auth_token": s.auth_token,
+            "executed": s.executed
+        }
+        for s in generate_rule_based_scenarios(operations)
+    ]
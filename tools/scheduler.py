@@ -0,0 +1,87 @@
+"""
+Risk-ranked scheduling of pending test scenarios
+"""
+
+import heapq
+from typing import List, Dict, Any, Iterable, Set
+from tools.separate_states import TestScenario
+from tools.spec_diff import scenario_operation_key
+from utils.sharding import path_prefix
+
+# Weight of the vulnerability class, matched against the scenario ID prefix
+CLASS_WEIGHTS = (
+    ("privilege_escalation", 5),
+    ("idor", 5),
+    ("bola", 5),
+    ("injection", 5),
+    ("function_level", 4),
+    ("business_logic", 3),
+    ("toctou", 3),
+    ("session", 2),
+    ("bulk", 2),
+)
+DEFAULT_CLASS_WEIGHT = 2
+
+# Extra weight for sensitive endpoints, matched against the path
+SENSITIVITY_WEIGHTS = (
+    (("admin", "debug", "internal"), 3),
+    (("payment", "membership", "billing", "checkout", "transfer", "wallet", "order"), 3),
+    (("auth", "login", "token", "session", "password"), 2),
+    (("user", "profile", "account"), 1),
+)
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+WRITE_WEIGHT = 2
+SIBLING_FINDING_WEIGHT = 3
+
+
+def _class_weight(scenario: TestScenario) -> int:
+    scenario_id = scenario.id.lower()
+    if scenario_id.startswith("rule_"):
+        scenario_id = scenario_id[len("rule_"):]
+    for prefix, weight in CLASS_WEIGHTS:
+        if scenario_id.startswith(prefix):
+            return weight
+    return DEFAULT_CLASS_WEIGHT
+
+
+def vulnerable_prefixes(vulnerabilities: Iterable[Dict[str, Any]], scenarios: Iterable[TestScenario]) -> Set[str]:
+    """Path prefixes of endpoints that already produced a finding"""
+    by_id = {s.id: s for s in scenarios}
+    prefixes = set()
+    for vuln in vulnerabilities:
+        scenario = by_id.get(vuln.get("scenario_id", vuln.get("id")))
+        if scenario is not None:
+            prefixes.add(path_prefix(scenario_operation_key(scenario)))
+        elif vuln.get("endpoint"):
+            prefixes.add(path_prefix(str(vuln["endpoint"])))
+    return prefixes
+
+
+def score_scenario(scenario: TestScenario, hot_prefixes: Set[str] = frozenset()) -> int:
+    """Higher scores are executed first"""
+    key = scenario_operation_key(scenario)
+    method, _, path = key.partition(" ")
+    lowered = path.lower()
+
+    score = _class_weight(scenario)
+    for keywords, weight in SENSITIVITY_WEIGHTS:
+        if any(keyword in lowered for keyword in keywords):
+            score += weight
+            break
+    if method in WRITE_METHODS:
+        score += WRITE_WEIGHT
+    if path_prefix(key) in hot_prefixes:
+        score += SIBLING_FINDING_WEIGHT
+    return score
+
+
+def rank_scenarios(pending: List[TestScenario], hot_prefixes: Set[str] = frozenset(), limit: int = 0) -> List[TestScenario]:
+    """Pop pending scenarios from a priority queue, highest risk first.
+
+    Ties keep insertion order so ranking is deterministic.
+    """
+    heap = [(-score_scenario(s, hot_prefixes), index, s) for index, s in enumerate(pending)]
+    heapq.heapify(heap)
+    count = len(heap) if limit <= 0 else min(limit, len(heap))
+    return [heapq.heappop(heap)[2] for _ in range(count)]
@@ -2,9 +2,53 @@
 Specialized tools for separate state management
 """
 
+import os
 import json
-from typing import Dict, List, Any, Tuple
-from tools.separate_states import EndpointsState, ScenariosState, ResultsState, VulnerabilitiesState, TestScenario, TestResult
+import functools
+import time
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from utils import metrics, tracing
+from tools.separate_states import EndpointsState, ScenariosState, ResultsState, VulnerabilitiesState, FingerprintsState, AnalysisQueueState, TestScenario, TestResult
+
+# Serializes read-modify-write cycles so concurrent agents (e.g. parallel planner shards) don't lose updates
+_state_lock = threading.RLock()
+
+def _locked(func):
+    """Run a state mutation while holding the state lock"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _state_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+def _read_state_file(path: str) -> str:
+    """Read a state file, timed for the state I/O metrics and traces"""
+    started = time.perf_counter()
+    with tracing.span(f"read {os.path.basename(path)}", "state_io", file=path) as io:
+        with open(path, "r") as f:
+            content = f.read()
+        if io is not None:
+            io.set_attributes(bytes=len(content))
+    metrics.observe_state_io("read", path, time.perf_counter() - started, len(content))
+    return content
+
+def _write_state_file(path: str, content: str):
+    """Write a state file atomically so readers never see a partial document"""
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    with tracing.span(f"write {os.path.basename(path)}", "state_io", file=path, bytes=len(content)):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    metrics.observe_state_io("write", path, time.perf_counter() - started, len(content))
 
 # =====================================
 # ENDPOINTS TOOLS
@@ -14,8 +58,7 @@ def load_endpoints_state() -> Tuple[int, str]:
     """Load endpoints state"""
     try:
         try:
-            with open("endpoints_state.json", "r") as f:
-                return 200, f.read()
+            return 200, _read_state_file("endpoints_state.json")
         except FileNotFoundError:
             empty_state = EndpointsState()
             return 200, empty_state.to_json()
@@ -26,12 +69,12 @@ def save_endpoints_state(state_json: str) -> Tuple[int, str]:
     """Save endpoints state"""
     try:
         state = EndpointsState.from_json(state_json)
-        with open("endpoints_state.json", "w") as f:
-            f.write(state.to_json())
+        _write_state_file("endpoints_state.json", state.to_json())
         return 200, "Endpoints state saved successfully"
     except Exception as e:
         return 500, f"Error saving endpoints state: {str(e)}"
 
+@_locked
 def add_endpoint(endpoint: str) -> Tuple[int, str]:
     """Add an endpoint to endpoints state"""
     try:
@@ -77,8 +120,7 @@ def load_scenarios_state() -> Tuple[int, str]:
     """Load scenarios state"""
     try:
         try:
-            with open("scenarios_state.json", "r") as f:
-                return 200, f.read()
+            return 200, _read_state_file("scenarios_state.json")
         except FileNotFoundError:
             empty_state = ScenariosState()
             return 200, empty_state.to_json()
@@ -89,12 +131,13 @@ def save_scenarios_state(state_json: str) -> Tuple[int, str]:
     """Save scenarios state"""
     try:
         state = ScenariosState.from_json(state_json)
-        with open("scenarios_state.json", "w") as f:
-            f.write(state.to_json())
+        _write_state_file("scenarios_state.json", state.to_json())
+        metrics.set_scenario_counts(state.get_total_count(), state.get_executed_count())
         return 200, "Scenarios state saved successfully"
     except Exception as e:
         return 500, f"Error saving scenarios state: {str(e)}"
 
+@_locked
 def add_test_scenario(scenario_data: Dict[str, Any]) -> Tuple[int, str]:
     """Add a test scenario"""
     try:
@@ -117,15 +160,83 @@ def add_test_scenario(scenario_data: Dict[str, Any]) -> Tuple[int, str]:
     except Exception as e:
         return 500, f"Error adding test scenario: {str(e)}"
 
-def get_pending_scenarios() -> Tuple[int, str]:
-    """Get all pending (unexecuted) scenarios"""
+@_locked
+def add_test_scenarios(scenarios_data: List[Dict[str, Any]]) -> Tuple[int, str]:
+    """Add many test scenarios in one call, skipping IDs that already exist"""
+    try:
+        status, state_json = load_scenarios_state()
+        if status != 200:
+            return status, state_json
+        
+        state = ScenariosState.from_json(state_json)
+        existing_ids = {s.id for s in state.scenarios}
+        added = 0
+        for scenario_data in scenarios_data:
+            scenario_id = scenario_data.get("id", "")
+            if scenario_id in existing_ids:
+                continue
+            existing_ids.add(scenario_id)
+            state.add_scenario(TestScenario(
+                id=scenario_id,
+                description=scenario_data.get("description", ""),
+                endpoint=scenario_data.get("endpoint", ""),
+                method=scenario_data.get("method", ""),
+                payload=scenario_data.get("payload"),
+                auth_token=scenario_data.get("auth_token"),
+                executed=scenario_data.get("executed", False)
+            ))
+            added += 1
+        
+        status, message = save_scenarios_state(state.to_json())
+        if status != 200:
+            return status, message
+        return 200, json.dumps({"scenarios_added": added, "duplicates_skipped": len(scenarios_data) - added})
+    except Exception as e:
+        return 500, f"Error adding test scenarios: {str(e)}"
+
+@_locked
+def deduplicate_scenarios() -> Tuple[int, str]:
+    """Merge duplicate scenarios, e.g. after parallel planner shards"""
+    try:
+        status, state_json = load_scenarios_state()
+        if status != 200:
+            return status, state_json
+        
+        state = ScenariosState.from_json(state_json)
+        removed = state.deduplicate()
+        status, message = save_scenarios_state(state.to_json())
+        if status != 200:
+            return status, message
+        return 200, json.dumps({"duplicates_removed": removed, "total_scenarios": state.get_total_count()})
+    except Exception as e:
+        return 500, f"Error deduplicating scenarios: {str(e)}"
+
+def get_pending_scenarios(limit: int = 0) -> Tuple[int, str]:
+    """Get pending (unexecuted) scenarios, highest risk first.
+    
+    Args:
+        limit: Maximum number of scenarios to return (0 returns all of them)
+    
+    Returns an empty list once the scan budget is exhausted.
+    """
     try:
+        from tools.scheduler import rank_scenarios, vulnerable_prefixes
+        from utils.budget import budget_exhausted
+        
+        if budget_exhausted():
+            return 200, json.dumps([])
+        
         status, state_json = load_scenarios_state()
         if status != 200:
             return status, state_json
         
         state = ScenariosState.from_json(state_json)
-        pending = state.get_pending_scenarios()
+        
+        vulns_status, vulns_json = load_vulnerabilities_state()
+        vulns = VulnerabilitiesState.from_json(vulns_json) if vulns_status == 200 else VulnerabilitiesState()
+        hot_prefixes = vulnerable_prefixes(vulns.vulnerabilities, state.scenarios)
+        
+        pending = rank_scenarios(state.get_pending_scenarios(), hot_prefixes, limit)
         pending_dicts = [
             {
                 "id": s.id,
@@ -142,6 +253,7 @@ def get_pending_scenarios() -> Tuple[int, str]:
     except Exception as e:
         return 500, f"Error getting pending scenarios: {str(e)}"
 
+@_locked
 def mark_scenario_executed(scenario_id: str) -> Tuple[int, str]:
     """Mark a scenario as executed"""
     try:
@@ -181,8 +293,7 @@ def load_results_state() -> Tuple[int, str]:
     """Load results state"""
     try:
         try:
-            with open("results_state.json", "r") as f:
-                return 200, f.read()
+            return 200, _read_state_file("results_state.json")
         except FileNotFoundError:
             empty_state = ResultsState()
             return 200, empty_state.to_json()
@@ -193,12 +304,12 @@ def save_results_state(state_json: str) -> Tuple[int, str]:
     """Save results state"""
     try:
         state = ResultsState.from_json(state_json)
-        with open("results_state.json", "w") as f:
-            f.write(state.to_json())
+        _write_state_file("results_state.json", state.to_json())
         return 200, "Results state saved successfully"
     except Exception as e:
         return 500, f"Error saving results state: {str(e)}"
 
+@_locked
 def add_test_result(result_data: Dict[str, Any]) -> Tuple[int, str]:
     """Add a test result"""
     try:
@@ -270,8 +381,7 @@ def load_vulnerabilities_state() -> Tuple[int, str]:
     """Load vulnerabilities state"""
     try:
         try:
-            with open("vulnerabilities_state.json", "r") as f:
-                return 200, f.read()
+            return 200, _read_state_file("vulnerabilities_state.json")
         except FileNotFoundError:
             empty_state = VulnerabilitiesState()
             return 200, empty_state.to_json()
@@ -282,12 +392,13 @@ def save_vulnerabilities_state(state_json: str) -> Tuple[int, str]:
     """Save vulnerabilities state"""
     try:
         state = VulnerabilitiesState.from_json(state_json)
-        with open("vulnerabilities_state.json", "w") as f:
-            f.write(state.to_json())
+        _write_state_file("vulnerabilities_state.json", state.to_json())
+        metrics.set_vulnerability_counts({severity: len(state.get_by_severity(severity)) for severity in metrics.SEVERITIES})
         return 200, "Vulnerabilities state saved successfully"
     except Exception as e:
         return 500, f"Error saving vulnerabilities state: {str(e)}"
 
+@_locked
 def add_vulnerability(vuln_data: Dict[str, Any]) -> Tuple[int, str]:
     """Add a vulnerability"""
     try:
@@ -331,6 +442,89 @@ def get_vulnerabilities_summary() -> Tuple[int, str]:
     except Exception as e:
         return 500, f"Error getting vulnerabilities summary: {str(e)}"
 
+# =====================================
+# ANALYSIS QUEUE TOOLS
+# =====================================
+
+def load_analysis_queue_state() -> Tuple[int, str]:
+    """Load the responses waiting for batched analysis"""
+    try:
+        try:
+            return 200, _read_state_file("analysis_queue_state.json")
+        except FileNotFoundError:
+            empty_state = AnalysisQueueState()
+            return 200, empty_state.to_json()
+    except Exception as e:
+        return 500, f"Error loading analysis queue state: {str(e)}"
+
+def save_analysis_queue_state(state_json: str) -> Tuple[int, str]:
+    """Save the responses waiting for batched analysis"""
+    try:
+        state = AnalysisQueueState.from_json(state_json)
+        _write_state_file("analysis_queue_state.json", state.to_json())
+        return 200, "Analysis queue state saved successfully"
+    except Exception as e:
+        return 500, f"Error saving analysis queue state: {str(e)}"
+
+@_locked
+def queue_response(response_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Queue the response of an executed scenario for batched analysis.
+    
+    Args:
+        response_data: Dict with keys: scenario_id, request, status_code, response_body
+    """
+    try:
+        status, state_json = load_analysis_queue_state()
+        if status != 200:
+            return status, state_json
+        
+        state = AnalysisQueueState.from_json(state_json)
+        state.remove([response_data.get("scenario_id", "")])
+        state.add_response({
+            "scenario_id": response_data.get("scenario_id", ""),
+            "request": response_data.get("request") or {},
+            "status_code": response_data.get("status_code", 0),
+            "response_body": response_data.get("response_body", "")
+        })
+        saved_status, saved_msg = save_analysis_queue_state(state.to_json())
+        if saved_status != 200:
+            return saved_status, saved_msg
+        
+        # The scenario counts as executed once its response is safely queued
+        mark_scenario_executed(response_data.get("scenario_id", ""))
+        return 200, json.dumps({"queued_responses": state.get_count()})
+    except Exception as e:
+        return 500, f"Error queueing response: {str(e)}"
+
+def get_queued_responses(limit: int = 0) -> Tuple[int, str]:
+    """Get responses waiting for analysis, oldest first (limit=0 returns all of them)"""
+    try:
+        status, state_json = load_analysis_queue_state()
+        if status != 200:
+            return status, state_json
+        
+        responses = AnalysisQueueState.from_json(state_json).responses
+        return 200, json.dumps(responses[:limit] if limit > 0 else responses)
+    except Exception as e:
+        return 500, f"Error getting queued responses: {str(e)}"
+
+@_locked
+def remove_queued_responses(scenario_ids: List[str]) -> Tuple[int, str]:
+    """Drop responses whose verdicts have been recorded"""
+    try:
+        status, state_json = load_analysis_queue_state()
+        if status != 200:
+            return status, state_json
+        
+        state = AnalysisQueueState.from_json(state_json)
+        state.remove(scenario_ids)
+        saved_status, saved_msg = save_analysis_queue_state(state.to_json())
+        if saved_status != 200:
+            return saved_status, saved_msg
+        return 200, json.dumps({"queued_responses": state.get_count()})
+    except Exception as e:
+        return 500, f"Error removing queued responses: {str(e)}"
+
 # =====================================
 # EXECUTION TRACKING TOOLS
 # =====================================
@@ -362,6 +556,10 @@ def check_execution_progress() -> Tuple[int, str]:
             return endpoints_status, endpoints_data
         endpoints_summary = json.loads(endpoints_data)
         
+        queue_status, queue_json = load_analysis_queue_state()
+        if queue_status != 200:
+            return queue_status, queue_json
+        
         progress = {
             "endpoints_discovered": endpoints_summary["endpoints_count"],
             "scenarios_planned": scenarios_summary["total_scenarios"],
@@ -374,7 +572,8 @@ def check_execution_progress() -> Tuple[int, str]:
             "vulnerabilities_found": vulns_summary["total_vulnerabilities"],
             "high_severity_vulns": vulns_summary["high_severity"],
             "medium_severity_vulns": vulns_summary["medium_severity"],
-            "low_severity_vulns": vulns_summary["low_severity"]
+            "low_severity_vulns": vulns_summary["low_severity"],
+            "responses_awaiting_analysis": AnalysisQueueState.from_json(queue_json).get_count()
         }
         
         return 200, json.dumps(progress, indent=2)
@@ -398,6 +597,108 @@ def is_testing_complete() -> Tuple[int, str]:
             "scenarios_remaining": summary["pending_scenarios"]
         }
         
+        from utils.budget import budget_exhausted
+        reason = budget_exhausted()
+        if reason:
+            result["budget_exhausted"] = reason
+        
         return 200, json.dumps(result)
     except Exception as e:
-        return 500, f"Error checking if testing is complete: {str(e)}" 
\ No newline at end of file
+        return 500, f"Error checking if testing is complete: {str(e)}"
+
+# =====================================
+# INCREMENTAL SCAN TOOLS
+# =====================================
+
+def load_fingerprints_state() -> Tuple[int, str]:
+    """Load operation fingerprints state"""
+    try:
+        try:
+            return 200, _read_state_file("fingerprints_state.json")
+        except FileNotFoundError:
+            empty_state = FingerprintsState()
+            return 200, empty_state.to_json()
+    except Exception as e:
+        return 500, f"Error loading fingerprints state: {str(e)}"
+
+def save_fingerprints_state(state_json: str) -> Tuple[int, str]:
+    """Save operation fingerprints state"""
+    try:
+        state = FingerprintsState.from_json(state_json)
+        _write_state_file("fingerprints_state.json", state.to_json())
+        return 200, "Fingerprints state saved successfully"
+    except Exception as e:
+        return 500, f"Error saving fingerprints state: {str(e)}"
+
+@_locked
+def replace_endpoints(endpoints: List[str]) -> Tuple[int, str]:
+    """Replace the endpoints state with the operations of the current spec"""
+    try:
+        state = EndpointsState()
+        for endpoint in endpoints:
+            state.add_endpoint(endpoint)
+        return save_endpoints_state(state.to_json())
+    except Exception as e:
+        return 500, f"Error replacing endpoints: {str(e)}"
+
+@_locked
+def prune_operations(operation_keys: List[str], known_operations: Optional[List[str]] = None) -> Tuple[int, str]:
+    """Drop scenarios, results and vulnerabilities belonging to the given operations.
+    
+    Scenarios are resolved against the given and known operations together, so a concrete path goes to its
+    closest operation and a pruned template never claims the scenarios of an unchanged sibling.
+    """
+    try:
+        from tools.spec_diff import scenario_operation_key
+        
+        targets = set(operation_keys)
+        candidates = targets | set(known_operations or [])
+        
+        status, scenarios_json = load_scenarios_state()
+        if status != 200:
+            return status, scenarios_json
+        scenarios = ScenariosState.from_json(scenarios_json)
+        dropped_ids = {s.id for s in scenarios.scenarios if scenario_operation_key(s, candidates) in targets}
+        scenarios.scenarios = [s for s in scenarios.scenarios if s.id not in dropped_ids]
+        
+        status, results_json = load_results_state()
+        if status != 200:
+            return status, results_json
+        results = ResultsState.from_json(results_json)
+        results_before = results.get_count()
+        results.results = [r for r in results.results if r.scenario_id not in dropped_ids]
+        
+        status, vulns_json = load_vulnerabilities_state()
+        if status != 200:
+            return status, vulns_json
+        vulns = VulnerabilitiesState.from_json(vulns_json)
+        vulns_before = vulns.get_count()
+        vulns.vulnerabilities = [
+            v for v in vulns.vulnerabilities
+            if v.get("scenario_id", v.get("id")) not in dropped_ids
+        ]
+        
+        status, queue_json = load_analysis_queue_state()
+        if status != 200:
+            return status, queue_json
+        queue = AnalysisQueueState.from_json(queue_json)
+        queue.remove(list(dropped_ids))
+        
+        for saved_status, saved_msg in (
+            save_scenarios_state(scenarios.to_json()),
+            save_results_state(results.to_json()),
+            save_vulnerabilities_state(vulns.to_json()),
+            save_analysis_queue_state(queue.to_json())
+        ):
+            if saved_status != 200:
+                return saved_status, saved_msg
+        
+        summary = {
+            "operations_pruned": len(targets),
+            "scenarios_removed": len(dropped_ids),
+            "results_removed": results_before - results.get_count(),
+            "vulnerabilities_removed": vulns_before - vulns.get_count()
+        }
+        return 200, json.dumps(summary)
+    except Exception as e:
+        return 500, f"Error pruning operations: {str(e)}"
@@ -74,6 +74,36 @@ class ScenariosState:
                 scenario.executed = True
                 break
     
+    def deduplicate(self) -> int:
+        """Drop scenarios with identical targets and payloads, and rename colliding IDs.
+        
+        Returns the number of scenarios removed.
+        """
+        unique: List[TestScenario] = []
+        signatures = set()
+        ids = set()
+        for scenario in self.scenarios:
+            signature = json.dumps(
+                [scenario.endpoint, scenario.method.upper(), scenario.payload, scenario.auth_token],
+                sort_keys=True, default=str
+            )
+            if signature in signatures:
+                continue
+            signatures.add(signature)
+            
+            # Same ID with a different test, keep both under distinct IDs
+            if scenario.id in ids:
+                suffix = 2
+                while f"{scenario.id}_{suffix}" in ids:
+                    suffix += 1
+                scenario.id = f"{scenario.id}_{suffix}"
+            ids.add(scenario.id)
+            unique.append(scenario)
+        
+        removed = len(self.scenarios) - len(unique)
+        self.scenarios = unique
+        return removed
+    
     def get_pending_scenarios(self) -> List[TestScenario]:
         """Get scenarios that haven't been executed yet"""
         return [s for s in self.scenarios if not s.executed]
@@ -210,4 +240,73 @@ class VulnerabilitiesState:
                 state.vulnerabilities = data.get("vulnerabilities", [])
             except json.JSONDecodeError:
                 pass
-        return state 
\ No newline at end of file
+        return state 
+
+class FingerprintsState:
+    """Manages per-operation schema fingerprints from the last scanned spec"""
+    
+    def __init__(self):
+        self.operations: Dict[str, str] = {}
+    
+    def set_fingerprints(self, fingerprints: Dict[str, str]):
+        """Replace the stored fingerprints"""
+        self.operations = dict(fingerprints)
+    
+    def get_count(self) -> int:
+        """Get number of fingerprinted operations"""
+        return len(self.operations)
+    
+    def to_json(self) -> str:
+        """Serialize to JSON"""
+        return json.dumps({
+            "operations": self.operations
+        }, indent=2)
+    
+    @classmethod
+    def from_json(cls, json_str: str) -> 'FingerprintsState':
+        """Deserialize from JSON"""
+        state = cls()
+        if json_str and json_str != "{}":
+            try:
+                data = json.loads(json_str)
+                state.operations = data.get("operations", {})
+            except json.JSONDecodeError:
+                pass
+        return state
+
+class AnalysisQueueState:
+    """Executed responses waiting for batched analysis"""
+    
+    def __init__(self):
+        self.responses: List[Dict[str, Any]] = []
+    
+    def add_response(self, response: Dict[str, Any]):
+        """Queue the response of an executed scenario"""
+        self.responses.append(response)
+    
+    def remove(self, scenario_ids: List[str]):
+        """Drop analyzed responses"""
+        done = set(scenario_ids)
+        self.responses = [r for r in self.responses if r.get("scenario_id") not in done]
+    
+    def get_count(self) -> int:
+        """Get number of queued responses"""
+        return len(self.responses)
+    
+    def to_json(self) -> str:
+        """Serialize to JSON"""
+        return json.dumps({
+            "responses": self.responses
+        }, indent=2)
+    
+    @classmethod
+    def from_json(cls, json_str: str) -> 'AnalysisQueueState':
+        """Deserialize from JSON"""
+        state = cls()
+        if json_str and json_str != "{}":
+            try:
+                data = json.loads(json_str)
+                state.responses = data.get("responses", [])
+            except json.JSONDecodeError:
+                pass
+        return state
@@ -0,0 +1,117 @@
+"""
+Diffing of operation fingerprints between scans for incremental testing
+"""
+
+from typing import Collection, List, Dict, Optional
+from urllib.parse import urlsplit
+from dataclasses import dataclass, field, asdict
+from tools.openapi_model import HTTP_METHODS, operation_key
+from tools.separate_states import TestScenario
+
+
+@dataclass
+class SpecDiff:
+    """Operations grouped by how they changed since the previous scan"""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def to_test(self) -> List[str]:
+        """Operations that need fresh planning and execution"""
+        return self.added + self.changed
+
+    @property
+    def stale(self) -> List[str]:
+        """Operations whose previous scenarios and results are no longer valid"""
+        return self.changed + self.removed
+
+    def has_changes(self) -> bool:
+        """Check if anything was added, changed or removed"""
+        return bool(self.added or self.changed or self.removed)
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Serialize to a plain dict"""
+        return asdict(self)
+
+
+def diff_fingerprints(previous: Dict[str, str], current: Dict[str, str]) -> SpecDiff:
+    """Compare two operation -> fingerprint maps"""
+    diff = SpecDiff()
+    for key, fingerprint in current.items():
+        if key not in previous:
+            diff.added.append(key)
+        elif previous[key] != fingerprint:
+            diff.changed.append(key)
+        else:
+            diff.unchanged.append(key)
+    diff.removed = [key for key in previous if key not in current]
+    return diff
+
+
+def _endpoint_path(path: str) -> str:
+    """Path of an endpoint without scheme, host, query string or trailing slash"""
+    path = path.strip()
+    if "://" in path:
+        path = urlsplit(path).path
+    path = path.split("?", 1)[0].split("#", 1)[0]
+    if not path.startswith("/"):
+        path = "/" + path
+    return path.rstrip("/") or "/"
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def match_operation(key: str, operations: Collection[str]) -> Optional[str]:
+    """Operation whose path template matches a concrete "METHOD /path" key, e.g. "GET /users/42" -> "GET /users/{id}".
+
+    A concrete path may also carry a base path in front of the spec's paths ("/v2/users/42").
+    The closest match wins: no base path first, then the most literal segments.
+    """
+    method, _, path = key.partition(" ")
+    segments = _segments(path)
+    best, best_rank = None, None
+    for candidate in operations:
+        candidate_method, _, template = candidate.partition(" ")
+        pattern = _segments(template)
+        offset = len(segments) - len(pattern)
+        if candidate_method != method or offset < 0:
+            continue
+        literals = 0
+        for concrete, expected in zip(segments[offset:], pattern):
+            if expected.startswith("{") and expected.endswith("}"):
+                continue
+            if concrete != expected:
+                break
+            literals += 1
+        else:
+            if offset and not literals:
+                # A template of parameters only would match behind any base path
+                continue
+            rank = (-offset, literals)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = candidate, rank
+    return best
+
+
+def scenario_operation_key(scenario: TestScenario, operations: Optional[Collection[str]] = None) -> str:
+    """Resolve the operation a scenario targets.
+
+    Planned scenarios store the endpoint either as "METHOD /path" or as a bare
+    path with the method in its own field, so both forms are accepted, as are
+    full URLs. With the spec's operation keys given, concrete paths
+    ("/api/users/42") resolve to the matching template ("/api/users/{id}").
+    """
+    endpoint = (scenario.endpoint or "").strip()
+    parts = endpoint.split(" ", 1)
+    if len(parts) == 2 and parts[0].lower() in HTTP_METHODS:
+        method, path = parts[0], parts[1]
+    else:
+        method, path = scenario.method or "", endpoint
+    key = operation_key(method, _endpoint_path(path))
+    if operations is None or key in operations:
+        return key
+    return match_operation(key, operations) or key
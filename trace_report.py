@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Where did the time of a traced scan go?
+
+Reads the JSONL spans written by `security_agent.py --trace-file` and prints the
+critical path of the longest scan in the file (the chain of spans its end
+waited on) as an outline of phases and agent invocations, the time on it per
+kind (model, HTTP, state I/O, tools, agent steps) and the top self-time
+contributors over all spans.
+
+    python trace_report.py trace.jsonl
+    python trace_report.py trace.jsonl --trace-id <id> --top 20
+"""
+
+import argparse
+from typing import Any, Dict, List
+
+from utils.tracing import load_spans, build_tree, critical_path, self_times
+
+
+def _label(record: Dict[str, Any]) -> str:
+    attributes = record.get("attributes", {})
+    details = [f"{key}={attributes[key]}" for key in ("scenario_id", "status", "bytes") if key in attributes]
+    return f"[{record['kind']}] {record['name']}" + (f" ({', '.join(details)})" if details else "")
+
+
+# Spans outlined individually on the critical path; everything below them is summarized by name
+OUTLINE_KINDS = ("scan", "phase", "agent")
+# Outlined spans with a smaller share of the wall time are folded into one line
+MIN_OUTLINE_SHARE = 0.005
+
+
+def print_critical_path(path: List, by_id: Dict[str, Dict[str, Any]], wall_seconds: float, top: int):
+    """Phases and agent invocations on the critical path, then what their time on it went to"""
+    print(f"\n🧭 CRITICAL PATH ({wall_seconds:.2f}s wall)")
+    print("-" * 60)
+    # Time on the path of each outlined span, its own plus that of its descendants on the path
+    on_path: Dict[str, float] = {}
+    by_name: Dict[str, float] = {}
+    by_kind: Dict[str, float] = {}
+    for record, own in path:
+        by_kind[record["kind"]] = by_kind.get(record["kind"], 0.0) + own
+        label = _label(record) if record["kind"] in ("http", "state_io") else f"[{record['kind']}] {record['name']}"
+        by_name[label] = by_name.get(label, 0.0) + own
+        ancestor = record
+        while ancestor is not None:
+            if ancestor["kind"] in OUTLINE_KINDS:
+                on_path[ancestor["spanId"]] = on_path.get(ancestor["spanId"], 0.0) + own
+            ancestor = by_id.get(ancestor["parentSpanId"])
+
+    folded, folded_seconds = 0, 0.0
+    for record, _ in path:
+        if record["spanId"] in on_path and record["kind"] != "scan":
+            seconds = on_path.pop(record["spanId"])
+            if seconds < MIN_OUTLINE_SHARE * wall_seconds and record["kind"] != "phase":
+                folded, folded_seconds = folded + 1, folded_seconds + seconds
+                continue
+            indent = "   " if record["kind"] == "phase" else "      "
+            print(f"{seconds:>9.3f}s {seconds / wall_seconds:>6.1%}{indent}{_label(record)}")
+    if folded:
+        print(f"{folded_seconds:>9.3f}s {folded_seconds / wall_seconds:>6.1%}   ({folded} shorter agent invocations)")
+
+    print("\n   Critical path by kind: " + ", ".join(
+        f"{kind} {seconds:.2f}s" for kind, seconds in sorted(by_kind.items(), key=lambda item: item[1], reverse=True)))
+    print("   Largest on the critical path:")
+    for label, seconds in sorted(by_name.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{seconds:>9.3f}s {seconds / wall_seconds:>6.1%}   {label}")
+
+
+def print_self_times(contributors: List[Dict[str, Any]], top: int):
+    """Largest self times, summed over every span of the same kind and name (concurrent spans add up)"""
+    total = sum(entry["self_seconds"] for entry in contributors) or 1.0
+    print(f"\n⏱️  TOP {top} SELF-TIME CONTRIBUTORS (of {total:.2f}s summed over all spans)")
+    print("-" * 60)
+    print(f"{'self s':>9} {'share':>6} {'count':>6} {'avg ms':>8}  span")
+    for entry in contributors[:top]:
+        print(f"{entry['self_seconds']:>9.3f} {entry['self_seconds'] / total:>6.1%} {entry['count']:>6} "
+              f"{entry['total_seconds'] / entry['count'] * 1000:>8.1f}  [{entry['kind']}] {entry['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical path and self-time report of a scan trace")
+    parser.add_argument("trace_file", help="JSONL spans written by security_agent.py --trace-file")
+    parser.add_argument("--trace-id", default=None, help="Trace to analyze (default: every span in the file)")
+    parser.add_argument("--top", type=int, default=10, help="Entries listed per ranking")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file, args.trace_id)
+    if not spans:
+        print(f"⚠️  No spans in {args.trace_file}")
+        return
+    roots, children = build_tree(spans)
+    root = roots[0]
+    wall_seconds = max(1e-9, (root["endTimeUnixNano"] - root["startTimeUnixNano"]) / 1e9)
+    print(f"📂 {len(spans)} spans, {len(roots)} root(s); analyzing [{root['kind']}] {root['name']} "
+          f"of trace {root['traceId']}")
+
+    print_critical_path(critical_path(root, children), {record["spanId"]: record for record in spans}, wall_seconds, args.top)
+    print_self_times(self_times(spans, children), args.top)
+
+
+if __name__ == "__main__":
+    main()
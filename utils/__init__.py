@@ -1,4 +1,16 @@
-from .model import model
-from .checkpointer import shared_checkpointer
+"""
+Shared utilities; the model and the checkpointer are only loaded when first used.
+"""
 
-__all__ = ["model", "shared_checkpointer"]
+
+def __getattr__(name):
+    if name == "get_model":
+        from .model import get_model
+        return get_model
+    if name == "shared_checkpointer":
+        from .checkpointer import shared_checkpointer
+        return shared_checkpointer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["get_model", "shared_checkpointer"]
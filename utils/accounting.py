@@ -0,0 +1,193 @@
+"""
+Token, latency and cost accounting for a security test run.
+
+UsageAccountant is a callback handler: every model call records its tokens
+(input, output, cache reads and writes), latency and cost, and every tool call
+its duration. Calls are attributed to the agent, phase and scenarios taken from
+the run config metadata ({"agent": ..., "phase": ..., "scenarios": [...]}).
+"""
+
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+
+# USD per million tokens: (input, output, cache read, cache write)
+MODEL_PRICES = {
+    "claude-3-5-haiku": (0.8, 4.0, 0.08, 1.0),
+    "claude-3-7-sonnet": (3.0, 15.0, 0.3, 3.75),
+    "claude-sonnet-4": (3.0, 15.0, 0.3, 3.75),
+    "claude-opus-4": (15.0, 75.0, 1.5, 18.75),
+    "fake-fast": (0.8, 4.0, 0.08, 1.0),
+    "fake-strong": (3.0, 15.0, 0.3, 3.75)
+}
+
+
+def model_prices(model_name: Optional[str]):
+    """Prices of the longest matching model name prefix, zero when unknown"""
+    best = None
+    for prefix in MODEL_PRICES:
+        if model_name and model_name.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return MODEL_PRICES[best] if best else (0.0, 0.0, 0.0, 0.0)
+
+
+def call_cost(model_name: Optional[str], input_tokens: int, output_tokens: int,
+              cache_read: int = 0, cache_creation: int = 0) -> float:
+    """USD cost of one model call; input_tokens includes the cached tokens"""
+    input_price, output_price, read_price, write_price = model_prices(model_name)
+    uncached = max(0, input_tokens - cache_read - cache_creation)
+    return (uncached * input_price + output_tokens * output_price
+            + cache_read * read_price + cache_creation * write_price) / 1_000_000
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"model_calls": 0, "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0,
+            "cache_creation_tokens": 0, "model_seconds": 0.0, "cost_usd": 0.0, "tool_calls": 0, "tool_seconds": 0.0}
+
+
+class UsageAccountant(BaseCallbackHandler):
+    """Records every model and tool call of a run and aggregates them"""
+
+    def __init__(self):
+        self.model_calls: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.phase_seconds: Dict[str, float] = {}
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        metadata = metadata or {}
+        return {
+            "agent": metadata.get("agent", "unknown"),
+            "phase": metadata.get("phase", "unknown"),
+            "scenarios": metadata.get("scenarios")
+        }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, metadata=None, invocation_params=None, **kwargs):
+        params = invocation_params or kwargs.get("invocation_params") or {}
+        entry = self._context(metadata)
+        entry["model"] = (metadata or {}).get("ls_model_name") or params.get("model") or params.get("model_name")
+        entry["started_at"] = time.perf_counter()
+        with self._lock:
+            self._pending[run_id] = entry
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        with self._lock:
+            entry = self._pending.pop(run_id, None)
+        if entry is None:
+            return
+        input_tokens = output_tokens = cache_read = cache_creation = 0
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                details = usage.get("input_token_details") or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                cache_read += details.get("cache_read", 0) or 0
+                cache_creation += details.get("cache_creation", 0) or 0
+        entry.update({
+            "seconds": time.perf_counter() - entry.pop("started_at"),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read,
+            "cache_creation_tokens": cache_creation,
+            "cost_usd": call_cost(entry["model"], input_tokens, output_tokens, cache_read, cache_creation)
+        })
+        with self._lock:
+            self.model_calls.append(entry)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        with self._lock:
+            self._pending.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, metadata=None, **kwargs):
+        entry = self._context(metadata)
+        entry["tool"] = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        entry["started_at"] = time.perf_counter()
+        with self._lock:
+            self._pending[run_id] = entry
+
+    def _finish_tool(self, run_id, error: Optional[str] = None):
+        with self._lock:
+            entry = self._pending.pop(run_id, None)
+            if entry is None:
+                return
+            entry["seconds"] = time.perf_counter() - entry.pop("started_at")
+            entry["error"] = error
+            self.tool_calls.append(entry)
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        self._finish_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        self._finish_tool(run_id, str(error))
+
+    def record_phase(self, phase: str, seconds: float):
+        """Wall-clock time of an orchestrator phase"""
+        with self._lock:
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def phase_tokens(self, phase: str) -> int:
+        """Input + output tokens used so far by a phase"""
+        with self._lock:
+            return sum(c["input_tokens"] + c["output_tokens"] for c in self.model_calls if c["phase"] == phase)
+
+    def _totals_by(self, key: str) -> Dict[str, Dict[str, Any]]:
+        totals: Dict[str, Dict[str, Any]] = {}
+        for call in self.model_calls:
+            t = totals.setdefault(str(call[key]), _empty_totals())
+            t["model_calls"] += 1
+            t["input_tokens"] += call["input_tokens"]
+            t["output_tokens"] += call["output_tokens"]
+            t["cache_read_tokens"] += call["cache_read_tokens"]
+            t["cache_creation_tokens"] += call["cache_creation_tokens"]
+            t["model_seconds"] += call["seconds"]
+            t["cost_usd"] += call["cost_usd"]
+        if key in ("agent", "phase"):
+            for call in self.tool_calls:
+                t = totals.setdefault(str(call[key]), _empty_totals())
+                t["tool_calls"] += 1
+                t["tool_seconds"] += call["seconds"]
+        return totals
+
+    def totals(self) -> Dict[str, Any]:
+        """Overall totals"""
+        total = _empty_totals()
+        for t in self._totals_by("phase").values():
+            for field in total:
+                total[field] += t[field]
+        return total
+
+    def tool_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Calls, errors and time per tool"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for call in self.tool_calls:
+            t = totals.setdefault(call["tool"], {"calls": 0, "errors": 0, "seconds": 0.0})
+            t["calls"] += 1
+            t["errors"] += 1 if call["error"] else 0
+            t["seconds"] += call["seconds"]
+        return totals
+
+    def to_dict(self, include_calls: bool = False) -> Dict[str, Any]:
+        """Machine-readable summary, optionally with every individual call"""
+        with self._lock:
+            data = {
+                "totals": self.totals(),
+                "by_phase": self._totals_by("phase"),
+                "by_agent": self._totals_by("agent"),
+                "by_model": self._totals_by("model"),
+                "by_tool": self.tool_totals(),
+                "phase_seconds": dict(self.phase_seconds)
+            }
+            if include_calls:
+                data["model_call_log"] = list(self.model_calls)
+                data["tool_call_log"] = list(self.tool_calls)
+        return data
+
+    def write_json(self, path: str, include_calls: bool = True):
+        """Persist the accounting of the run"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(include_calls), f, indent=2, default=str)
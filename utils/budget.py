@@ -0,0 +1,160 @@
+"""
+Wall-clock, request and token budgets for a security test run
+"""
+
+import os
+import time
+import threading
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class BudgetExhausted(Exception):
+    """Raised to stop an agent run once the scan budget is used up"""
+
+
+class ScanBudget:
+    """Tracks consumption against optional wall-clock, request and token limits.
+
+    Creating the file at cancel_path (e.g. from another process) exhausts the budget immediately.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None, max_requests: Optional[int] = None,
+                 max_tokens: Optional[int] = None, cancel_path: Optional[str] = None):
+        self.max_seconds = max_seconds
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.cancel_path = cancel_path
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def record_request(self, count: int = 1):
+        """Count HTTP probes against the target"""
+        with self._lock:
+            self.requests += count
+
+    def record_tokens(self, tokens: int):
+        """Count model tokens (input + output)"""
+        with self._lock:
+            self.tokens += tokens
+
+    def elapsed(self) -> float:
+        """Seconds since the budget was created"""
+        return time.monotonic() - self.started_at
+
+    def exhausted(self, include_requests: bool = True) -> Optional[str]:
+        """Reason the budget is used up, or None while there is budget left.
+
+        The request budget only limits probes against the target, so model-only
+        work (planning, reporting) passes include_requests=False.
+        """
+        if self.cancel_path is not None and os.path.exists(self.cancel_path):
+            return "scan cancelled"
+        if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+            return f"time budget of {self.max_seconds}s reached"
+        if include_requests and self.max_requests is not None and self.requests >= self.max_requests:
+            return f"request budget of {self.max_requests} reached"
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            return f"token budget of {self.max_tokens} reached"
+        return None
+
+    def remaining(self) -> Dict[str, Any]:
+        """Limits left from now on (None for unlimited), for work handed to other processes"""
+        def left(limit, used):
+            return max(0, limit - used) if limit is not None else None
+        return {
+            "max_seconds": left(self.max_seconds, self.elapsed()),
+            "max_requests": left(self.max_requests, self.requests),
+            "max_tokens": left(self.max_tokens, self.tokens)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize consumption and limits"""
+        return {
+            "elapsed_seconds": round(self.elapsed(), 2),
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "max_seconds": self.max_seconds,
+            "max_requests": self.max_requests,
+            "max_tokens": self.max_tokens,
+            "exhausted": self.exhausted()
+        }
+
+
+_active_budget: ContextVar[Optional[ScanBudget]] = ContextVar("active_budget", default=None)
+
+
+def set_active_budget(budget: Optional[ScanBudget]) -> Token:
+    """Make a budget visible to the tools of the current run; returns the token for reset_active_budget"""
+    return _active_budget.set(budget)
+
+
+def reset_active_budget(token: Token):
+    """Restore the budget that was active before set_active_budget"""
+    _active_budget.reset(token)
+
+
+def get_active_budget() -> Optional[ScanBudget]:
+    """Budget of the current run, if any"""
+    return _active_budget.get()
+
+
+def budget_exhausted() -> Optional[str]:
+    """Reason the active budget is used up, or None"""
+    budget = get_active_budget()
+    return budget.exhausted() if budget else None
+
+
+def usage_tokens(response: Any) -> int:
+    """Total input + output tokens reported on an LLMResult"""
+    total = 0
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            total += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    if not total:
+        usage = (getattr(response, "llm_output", None) or {}).get("usage") or {}
+        total = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return total
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Counts model tokens and aborts model calls once the budget is exhausted"""
+
+    raise_error = True
+
+    def __init__(self, budget: ScanBudget):
+        self.budget = budget
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        reason = self.budget.exhausted(include_requests=False)
+        if reason:
+            raise BudgetExhausted(reason)
+
+    def on_llm_end(self, response, **kwargs):
+        self.budget.record_tokens(usage_tokens(response))
+
+
+class PhaseBudgetCallbackHandler(BaseCallbackHandler):
+    """Aborts model calls of a phase once that phase has used its own token budget"""
+
+    raise_error = True
+
+    def __init__(self, accountant, phase_budgets: Optional[Dict[str, int]] = None):
+        self.accountant = accountant
+        self.phase_budgets = dict(phase_budgets or {})
+
+    def exhausted(self, phase: str) -> Optional[str]:
+        """Reason the phase budget is used up, or None"""
+        limit = self.phase_budgets.get(phase)
+        if limit is not None and self.accountant.phase_tokens(phase) >= limit:
+            return f"{phase} token budget of {limit} reached"
+        return None
+
+    def on_chat_model_start(self, serialized, messages, *, metadata=None, **kwargs):
+        reason = self.exhausted((metadata or {}).get("phase"))
+        if reason:
+            raise BudgetExhausted(reason)
@@ -1,3 +1,96 @@
+import sqlite3
+from typing import Iterable, Optional
 from langgraph.checkpoint.memory import InMemorySaver
 
+DEFAULT_CHECKPOINT_PATH = "checkpoints.sqlite"
+DEFAULT_KEEP_LAST = 2
+
 shared_checkpointer = InMemorySaver()
+
+
+def create_checkpointer(backend: str = "memory", path: str = DEFAULT_CHECKPOINT_PATH):
+    """Build a checkpointer: "memory" (process lifetime) or "sqlite" (on disk, resumable)"""
+    if backend == "memory":
+        return InMemorySaver()
+    if backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            raise ImportError("The sqlite checkpointer needs langgraph-checkpoint-sqlite (pip install langgraph-checkpoint-sqlite)")
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        saver = SqliteSaver(conn)
+        saver.setup()
+        return saver
+    raise ValueError(f"Unknown checkpointer backend: {backend}")
+
+
+def _prune_sqlite(saver, thread_id: str, keep_last: int) -> int:
+    """Delete all but the newest keep_last checkpoints (and their writes) of a thread"""
+    with saver.cursor() as cur:
+        # Checkpoint IDs are time-ordered, so the newest sort last
+        cur.execute(
+            """
+            DELETE FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_id NOT IN (
+                SELECT c.checkpoint_id FROM checkpoints c
+                WHERE c.thread_id = checkpoints.thread_id AND c.checkpoint_ns = checkpoints.checkpoint_ns
+                ORDER BY c.checkpoint_id DESC LIMIT ?
+            )
+            """,
+            (thread_id, keep_last)
+        )
+        removed = cur.rowcount
+        cur.execute(
+            """
+            DELETE FROM writes
+            WHERE thread_id = ? AND NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+                AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """,
+            (thread_id,)
+        )
+    return removed
+
+
+def _prune_memory(saver: InMemorySaver, thread_id: str, keep_last: int) -> int:
+    """Delete all but the newest keep_last checkpoints of a thread, plus orphaned writes and blobs"""
+    removed = 0
+    for checkpoint_ns, checkpoints in list(saver.storage.get(thread_id, {}).items()):
+        ordered = sorted(checkpoints, reverse=True)
+        for checkpoint_id in ordered[keep_last:]:
+            del checkpoints[checkpoint_id]
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            removed += 1
+
+        # Channel values live in versioned blobs, keep only those the remaining checkpoints point at
+        referenced = set()
+        for serialized, _, _ in checkpoints.values():
+            checkpoint = saver.serde.loads_typed(serialized)
+            referenced.update(checkpoint.get("channel_versions", {}).items())
+        for key in [k for k in saver.blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+            if (key[2], key[3]) not in referenced:
+                del saver.blobs[key]
+    return removed
+
+
+def prune_checkpoints(checkpointer, thread_ids: Iterable[str], keep_last: Optional[int] = DEFAULT_KEEP_LAST) -> int:
+    """Apply the retention policy to the given threads.
+
+    keep_last=None keeps everything, keep_last=0 drops the threads entirely.
+    Returns the number of checkpoints removed.
+    """
+    if keep_last is None:
+        return 0
+    keep_last = max(0, keep_last)
+    removed = 0
+    for thread_id in thread_ids:
+        if isinstance(checkpointer, InMemorySaver):
+            removed += _prune_memory(checkpointer, thread_id, keep_last)
+        elif hasattr(checkpointer, "conn") and hasattr(checkpointer, "cursor"):
+            removed += _prune_sqlite(checkpointer, thread_id, keep_last)
+        elif keep_last == 0:
+            checkpointer.delete_thread(thread_id)
+    return removed
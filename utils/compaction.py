@@ -0,0 +1,117 @@
+"""
+Message-history compaction for long ReAct loops.
+
+Used as the pre_model_hook of create_react_agent. Once the conversation crosses
+a token threshold, everything between the task message and the most recent turns
+is replaced by a short digest of what was already persisted to state (scenario
+IDs and verdicts), so the model input stays roughly constant per turn. The full
+history is kept in the graph state, only the LLM input is compacted.
+"""
+
+from typing import List, Dict, Any, Callable
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from utils.pipeline import tool_status
+
+DEFAULT_MAX_TOKENS = 20000
+DEFAULT_KEEP_RECENT = 12
+# Only the newest IDs are listed so the digest itself stays bounded
+MAX_LISTED_IDS = 50
+# Tools whose status tells whether something was saved; any other status (e.g. of an HTTP probe) is the target's answer
+STATE_WRITE_TOOLS = frozenset({
+    "add_endpoint", "add_test_scenario", "add_test_scenarios", "mark_scenario_executed", "add_test_result", "add_vulnerability"
+})
+
+
+def _tool_args(tool_call: Dict[str, Any], key: str) -> Dict[str, Any]:
+    args = tool_call.get("args") or {}
+    value = args.get(key, args)
+    return value if isinstance(value, dict) else {}
+
+
+def _listed(items: List[str]) -> str:
+    if len(items) <= MAX_LISTED_IDS:
+        return ", ".join(items)
+    return f"... {len(items) - MAX_LISTED_IDS} earlier, " + ", ".join(items[-MAX_LISTED_IDS:])
+
+
+def summarize_persisted(messages: List[BaseMessage]) -> str:
+    """Digest of the state writes made by the tool calls in messages; writes count as saved only with status 200"""
+    results, vulnerabilities, executed, scenarios_added = [], [], [], 0
+    other_calls: Dict[str, int] = {}
+    failed_calls: Dict[str, int] = {}
+    statuses = {message.tool_call_id: tool_status(message) for message in messages if isinstance(message, ToolMessage)}
+    for message in messages:
+        if not isinstance(message, AIMessage):
+            continue
+        for tool_call in message.tool_calls:
+            name = tool_call.get("name")
+            if name in STATE_WRITE_TOOLS and statuses.get(tool_call.get("id")) != 200:
+                # Failed or unanswered writes saved nothing, the model has to redo them
+                failed_calls[name] = failed_calls.get(name, 0) + 1
+            elif name == "add_test_result":
+                result = _tool_args(tool_call, "result_data")
+                verdict = "pass" if result.get("success") else "fail"
+                results.append(f"{result.get('scenario_id', '?')}={verdict}")
+            elif name == "add_vulnerability":
+                vuln = _tool_args(tool_call, "vuln_data")
+                vulnerabilities.append(f"{vuln.get('scenario_id', '?')}:{vuln.get('severity', '?')}")
+            elif name == "mark_scenario_executed":
+                executed.append(str((tool_call.get("args") or {}).get("scenario_id", "?")))
+            elif name == "add_test_scenario":
+                scenarios_added += 1
+            elif name == "add_test_scenarios":
+                scenarios_added += len((tool_call.get("args") or {}).get("scenarios_data") or [])
+            else:
+                other_calls[name] = other_calls.get(name, 0) + 1
+
+    lines = ["Earlier turns were compacted. Everything below is already saved in the state files, do not redo it."]
+    if results:
+        lines.append(f"Results recorded ({len(results)}): " + _listed(results))
+    if vulnerabilities:
+        lines.append(f"Vulnerabilities recorded ({len(vulnerabilities)}): " + _listed(vulnerabilities))
+    if executed:
+        lines.append(f"Scenarios marked executed ({len(executed)}): " + _listed(executed))
+    if scenarios_added:
+        lines.append(f"Scenarios added: {scenarios_added}")
+    if other_calls:
+        lines.append("Other tool calls: " + ", ".join(f"{name} x{count}" for name, count in sorted(other_calls.items())))
+    if failed_calls:
+        lines.append("Failed state writes, nothing saved (redo them if still needed): " + ", ".join(f"{name} x{count}" for name, count in sorted(failed_calls.items())))
+    lines.append("Use the state tools (e.g. get_pending_scenarios, check_execution_progress) for anything else.")
+    return "\n".join(lines)
+
+
+def compact_messages(messages: List[BaseMessage], max_tokens: int = DEFAULT_MAX_TOKENS,
+                     keep_recent: int = DEFAULT_KEEP_RECENT) -> List[BaseMessage]:
+    """Return messages unchanged below max_tokens, otherwise the task, a digest and the recent turns"""
+    if len(messages) <= keep_recent + 1 or count_tokens_approximately(messages) <= max_tokens:
+        return messages
+
+    # The recent window must start on an AI turn so no tool result loses its tool call
+    start = len(messages) - keep_recent
+    while start < len(messages) and not isinstance(messages[start], AIMessage):
+        start += 1
+    if start >= len(messages):
+        return messages
+
+    first = messages[0]
+    head = first if isinstance(first, HumanMessage) else HumanMessage(content="Continue the task.")
+    compacted = messages[1:start] if head is first else messages[:start]
+    if not compacted:
+        return messages
+
+    digest = summarize_persisted(compacted)
+    task = head.content if isinstance(head.content, str) else str(head.content)
+    return [HumanMessage(content=f"{task}\n\n{digest}")] + list(messages[start:])
+
+
+def make_compaction_hook(max_tokens: int = DEFAULT_MAX_TOKENS,
+                         keep_recent: int = DEFAULT_KEEP_RECENT) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """pre_model_hook for create_react_agent that compacts the LLM input only"""
+    def compaction_hook(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {"llm_input_messages": compact_messages(state["messages"], max_tokens, keep_recent)}
+    return compaction_hook
+
+
+compaction_hook = make_compaction_hook()
@@ -0,0 +1,126 @@
+"""
+Persistent exact-match cache for model calls, backed by SQLite with LRU eviction
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import warnings
+import threading
+from typing import Any, Callable, Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+
+DEFAULT_LLM_CACHE_PATH = "llm_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 5000
+
+# Only model outputs are ever deserialized from the cache file
+CACHED_CLASSES = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+
+def llm_cache_key(prompt: str, llm_string: str) -> str:
+    """Cache key for serialized messages sent with a serialized model configuration.
+
+    llm_string covers the model name, sampling parameters and bound tools.
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _without_usage(generation: Any) -> Any:
+    """Replayed generations cost nothing, so they report no token usage"""
+    message = getattr(generation, "message", None)
+    if getattr(message, "usage_metadata", None):
+        generation.message = message.model_copy(update={
+            "usage_metadata": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        })
+    return generation
+
+
+class SQLiteLRUCache(BaseCache):
+    """LLM cache keeping at most max_entries responses, evicting the least recently used"""
+
+    def __init__(self, path: str = DEFAULT_LLM_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Called with whether each lookup hit, e.g. so a rate limiter meters only the calls that reach the provider
+        self.on_lookup: Optional[Callable[[bool], None]] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        cached = self._lookup(prompt, llm_string)
+        if self.on_lookup is not None:
+            self.on_lookup(cached is not None)
+        return cached
+
+    def _lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = llm_cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        cached = None
+        if row is not None:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    cached = [_without_usage(loads(item, allowed_objects=CACHED_CLASSES)) for item in json.loads(row[0])]
+            except Exception:
+                # Written by an incompatible library version or corrupted: a miss, and the entry is dropped
+                cached = None
+        with self._lock:
+            if cached is None:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return cached
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = llm_cache_key(prompt, llm_string)
+        value = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries above max_entries"""
+        if self.max_entries is None:
+            return
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max(0, self.max_entries),)
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def to_dict(self):
+        """Hit/miss counters of this process"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self), "max_entries": self.max_entries}
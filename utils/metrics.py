@@ -0,0 +1,360 @@
+"""
+Live scan metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are updated in place by the hot paths (HTTP
+probes, model calls, state file reads and writes, scenario and vulnerability
+state saves), so rendering never touches the state files. They are exposed on
+a local /metrics endpoint (MetricsServer) or written periodically to a file for
+the node_exporter textfile collector (TextfileExporter).
+"""
+
+import os
+import re
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_TEXTFILE_INTERVAL = 15.0
+HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MODEL_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+STATE_IO_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+# Path segments that identify a resource rather than an endpoint: numbers, UUIDs and long hex or base64 IDs
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36}|[0-9a-fA-F]{16,}|[A-Za-z0-9_-]{24,})$")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, optionally computed when rendered"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        if self.function is not None:
+            return [(self.name, (), self.function())]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]})
+                           for key, v in self._values.items())
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {entry['count']}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """The set of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def reset(self):
+        """Forget every value, e.g. when a new scan starts in the same process"""
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+SCAN_INFO = REGISTRY.register(Gauge("security_agent_scan_info", "Scan running in this process", ("scan_id",)))
+SCAN_START = REGISTRY.register(Gauge("security_agent_scan_start_timestamp_seconds", "When the scan started"))
+PHASE = REGISTRY.register(Gauge("security_agent_phase", "1 for the phase running now, 0 for finished ones", ("phase",)))
+LAST_PROGRESS = REGISTRY.register(Gauge("security_agent_last_progress_timestamp_seconds",
+                                        "When the last scenario was executed; alert when it stops moving"))
+SCENARIOS = REGISTRY.register(Gauge("security_agent_scenarios", "Test scenarios by state", ("state",)))
+VULNERABILITIES = REGISTRY.register(Gauge("security_agent_vulnerabilities", "Vulnerabilities found by severity", ("severity",)))
+HTTP_REQUESTS = REGISTRY.register(Counter("security_agent_http_requests_total", "HTTP probes sent to the target",
+                                          ("method", "endpoint", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram("security_agent_http_request_duration_seconds", "HTTP probe latency",
+                                           ("method", "endpoint"), HTTP_BUCKETS))
+MODEL_LATENCY = REGISTRY.register(Histogram("security_agent_model_call_duration_seconds", "Model call latency",
+                                            ("model", "phase"), MODEL_BUCKETS))
+MODEL_TOKENS = REGISTRY.register(Counter("security_agent_model_tokens_total", "Model tokens used",
+                                         ("model", "phase", "direction")))
+MODEL_ERRORS = REGISTRY.register(Counter("security_agent_model_errors_total", "Failed model calls", ("model", "phase")))
+STATE_IO = REGISTRY.register(Histogram("security_agent_state_io_duration_seconds", "State file read and write time",
+                                       ("operation", "file"), STATE_IO_BUCKETS))
+STATE_IO_BYTES = REGISTRY.register(Counter("security_agent_state_io_bytes_total", "State file bytes read and written",
+                                           ("operation", "file")))
+
+
+def _requests_per_second() -> float:
+    started = SCAN_START.value()
+    return HTTP_REQUESTS.total() / (time.time() - started) if started else 0.0
+
+
+REQUEST_RATE = REGISTRY.register(Gauge("security_agent_http_requests_per_second",
+                                       "HTTP probes per second since the scan started", function=_requests_per_second))
+
+
+def endpoint_label(url: str) -> str:
+    """URL path with resource IDs replaced by {id}, so each endpoint is one label value"""
+    path = urlsplit(url).path or "/"
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def start_scan(scan_id: str):
+    """Reset the metrics for a new scan"""
+    REGISTRY.reset()
+    SCAN_INFO.set(1, scan_id=scan_id)
+    SCAN_START.set(time.time())
+    LAST_PROGRESS.set(time.time())
+
+
+def set_phase(phase: Optional[str]):
+    """Mark phase as the one running now (None once the last one finished)"""
+    with PHASE._lock:
+        for key in PHASE._values:
+            PHASE._values[key] = 0
+    if phase is not None:
+        PHASE.set(1, phase=phase)
+
+
+def observe_http_request(method: str, url: str, status: Any, seconds: float):
+    """Count one HTTP probe and its latency"""
+    endpoint = endpoint_label(url)
+    HTTP_REQUESTS.inc(method=method.upper(), endpoint=endpoint, status=status if status is not None else "error")
+    HTTP_LATENCY.observe(seconds, method=method.upper(), endpoint=endpoint)
+
+
+def observe_state_io(operation: str, path: str, seconds: float, size: int):
+    """Time and bytes of one state file read or write"""
+    name = os.path.basename(path)
+    STATE_IO.observe(seconds, operation=operation, file=name)
+    STATE_IO_BYTES.inc(size, operation=operation, file=name)
+
+
+def set_scenario_counts(total: int, executed: int):
+    """Scenario gauges after a scenarios state save"""
+    if executed > SCENARIOS.value(state="executed"):
+        LAST_PROGRESS.set(time.time())
+    SCENARIOS.set(total, state="planned")
+    SCENARIOS.set(executed, state="executed")
+    SCENARIOS.set(total - executed, state="pending")
+
+
+def set_vulnerability_counts(by_severity: Dict[str, int]):
+    """Vulnerability gauges after a vulnerabilities state save"""
+    for severity in SEVERITIES:
+        VULNERABILITIES.set(by_severity.get(severity, 0), severity=severity)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Model call latency, tokens and errors by model and phase"""
+
+    def __init__(self):
+        self._pending: Dict[Any, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, metadata=None, invocation_params=None, **kwargs):
+        params = invocation_params or {}
+        model = (metadata or {}).get("ls_model_name") or params.get("model") or params.get("model_name") or "unknown"
+        with self._lock:
+            self._pending[run_id] = (str(model), str((metadata or {}).get("phase", "unknown")), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        model, phase, started = pending
+        MODEL_LATENCY.observe(time.perf_counter() - started, model=model, phase=phase)
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                MODEL_TOKENS.inc(usage.get("input_tokens", 0), model=model, phase=phase, direction="input")
+                MODEL_TOKENS.inc(usage.get("output_tokens", 0), model=model, phase=phase, direction="output")
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is not None:
+            MODEL_ERRORS.inc(model=pending[0], phase=pending[1])
+
+
+class MetricsServer:
+    """Serves the registry on http://host:port/metrics from a background thread"""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TextfileExporter:
+    """Rewrites a .prom file every interval seconds (atomically) and once more when stopped"""
+
+    def __init__(self, path: str, interval: float = DEFAULT_TEXTFILE_INTERVAL, registry: MetricsRegistry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+
+    def write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".prom")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"⚠️  Could not write metrics to {self.path}: {e}")
+
+    def start(self) -> "TextfileExporter":
+        self.write()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.write()
@@ -1,9 +1,259 @@
-from langchain_anthropic import ChatAnthropic
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage, ToolMessage
 from dotenv import load_dotenv
 
 load_dotenv()
 
-model = ChatAnthropic(model="claude-3-7-sonnet-latest", temperature=0.8)
+DEFAULT_TEMPERATURE = 0.8
+
+# Model behind each tier, overridable with FAST_MODEL / STRONG_MODEL
+MODEL_TIERS = {
+    "fast": os.getenv("FAST_MODEL", "claude-3-5-haiku-latest"),
+    "strong": os.getenv("STRONG_MODEL", "claude-3-7-sonnet-latest")
+}
+
+# "routed" picks the tier per step (see step_tier), override with MODEL_TIER_<AGENT>=fast|strong|routed
+ROUTED = "routed"
+AGENT_TIERS = {
+    "swagger": "fast",
+    "planner": "strong",
+    "executor": ROUTED,
+    "analysis": "strong",
+    "report": "strong"
+}
+for _agent in AGENT_TIERS:
+    AGENT_TIERS[_agent] = os.getenv(f"MODEL_TIER_{_agent.upper()}", AGENT_TIERS[_agent])
+
+# Tools whose results need no reasoning, the step after them only moves on to the next call
+BOOKKEEPING_TOOLS = {
+    "add_endpoint", "get_endpoints_count", "add_test_scenario", "add_test_scenarios", "mark_scenario_executed",
+    "add_test_result", "add_vulnerability", "get_scenarios_summary", "check_execution_progress", "is_testing_complete",
+    "execute_scenario"
+}
+
+# LLM_DETERMINISTIC=1 pins temperature to 0 so recorded runs can be replayed from the LLM cache
+_configured_temperature = 0.0 if os.getenv("LLM_DETERMINISTIC") == "1" else DEFAULT_TEMPERATURE
+_models: Dict[str, Any] = {}
+_llm_cache = None
+_rate_limit_handler = None
+
+# Attempts per model call when a rate limiter is active; the limiter supplies the back-off
+RATE_LIMIT_ATTEMPTS = 6
+
+
+def get_model(tier: str = "strong"):
+    """Shared chat model of a tier, created on first use"""
+    if tier not in _models:
+        if tier not in MODEL_TIERS:
+            raise ValueError(f"Unknown model tier: {tier}")
+        # The provider SDK is the bulk of the import time, only load it when a real model is needed
+        from langchain_anthropic import ChatAnthropic
+
+        instance = ChatAnthropic(model=MODEL_TIERS[tier], temperature=_configured_temperature)
+        instance.cache = _llm_cache
+        _models[tier] = instance
+        _apply_rate_limit(instance)
+    return _models[tier]
+
+
+def set_model(tier: str, instance):
+    """Replace the model behind a tier, e.g. with a fake chat model for benchmarks"""
+    if _llm_cache is not None:
+        instance.cache = _llm_cache
+    _models[tier] = instance
+    _apply_rate_limit(instance)
+
+
+def _apply_rate_limit(instance):
+    """Attach the process-wide rate limiter to a model instance (or detach it)"""
+    from utils.rate_limiter import RateLimitCallbackHandler
+
+    callbacks = [c for c in (instance.callbacks or []) if not isinstance(c, RateLimitCallbackHandler)]
+    if _rate_limit_handler is not None:
+        callbacks.append(_rate_limit_handler)
+    instance.callbacks = callbacks or None
+    if hasattr(instance, "max_retries"):
+        # Retries go through the limiter instead of the client's own back-off
+        instance.max_retries = 0 if _rate_limit_handler is not None else 2
+
+
+def configure_rate_limit(requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                         state_path: Optional[str] = None):
+    """Meter every model call of this process (and of others sharing state_path) against provider limits.
+
+    Returns the limiter, or None when neither limit is set (which removes an active limiter).
+    """
+    from utils.rate_limiter import LLMRateLimiter, RateLimitCallbackHandler
+
+    global _rate_limit_handler
+    limiter = None
+    if requests_per_minute or tokens_per_minute:
+        limiter = LLMRateLimiter(requests_per_minute, tokens_per_minute, state_path=state_path)
+        _rate_limit_handler = RateLimitCallbackHandler(limiter)
+    else:
+        _rate_limit_handler = None
+    for instance in _models.values():
+        _apply_rate_limit(instance)
+    _meter_cache_misses()
+    return limiter
+
+
+def _meter_cache_misses():
+    """With both a response cache and a rate limiter, only calls that miss the cache are metered"""
+    if _rate_limit_handler is not None:
+        _rate_limit_handler.metered_on_cache_miss = _llm_cache is not None
+    if _llm_cache is not None:
+        _llm_cache.on_lookup = _rate_limit_handler.on_cache_lookup if _rate_limit_handler is not None else None
+
+
+def configure_model_tiers(tiers: Dict[str, str]):
+    """Override the tier ("fast", "strong" or "routed") of individual agents"""
+    for agent, tier in tiers.items():
+        if agent not in AGENT_TIERS:
+            raise ValueError(f"Unknown agent: {agent}")
+        if tier != ROUTED and tier not in MODEL_TIERS:
+            raise ValueError(f"Unknown model tier: {tier}")
+        AGENT_TIERS[agent] = tier
+
+
+def step_tier(messages: Sequence[Any]) -> str:
+    """Fast tier right after bookkeeping tool results, strong tier whenever there is something to analyze"""
+    names = []
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            break
+        names.append(message.name)
+    if names and all(name in BOOKKEEPING_TOOLS for name in names):
+        return "fast"
+    return "strong"
+
+
+def agent_tier(agent: str) -> str:
+    """Configured tier of an agent, "routed" resolves to strong outside the per-step selector"""
+    tier = AGENT_TIERS.get(agent, "strong")
+    return "strong" if tier == ROUTED else tier
+
+
+def with_rate_limit_retry(runnable):
+    """Retry a model runnable on 429s while a rate limiter is active, the limiter supplies the back-off"""
+    if _rate_limit_handler is None:
+        return runnable
+    from utils.rate_limiter import retry_after_seconds
+    return runnable.with_retry(
+        retry_if_exception_type=lambda e: retry_after_seconds(e) is not None,
+        wait_exponential_jitter=False,
+        stop_after_attempt=RATE_LIMIT_ATTEMPTS
+    )
+
+
+def agent_model(agent: str, tools: List[Callable]) -> Callable[[Dict[str, Any], Any], Any]:
+    """Model selector for create_react_agent that routes every step by the agent's configured tier"""
+    bound: Dict[int, Any] = {}
+
+    def select_model(state: Dict[str, Any], runtime: Any = None):
+        tier = AGENT_TIERS.get(agent, "strong")
+        if tier == ROUTED:
+            tier = step_tier(state["messages"])
+        instance = get_model(tier)
+        # Tool schemas are converted once per model instance
+        if id(instance) not in bound:
+            bound[id(instance)] = instance.bind_tools(tools)
+        return with_rate_limit_retry(bound[id(instance)])
+    return select_model
+
+
+def __getattr__(name):
+    # Default model, kept for direct use outside the agents and created on first access
+    if name == "model":
+        return get_model("strong")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Set PROMPT_CACHE=0 to send the system prompts without cache breakpoints
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "1") != "0"
+
+
+def cached_system_prompt(text: str) -> Union[SystemMessage, str]:
+    """System prompt with a cache breakpoint at its end.
+
+    The provider caches the request prefix in the order tools -> system -> messages,
+    so a single breakpoint after the system prompt also covers the tool schemas.
+    """
+    if not PROMPT_CACHE_ENABLED:
+        return text
+    return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+
+
+class PromptCacheCallbackHandler(BaseCallbackHandler):
+    """Counts prompt-cache reads and writes reported on model responses"""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                details = usage.get("input_token_details") or {}
+                with self._lock:
+                    self.calls += 1
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.cache_read_tokens += details.get("cache_read", 0) or 0
+                    self.cache_creation_tokens += details.get("cache_creation", 0) or 0
+
+    def hit_rate(self) -> float:
+        """Share of input tokens served from the cache"""
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the counters"""
+        return {
+            "model_calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "hit_rate": round(self.hit_rate(), 4)
+        }
+
+
+def configure_llm_cache(path: Optional[str] = None, max_entries: Optional[int] = None, deterministic: bool = True):
+    """Opt in to the persistent exact-match response cache for every model tier.
+
+    Only identical model, parameters, messages and tools hit the cache, so
+    deterministic=True also pins temperature to 0 to make replays meaningful.
+    Returns the cache, whose to_dict() reports hits and misses.
+    """
+    from utils.llm_cache import SQLiteLRUCache, DEFAULT_LLM_CACHE_PATH, DEFAULT_MAX_ENTRIES
+
+    global _llm_cache, _configured_temperature
+    _llm_cache = SQLiteLRUCache(path or DEFAULT_LLM_CACHE_PATH, DEFAULT_MAX_ENTRIES if max_entries is None else max_entries)
+    if deterministic:
+        _configured_temperature = 0.0
+    for instance in _models.values():
+        instance.cache = _llm_cache
+        if deterministic and hasattr(instance, "temperature"):
+            instance.temperature = 0.0
+    _meter_cache_misses()
+    return _llm_cache
+
+
+def disable_llm_cache():
+    """Stop using the response cache and restore the default temperature"""
+    global _llm_cache, _configured_temperature
+    _llm_cache = None
+    _meter_cache_misses()
+    _configured_temperature = 0.0 if os.getenv("LLM_DETERMINISTIC") == "1" else DEFAULT_TEMPERATURE
+    for instance in _models.values():
+        instance.cache = None
+        if hasattr(instance, "temperature"):
+            instance.temperature = _configured_temperature
+
 
 if __name__ == "__main__":
-    print(model.invoke("Hello, world!").content)
+    print(get_model("strong").invoke("Hello, world!").content)
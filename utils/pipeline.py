@@ -0,0 +1,214 @@
+"""
+Streaming producer/consumer pipeline over bounded queues.
+
+A source emits items into the first queue and every stage consumes its input
+queue with one or more worker threads, emitting into the next one. Queues are
+bounded, so a slow stage blocks the stages feeding it (backpressure) instead
+of letting work pile up. Each stage can flush once its input is exhausted.
+"""
+
+import json
+import time
+import queue
+import threading
+import contextvars
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import ToolMessage
+
+DEFAULT_QUEUE_SIZE = 4
+
+# Marks the end of a stage's input
+_END = object()
+
+
+class Stage:
+    """One step of the pipeline: handler(item, emit) per item, then flush(emit) once the input is exhausted"""
+
+    def __init__(self, name: str, handler: Callable[[Any, Callable[[Any], None]], None], workers: int = 1,
+                 flush: Optional[Callable[[Callable[[Any], None]], None]] = None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.flush = flush
+        self.input: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self.output: Optional["queue.Queue[Any]"] = None
+        self.items = 0
+        self.emitted = 0
+        self.busy_seconds = 0.0
+        self.waiting_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+        self._finished_workers = 0
+
+    def emit(self, item: Any):
+        """Pass an item to the next stage, blocking while its queue is full"""
+        if self.output is None:
+            return
+        started = time.perf_counter()
+        self.output.put(item)
+        with self._lock:
+            self.emitted += 1
+            self.blocked_seconds += time.perf_counter() - started
+
+    def _work(self):
+        while True:
+            started = time.perf_counter()
+            item = self.input.get()
+            with self._lock:
+                self.waiting_seconds += time.perf_counter() - started
+            if item is _END:
+                # Let the sibling workers see the end marker too
+                self.input.put(_END)
+                break
+            started = time.perf_counter()
+            try:
+                self.handler(item, self.emit)
+            except Exception as e:
+                with self._lock:
+                    self.errors.append(str(e))
+            with self._lock:
+                self.items += 1
+                self.busy_seconds += time.perf_counter() - started
+
+        with self._lock:
+            self._finished_workers += 1
+            last = self._finished_workers == self.workers
+        if last:
+            # The last worker out flushes and closes the next stage's input
+            if self.flush is not None:
+                started = time.perf_counter()
+                try:
+                    self.flush(self.emit)
+                except Exception as e:
+                    with self._lock:
+                        self.errors.append(str(e))
+                with self._lock:
+                    self.busy_seconds += time.perf_counter() - started
+            if self.output is not None:
+                self.output.put(_END)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Throughput and where the stage spent its time"""
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "emitted": self.emitted,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "waiting_seconds": round(self.waiting_seconds, 2),
+            "blocked_seconds": round(self.blocked_seconds, 2),
+            "errors": list(self.errors)
+        }
+
+
+class Pipeline:
+    """A source feeding a chain of stages, every worker on its own thread"""
+
+    def __init__(self, source: Callable[[Callable[[Any], None]], None], source_name: str = "source"):
+        self.source = source
+        self.source_name = source_name
+        self.stages: List[Stage] = []
+        self.source_seconds = 0.0
+        self.source_blocked_seconds = 0.0
+        self.source_emitted = 0
+        self.source_error: Optional[str] = None
+
+    def add_stage(self, stage: Stage) -> "Pipeline":
+        """Append a stage consuming what the previous one emits"""
+        if self.stages:
+            self.stages[-1].output = stage.input
+        self.stages.append(stage)
+        return self
+
+    def _produce(self):
+        first = self.stages[0].input
+        lock = threading.Lock()
+
+        def emit(item: Any):
+            # Sources may emit from several threads, e.g. tool callbacks of parallel tool calls
+            started = time.perf_counter()
+            first.put(item)
+            with lock:
+                self.source_blocked_seconds += time.perf_counter() - started
+                self.source_emitted += 1
+
+        started = time.perf_counter()
+        try:
+            self.source(emit)
+        except Exception as e:
+            self.source_error = str(e)
+        finally:
+            self.source_seconds = time.perf_counter() - started
+            first.put(_END)
+
+    def run(self) -> Dict[str, Any]:
+        """Run until the source and every stage are done; returns per-stage statistics"""
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage")
+        started = time.perf_counter()
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(self._produce,),
+                                    name=f"pipeline-{self.source_name}", daemon=True)]
+        for stage in self.stages:
+            for index in range(stage.workers):
+                # Each worker runs in a copy of the caller's context so run-scoped context variables carry over
+                threads.append(threading.Thread(target=contextvars.copy_context().run, args=(stage._work,),
+                                                name=f"pipeline-{stage.name}-{index}", daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = {
+            self.source_name: {
+                "busy_seconds": round(self.source_seconds - self.source_blocked_seconds, 2),
+                "blocked_seconds": round(self.source_blocked_seconds, 2),
+                "emitted": self.source_emitted,
+                "errors": [self.source_error] if self.source_error else []
+            }
+        }
+        for stage in self.stages:
+            stats[stage.name] = stage.to_dict()
+        stats["wall_seconds"] = round(time.perf_counter() - started, 2)
+        return stats
+
+
+def tool_status(output: Any) -> Optional[int]:
+    """Status code of a tool output: the (status, message) tuple itself or a ToolMessage carrying it as JSON"""
+    if isinstance(output, ToolMessage):
+        if output.status == "error":
+            return None
+        try:
+            output = json.loads(output.content) if isinstance(output.content, str) else output.content
+        except ValueError:
+            return None
+    if isinstance(output, (list, tuple)) and output and isinstance(output[0], int):
+        return output[0]
+    return None
+
+
+class ToolInputStreamHandler(BaseCallbackHandler):
+    """Emits one argument of every call of a tool that returned status 200, as soon as the call completes"""
+
+    def __init__(self, tool_name: str, argument: str, emit: Callable[[Any], None]):
+        self.tool_name = tool_name
+        self.argument = argument
+        self.emit = emit
+        self._pending: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, inputs=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name == self.tool_name and isinstance(inputs, dict) and self.argument in inputs:
+            with self._lock:
+                self._pending[run_id] = inputs[self.argument]
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        with self._lock:
+            value = self._pending.pop(run_id, None)
+        if value is not None and tool_status(output) == 200:
+            self.emit(value)
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        with self._lock:
+            self._pending.pop(run_id, None)
@@ -0,0 +1,270 @@
+"""
+Process-wide (optionally cross-process) rate limiting of model calls.
+
+Requests and tokens per minute are metered with token buckets refilled
+continuously, so callers are spread evenly instead of bursting and stalling.
+Waiting callers are served round-robin by scan, and a 429 response pauses
+every caller for the provider's retry-after. With a response cache in front of
+the model, only calls whose lookup missed are metered. With state_path the bucket state
+lives in a file guarded by an advisory lock, shared by every process on the host.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages.utils import count_tokens_approximately
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Seconds of traffic a full bucket allows at once
+DEFAULT_BURST_SECONDS = 5.0
+# Pause after a 429 without a usable retry-after header
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class LLMRateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with fair queueing by scan"""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 burst_seconds: float = DEFAULT_BURST_SECONDS, state_path: Optional[str] = None):
+        if state_path and fcntl is None:
+            raise ValueError("A shared rate limit file needs fcntl, which this platform does not provide")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.state_path = state_path
+        self.waited_seconds = 0.0
+        self.throttled_calls = 0
+        self._state: Optional[Dict[str, float]] = None
+        self._lock = threading.Lock()
+        self._turn = threading.Condition()
+        self._queues: Dict[str, Deque[object]] = {}
+        self._rotation: List[str] = []
+        self._next_scan = 0
+
+    def _capacity(self, per_minute: Optional[float]) -> float:
+        return max(1.0, per_minute / 60.0 * self.burst_seconds) if per_minute else 0.0
+
+    def _initial_state(self, now: float) -> Dict[str, float]:
+        return {
+            "requests": self._capacity(self.requests_per_minute),
+            "tokens": self._capacity(self.tokens_per_minute),
+            "updated": now,
+            "paused_until": 0.0
+        }
+
+    def _update(self, change):
+        """Apply change(state, now) to the shared bucket state and return its result"""
+        with self._lock:
+            if not self.state_path:
+                now = time.time()
+                if self._state is None:
+                    self._state = self._initial_state(now)
+                return change(self._state, now)
+
+            with open(f"{self.state_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    now = time.time()
+                    try:
+                        with open(self.state_path, "r") as f:
+                            state = json.load(f)
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        state = self._initial_state(now)
+                    result = change(state, now)
+                    tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w") as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.state_path)
+                    return result
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, float], now: float):
+        elapsed = max(0.0, now - state["updated"])
+        if self.requests_per_minute:
+            state["requests"] = min(self._capacity(self.requests_per_minute),
+                                    state["requests"] + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            state["tokens"] = min(self._capacity(self.tokens_per_minute),
+                                  state["tokens"] + elapsed * self.tokens_per_minute / 60.0)
+        state["updated"] = now
+
+    def _try_take(self, tokens: int) -> float:
+        """Take one request and the tokens if available, otherwise return the seconds to wait"""
+        def take(state, now):
+            self._refill(state, now)
+            if state["paused_until"] > now:
+                return state["paused_until"] - now
+            waits = []
+            if self.requests_per_minute and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60.0 / self.requests_per_minute)
+            # A call larger than the whole bucket goes through once the bucket is full
+            needed = min(tokens, self._capacity(self.tokens_per_minute))
+            if self.tokens_per_minute and state["tokens"] < needed:
+                waits.append((needed - state["tokens"]) * 60.0 / self.tokens_per_minute)
+            if waits:
+                return max(waits)
+            if self.requests_per_minute:
+                state["requests"] -= 1
+            if self.tokens_per_minute:
+                state["tokens"] -= tokens
+            return 0.0
+        return self._update(take)
+
+    def _is_next(self, scan_id: str, ticket: object) -> bool:
+        scan = self._rotation[self._next_scan % len(self._rotation)]
+        return scan == scan_id and self._queues[scan][0] is ticket
+
+    def acquire(self, tokens: int = 0, scan_id: str = "default") -> float:
+        """Block until the call may be sent; returns the seconds waited"""
+        started = time.monotonic()
+        ticket = object()
+        with self._turn:
+            if scan_id not in self._queues:
+                self._queues[scan_id] = deque()
+                self._rotation.append(scan_id)
+            self._queues[scan_id].append(ticket)
+            while not self._is_next(scan_id, ticket):
+                self._turn.wait()
+
+        try:
+            # Only the caller whose turn it is polls the buckets
+            while True:
+                wait = self._try_take(tokens)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, 1.0))
+        finally:
+            with self._turn:
+                self._queues[scan_id].popleft()
+                index = self._rotation.index(scan_id)
+                if not self._queues[scan_id]:
+                    del self._queues[scan_id]
+                    self._rotation.pop(index)
+                    self._next_scan = index
+                else:
+                    self._next_scan = index + 1
+                if self._rotation:
+                    self._next_scan %= len(self._rotation)
+                self._turn.notify_all()
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self.waited_seconds += waited
+            if waited > 0.01:
+                self.throttled_calls += 1
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a call is known"""
+        if not self.tokens_per_minute or not actual_tokens:
+            return
+
+        def adjust(state, now):
+            state["tokens"] += estimated_tokens - actual_tokens
+        self._update(adjust)
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. for the retry-after of a 429"""
+        def hold(state, now):
+            state["paused_until"] = max(state["paused_until"], now + seconds)
+        self._update(hold)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Limits and how much callers were held back"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "shared_state": self.state_path,
+            "throttled_calls": self.throttled_calls,
+            "waited_seconds": round(self.waited_seconds, 2)
+        }
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Seconds to back off if error is a rate-limit response, None for other errors"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and "RateLimit" not in type(error).__name__:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is not None:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return DEFAULT_RETRY_AFTER
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """Meters every model call through a limiter, attached to the model instances themselves"""
+
+    def __init__(self, limiter: LLMRateLimiter):
+        self.limiter = limiter
+        # Set while the models have a response cache: calls are metered on a cache miss instead of when they start
+        self.metered_on_cache_miss = False
+        self._estimates: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._deferred = threading.local()
+
+    def _deferred_calls(self) -> Deque[Tuple[Any, int, str]]:
+        """Started calls of this thread waiting for their cache lookup, in start order"""
+        if not hasattr(self._deferred, "calls"):
+            self._deferred.calls = deque()
+        return self._deferred.calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, metadata=None, **kwargs):
+        estimate = sum(count_tokens_approximately(batch) for batch in messages)
+        scan_id = str((metadata or {}).get("scan_id", "default"))
+        with self._lock:
+            self._estimates[run_id] = estimate
+        if self.metered_on_cache_miss:
+            # The model looks the call up in its cache right after, on this thread
+            self._deferred_calls().append((run_id, estimate, scan_id))
+        else:
+            self.limiter.acquire(estimate, scan_id)
+
+    def on_cache_lookup(self, hit: bool):
+        """Meter the oldest started call of this thread once its cache lookup missed; a hit never reaches the provider"""
+        calls = self._deferred_calls()
+        if not calls:
+            return
+        run_id, estimate, scan_id = calls.popleft()
+        if hit:
+            with self._lock:
+                self._estimates.pop(run_id, None)
+        else:
+            self.limiter.acquire(estimate, scan_id)
+
+    def _forget(self, run_id) -> int:
+        """Drop what is kept about a finished call; returns its token estimate"""
+        calls = self._deferred_calls()
+        for call in [call for call in calls if call[0] == run_id]:
+            calls.remove(call)
+        with self._lock:
+            return self._estimates.pop(run_id, 0)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        estimate = self._forget(run_id)
+        actual = 0
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                actual += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        self.limiter.reconcile(estimate, actual)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._forget(run_id)
+        seconds = retry_after_seconds(error)
+        if seconds is not None:
+            self.limiter.pause(seconds)
@@ -0,0 +1,75 @@
+"""
+Sharding of endpoints and bounded concurrent execution of agent runs
+"""
+
+import re
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def path_prefix(endpoint: str) -> str:
+    """First meaningful path segment of a "METHOD /path" endpoint, skipping api/version segments"""
+    path = endpoint.split(" ", 1)[-1]
+    for segment in path.split("/"):
+        if not segment or segment.startswith("{"):
+            continue
+        if segment.lower() == "api" or re.fullmatch(r"v\d+", segment.lower()):
+            continue
+        return segment.lower()
+    return "root"
+
+
+def shard_key(endpoint: str, tags: Optional[Dict[str, List[str]]] = None, by: str = "tag") -> str:
+    """Group an endpoint belongs to: its first tag, or its path prefix"""
+    endpoint_tags = (tags or {}).get(endpoint) or []
+    return endpoint_tags[0] if by == "tag" and endpoint_tags else path_prefix(endpoint)
+
+
+def shard_endpoints(endpoints: List[str], tags: Optional[Dict[str, List[str]]] = None,
+                    by: str = "tag", max_shard_size: int = 10) -> List[List[str]]:
+    """Group endpoints by tag or path prefix, splitting groups larger than max_shard_size"""
+    groups: "OrderedDict[str, List[str]]" = OrderedDict()
+    for endpoint in endpoints:
+        groups.setdefault(shard_key(endpoint, tags, by), []).append(endpoint)
+
+    shards: List[List[str]] = []
+    size = max(1, max_shard_size)
+    for group in groups.values():
+        for start in range(0, len(group), size):
+            shards.append(group[start:start + size])
+    return shards
+
+
+def run_concurrently(func: Callable[[T], R], items: List[T], max_workers: int = 4) -> List[Tuple[Optional[R], Optional[Exception]]]:
+    """Apply func to every item with at most max_workers in flight.
+
+    Results come back in input order as (result, error) pairs so one failing
+    shard doesn't discard the work of the others.
+    """
+    def _safe(item: T) -> Tuple[Optional[R], Optional[Exception]]:
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [_safe(item) for item in items]
+
+    # Each worker runs in a copy of the caller's context so run-scoped context variables carry over
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda pair: pair[0].run(_safe, pair[1]), zip(contexts, items)))
+
+
+def merge_results(results: List[Tuple[Optional[Any], Optional[Exception]]]) -> Dict[str, Any]:
+    """Summarize shard outcomes"""
+    return {
+        "shards": len(results),
+        "succeeded": sum(1 for _, error in results if error is None),
+        "errors": [str(error) for _, error in results if error is not None]
+    }
@@ -0,0 +1,323 @@
+"""
+Span tracing of a scan: phases, agent invocations and steps, model and tool calls, HTTP probes and state file I/O.
+
+Spans link to their parent (phase -> agent -> step -> tool -> HTTP probe / state I/O) and are written, once finished,
+as one JSON object per line using the OTLP span field names (traceId, spanId, parentSpanId, startTimeUnixNano, ...).
+The analysis helpers at the bottom rebuild the tree from such a file; trace_report.py prints them.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+
+def _langchain_run_id() -> Optional[Any]:
+    """ID of the LangChain run (tool, agent step) whose code is executing now, if any"""
+    config = var_child_runnable_config.get()
+    return getattr((config or {}).get("callbacks"), "parent_run_id", None)
+
+
+class Span:
+    """One timed operation; attributes can be added until it ends"""
+
+    __slots__ = ("tracer", "name", "kind", "span_id", "parent_id", "run_key", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.run_key = _langchain_run_id()
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.error: Optional[str] = None
+
+    def set_attributes(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def end(self, error: Optional[str] = None):
+        """Finish the span and hand it to the exporter (only the first call counts)"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.error = error
+        self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.tracer.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"}
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans for one scan and appends the finished ones to a JSONL file"""
+
+    def __init__(self, path: str, trace_id: Optional[str] = None):
+        self.path = path
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans_written = 0
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        # LangChain run ID -> span ID; runs without a span of their own map to their nearest traced ancestor
+        self._runs: Dict[Any, Optional[str]] = {}
+
+    def current_parent_id(self) -> Optional[str]:
+        """Span the next span belongs under: the innermost of the active span and the running LangChain run"""
+        active = _current_span.get()
+        run_id = _langchain_run_id()
+        if active is not None and active.run_key == run_id:
+            return active.span_id
+        with self._lock:
+            if run_id is not None and run_id in self._runs:
+                return self._runs[run_id]
+        return active.span_id if active is not None else None
+
+    def start_span(self, name: str, kind: str = "internal", parent_id: Optional[str] = None, **attributes) -> Span:
+        """Start a span under parent_id (default: the current span); the caller ends it"""
+        return Span(self, name, kind, parent_id if parent_id is not None else self.current_parent_id(), attributes)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        """Span around a block, current for everything started inside it; exceptions mark it as failed"""
+        current = self.start_span(name, kind, **attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.end(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end()
+
+    def activate(self, span: Optional[Span]):
+        """Make span the parent of later spans in this context (and threads started from it)"""
+        _current_span.set(span)
+
+    def map_run(self, run_id: Any, span_id: Optional[str]):
+        with self._lock:
+            self._runs[run_id] = span_id
+
+    def run_span_id(self, run_id: Any) -> Optional[str]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def forget_run(self, run_id: Any):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self.spans_written += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_active_tracer: ContextVar[Optional[Tracer]] = ContextVar("active_tracer", default=None)
+
+
+def set_active_tracer(tracer: Optional[Tracer]):
+    """Make a tracer visible to the tools of the current run"""
+    _active_tracer.set(tracer)
+
+
+def get_active_tracer() -> Optional[Tracer]:
+    """Tracer of the current run, if any"""
+    return _active_tracer.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Span around a block when a tracer is active, yields None otherwise"""
+    tracer = _active_tracer.get()
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, kind, **attributes) as current:
+        yield current
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Spans for agent invocations, graph steps, model calls and tool calls"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans: Dict[Any, Span] = {}
+        self._lock = threading.Lock()
+
+    def _parent_id(self, parent_run_id) -> Optional[str]:
+        if parent_run_id is not None:
+            return self.tracer.run_span_id(parent_run_id)
+        return self.tracer.current_parent_id()
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str, **attributes):
+        started = self.tracer.start_span(name, kind, self._parent_id(parent_run_id), **attributes)
+        with self._lock:
+            self._spans[run_id] = started
+        self.tracer.map_run(run_id, started.span_id)
+        return started
+
+    def _end(self, run_id, error: Optional[BaseException] = None, **attributes):
+        with self._lock:
+            finished = self._spans.pop(run_id, None)
+        self.tracer.forget_run(run_id)
+        if finished is not None:
+            finished.set_attributes(**attributes)
+            finished.end(error=f"{type(error).__name__}: {error}" if error is not None else None)
+
+    def on_chain_start(self, serialized, inputs, *, run_id=None, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        if parent_run_id is None:
+            self._start(run_id, None, metadata.get("agent", name), "agent", phase=metadata.get("phase"),
+                        scenario_ids=metadata.get("scenarios"))
+        elif metadata.get("langgraph_node") == name:
+            self._start(run_id, parent_run_id, name, "step", step=metadata.get("langgraph_step"), phase=metadata.get("phase"))
+        else:
+            # Graph plumbing (sequences, channel writes, routing) gets no span, its children go to the nearest traced run
+            self.tracer.map_run(run_id, self.tracer.run_span_id(parent_run_id))
+
+    def on_chain_end(self, outputs, *, run_id=None, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id=None, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, parent_run_id=None, metadata=None,
+                            invocation_params=None, **kwargs):
+        params = invocation_params or {}
+        model = (metadata or {}).get("ls_model_name") or params.get("model") or params.get("model_name") or "unknown"
+        self._start(run_id, parent_run_id, str(model), "model", phase=(metadata or {}).get("phase"))
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        usage: Dict[str, int] = {}
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens"):
+                    usage[key] = usage.get(key, 0) + metadata.get(key, 0)
+        self._end(run_id, **usage)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, parent_run_id=None, inputs=None, **kwargs):
+        inputs = inputs if isinstance(inputs, dict) else {}
+        scenario = inputs.get("scenario_data")
+        scenario_id = inputs.get("scenario_id") or (scenario.get("id") if isinstance(scenario, dict) else None)
+        self._start(run_id, parent_run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool", "tool",
+                    scenario_id=scenario_id, input_bytes=len(input_str or ""))
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        self._end(run_id, output_bytes=len(str(getattr(output, "content", output))))
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        self._end(run_id, error)
+
+
+# =====================================
+# ANALYSIS
+# =====================================
+
+def load_spans(path: str, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Finished spans of a JSONL trace file, only those of trace_id if given"""
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if trace_id is None or record["traceId"] == trace_id:
+                    spans.append(record)
+    return spans
+
+
+def _seconds(start_ns: int, end_ns: int) -> float:
+    return max(0, end_ns - start_ns) / 1e9
+
+
+def build_tree(spans: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Root spans (longest first) and the children of every span (in start order)"""
+    by_id = {record["spanId"]: record for record in spans}
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    roots = []
+    for record in spans:
+        if record["parentSpanId"] in by_id:
+            children.setdefault(record["parentSpanId"], []).append(record)
+        else:
+            roots.append(record)
+    for siblings in children.values():
+        siblings.sort(key=lambda record: record["startTimeUnixNano"])
+    roots.sort(key=lambda record: record["endTimeUnixNano"] - record["startTimeUnixNano"], reverse=True)
+    return roots, children
+
+
+def critical_path(root: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]]) -> List[Tuple[Dict[str, Any], float]]:
+    """Spans the end of root waited on, with the seconds each contributed itself.
+
+    Walks back from the end of a span: the child that finished last before that point is on the path, then the
+    one that finished last before it started, and so on; time no child covers is the span's own.
+    """
+    path: List[Tuple[Dict[str, Any], float]] = []
+
+    def walk(record: Dict[str, Any], until: int):
+        own = 0
+        cursor = min(record["endTimeUnixNano"], until)
+        segments = []
+        candidates = sorted(children.get(record["spanId"], []), key=lambda child: child["endTimeUnixNano"], reverse=True)
+        for child in candidates:
+            if child["startTimeUnixNano"] >= cursor:
+                continue
+            child_end = min(child["endTimeUnixNano"], cursor)
+            own += max(0, cursor - child_end)
+            segments.append((child, child_end))
+            cursor = child["startTimeUnixNano"]
+        own += max(0, cursor - record["startTimeUnixNano"])
+        path.append((record, own / 1e9))
+        for child, child_end in reversed(segments):
+            walk(child, child_end)
+
+    walk(root, root["endTimeUnixNano"])
+    return path
+
+
+def self_times(spans: List[Dict[str, Any]], children: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Seconds spent in each (kind, name) outside its children, most first"""
+    totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in spans:
+        start, end = record["startTimeUnixNano"], record["endTimeUnixNano"]
+        covered, cursor = 0, start
+        for child in children.get(record["spanId"], []):
+            child_start, child_end = max(child["startTimeUnixNano"], cursor), min(child["endTimeUnixNano"], end)
+            if child_end > child_start:
+                covered += child_end - child_start
+                cursor = child_end
+        key = (record["kind"], record["name"])
+        entry = totals.setdefault(key, {"kind": key[0], "name": key[1], "count": 0, "self_seconds": 0.0, "total_seconds": 0.0})
+        entry["count"] += 1
+        entry["self_seconds"] += _seconds(start, end) - covered / 1e9
+        entry["total_seconds"] += _seconds(start, end)
+    return sorted(totals.values(), key=lambda entry: entry["self_seconds"], reverse=True)
@@ -0,0 +1,247 @@
+"""
+Durable work queue for distributed scenario execution, backed by SQLite.
+
+The orchestrator publishes the pending scenarios of a scan. Worker processes,
+possibly on other hosts sharing the file, lease a few items at a time. A lease
+that is neither completed nor renewed before it expires is handed to the next
+worker that asks. Items leased max_attempts times without completing end up
+"failed". Completed items carry their results until the orchestrator takes them.
+
+A scan may be published with a budget (requests, tokens, deadline). Workers
+commit the probes and tokens they spend as they go, the orchestrator takes that
+usage like the results, and items of a scan whose budget is spent are no longer
+leased.
+
+The database uses the rollback journal rather than WAL, since WAL does not work
+on network file systems, and every state change runs in an immediate transaction.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_WORK_QUEUE_PATH = "work_queue.sqlite"
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Seconds a connection waits for another process's transaction to finish
+BUSY_TIMEOUT_SECONDS = 30.0
+
+STATUSES = ("pending", "leased", "done", "failed", "cancelled")
+# Scans whose budget is used up (the parameter is the current time)
+_SPENT = ("(max_requests IS NOT NULL AND requests >= max_requests) OR (max_tokens IS NOT NULL AND tokens >= max_tokens) "
+          "OR (deadline IS NOT NULL AND deadline <= ?)")
+
+
+
+class SQLiteWorkQueue:
+    """Lease-based queue of work items grouped by scan"""
+
+    def __init__(self, path: str = DEFAULT_WORK_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS work_items ("
+            "scan_id TEXT NOT NULL, item_id TEXT NOT NULL, seq INTEGER NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "lease_owner TEXT, lease_expires REAL, result TEXT, error TEXT, applied INTEGER NOT NULL DEFAULT 0, "
+            "updated REAL NOT NULL, PRIMARY KEY (scan_id, item_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS work_items_status ON work_items (status, seq)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_budgets ("
+            "scan_id TEXT PRIMARY KEY, max_requests INTEGER, max_tokens INTEGER, deadline REAL, "
+            "requests INTEGER NOT NULL DEFAULT 0, tokens INTEGER NOT NULL DEFAULT 0, "
+            "unapplied_requests INTEGER NOT NULL DEFAULT 0, unapplied_tokens INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def _transaction(self, work):
+        """Run work(cursor) in an immediate transaction, so concurrent lessees never take the same item"""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(cur, time.time())
+                cur.execute("COMMIT")
+                return result
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def publish(self, scan_id: str, items: Iterable[Tuple[str, Dict[str, Any]]],
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS, budget: Optional[Dict[str, Any]] = None) -> int:
+        """Queue (item_id, payload) pairs in order; cancelled or failed items are queued again, others are left alone.
+
+        budget ({"max_requests", "max_tokens", "max_seconds"}, None for unlimited) is what the workers may still
+        spend on the scan from now on; publishing with a budget starts its usage over.
+        Returns the number of items now pending because of this call.
+        """
+        def insert(cur, now):
+            if budget is not None:
+                max_seconds = budget.get("max_seconds")
+                cur.execute(
+                    "INSERT OR REPLACE INTO scan_budgets (scan_id, max_requests, max_tokens, deadline) VALUES (?, ?, ?, ?)",
+                    (scan_id, budget.get("max_requests"), budget.get("max_tokens"),
+                     now + max_seconds if max_seconds is not None else None)
+                )
+            cur.execute("SELECT COALESCE(MAX(seq), 0) FROM work_items")
+            seq = cur.fetchone()[0]
+            queued = 0
+            for item_id, payload in items:
+                seq += 1
+                cur.execute(
+                    "INSERT INTO work_items (scan_id, item_id, seq, payload, status, max_attempts, updated) "
+                    "VALUES (?, ?, ?, ?, 'pending', ?, ?) "
+                    "ON CONFLICT (scan_id, item_id) DO UPDATE SET status = 'pending', payload = excluded.payload, "
+                    "seq = excluded.seq, attempts = 0, max_attempts = excluded.max_attempts, error = NULL, "
+                    "updated = excluded.updated WHERE status IN ('cancelled', 'failed')",
+                    (scan_id, item_id, seq, json.dumps(payload), max_attempts, now)
+                )
+                queued += cur.rowcount
+            return queued
+        return self._transaction(insert)
+
+    def lease(self, worker_id: str, limit: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              scan_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lease up to limit pending items (or items whose lease expired), oldest first"""
+        def take(cur, now):
+            # Expired leases that used up their attempts are not redelivered again
+            cur.execute(
+                "UPDATE work_items SET status = 'failed', lease_owner = NULL, updated = ?, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            query = ("SELECT scan_id, item_id, payload, attempts FROM work_items "
+                     "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                     f"AND scan_id NOT IN (SELECT scan_id FROM scan_budgets WHERE {_SPENT})")
+            params: List[Any] = [now, now]
+            if scan_id is not None:
+                query += " AND scan_id = ?"
+                params.append(scan_id)
+            cur.execute(query + " ORDER BY seq LIMIT ?", params + [max(1, limit)])
+            rows = cur.fetchall()
+            for row in rows:
+                cur.execute(
+                    "UPDATE work_items SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE scan_id = ? AND item_id = ?",
+                    (worker_id, now + lease_seconds, now, row[0], row[1])
+                )
+            return [{"scan_id": row[0], "item_id": row[1], "payload": json.loads(row[2]), "attempt": row[3] + 1}
+                    for row in rows]
+        return self._transaction(take)
+
+    def renew(self, worker_id: str, items: List[Dict[str, Any]], lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+        """Extend the leases the worker still holds; returns how many it still holds"""
+        def extend(cur, now):
+            renewed = 0
+            for item in items:
+                cur.execute(
+                    "UPDATE work_items SET lease_expires = ?, updated = ? "
+                    "WHERE scan_id = ? AND item_id = ? AND status = 'leased' AND lease_owner = ?",
+                    (now + lease_seconds, now, item["scan_id"], item["item_id"], worker_id)
+                )
+                renewed += cur.rowcount
+            return renewed
+        return self._transaction(extend)
+
+    def complete(self, worker_id: str, item: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """Commit the result of a leased item; False if the lease was lost to another worker meanwhile"""
+        def commit(cur, now):
+            cur.execute(
+                "UPDATE work_items SET status = 'done', result = ?, lease_owner = NULL, error = NULL, updated = ? "
+                "WHERE scan_id = ? AND item_id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result), now, item["scan_id"], item["item_id"], worker_id)
+            )
+            return cur.rowcount == 1
+        return self._transaction(commit)
+
+    def release(self, worker_id: str, item: Dict[str, Any], error: str) -> bool:
+        """Give a leased item back for redelivery, or fail it once it used up its attempts"""
+        def give_back(cur, now):
+            cur.execute(
+                "UPDATE work_items SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires = NULL, error = ?, updated = ? "
+                "WHERE scan_id = ? AND item_id = ? AND status = 'leased' AND lease_owner = ?",
+                (error, now, item["scan_id"], item["item_id"], worker_id)
+            )
+            return cur.rowcount == 1
+        return self._transaction(give_back)
+
+    def record_usage(self, scan_id: str, requests: int = 0, tokens: int = 0):
+        """Count requests and tokens a worker spent against the scan budget"""
+        def add(cur, now):
+            cur.execute("INSERT OR IGNORE INTO scan_budgets (scan_id) VALUES (?)", (scan_id,))
+            cur.execute(
+                "UPDATE scan_budgets SET requests = requests + ?, tokens = tokens + ?, "
+                "unapplied_requests = unapplied_requests + ?, unapplied_tokens = unapplied_tokens + ? WHERE scan_id = ?",
+                (requests, tokens, requests, tokens, scan_id)
+            )
+        self._transaction(add)
+
+    def remaining_budget(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        """What the workers may still spend on a scan ({"max_requests", "max_tokens", "max_seconds"}), None if unlimited"""
+        with self._lock:
+            row = self._conn.execute("SELECT max_requests, max_tokens, deadline, requests, tokens FROM scan_budgets "
+                                     "WHERE scan_id = ?", (scan_id,)).fetchone()
+        if row is None:
+            return None
+        max_requests, max_tokens, deadline, requests, tokens = row
+        return {
+            "max_requests": max(0, max_requests - requests) if max_requests is not None else None,
+            "max_tokens": max(0, max_tokens - tokens) if max_tokens is not None else None,
+            "max_seconds": max(0.0, deadline - time.time()) if deadline is not None else None
+        }
+
+    def take_usage(self, scan_id: str) -> Tuple[int, int]:
+        """Requests and tokens the workers committed for the scan since the last call"""
+        def take(cur, now):
+            cur.execute("SELECT unapplied_requests, unapplied_tokens FROM scan_budgets WHERE scan_id = ?", (scan_id,))
+            row = cur.fetchone()
+            cur.execute("UPDATE scan_budgets SET unapplied_requests = 0, unapplied_tokens = 0 WHERE scan_id = ?", (scan_id,))
+            return (row[0], row[1]) if row else (0, 0)
+        return self._transaction(take)
+
+    def take_completed(self, scan_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Results of the scan's completed items not taken before, as (item_id, result) pairs"""
+        def take(cur, now):
+            cur.execute("SELECT item_id, result FROM work_items WHERE scan_id = ? AND status = 'done' AND applied = 0 "
+                        "ORDER BY seq", (scan_id,))
+            rows = cur.fetchall()
+            cur.execute("UPDATE work_items SET applied = 1 WHERE scan_id = ? AND status = 'done' AND applied = 0", (scan_id,))
+            return [(row[0], json.loads(row[1] or "{}")) for row in rows]
+        return self._transaction(take)
+
+    def cancel(self, scan_id: str) -> int:
+        """Withdraw the scan's items nobody has leased yet; returns how many"""
+        def withdraw(cur, now):
+            cur.execute("UPDATE work_items SET status = 'cancelled', updated = ? WHERE scan_id = ? AND status = 'pending'",
+                        (now, scan_id))
+            return cur.rowcount
+        return self._transaction(withdraw)
+
+    def counts(self, scan_id: Optional[str] = None) -> Dict[str, int]:
+        """Items per status, plus how many were delivered more than once"""
+        where, params = ("WHERE scan_id = ?", (scan_id,)) if scan_id is not None else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT status, COUNT(*) FROM work_items {where} GROUP BY status", params).fetchall()
+            redelivered = self._conn.execute(
+                f"SELECT COUNT(*) FROM work_items {where + ' AND' if where else 'WHERE'} attempts > 1", params
+            ).fetchone()[0]
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        counts["redelivered"] = redelivered
+        return counts
+
+    def failures(self, scan_id: str) -> Dict[str, str]:
+        """Last error of every failed item of the scan"""
+        with self._lock:
+            rows = self._conn.execute("SELECT item_id, error FROM work_items WHERE scan_id = ? AND status = 'failed'",
+                                      (scan_id,)).fetchall()
+        return {row[0]: row[1] or "" for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()